@@ -0,0 +1,48 @@
+"""
+Configuración de gunicorn (se carga automáticamente desde la raíz del proyecto).
+
+GUNICORN_MODO=wsgi (default) usa workers síncronos con inventario_project.wsgi.
+GUNICORN_MODO=asgi usa workers de uvicorn con inventario_project.asgi: las vistas
+AJAX asíncronas (inventario/views_ajax.py) atienden en el event loop mientras
+las vistas síncronas pesadas corren en hilos.
+
+Las métricas de Prometheus (inventario/metricas.py) se comparten entre workers
+mediante archivos en PROMETHEUS_MULTIPROC_DIR, que se vacía al arrancar.
+"""
+
+import os
+import shutil
+import tempfile
+
+modo = os.environ.get('GUNICORN_MODO', 'wsgi').lower()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('GUNICORN_WORKERS', 2))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+accesslog = '-'
+errorlog = '-'
+
+# Debe definirse antes de que los workers importen prometheus_client
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'inventario_prometheus'))
+
+if modo == 'asgi':
+    wsgi_app = 'inventario_project.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    # Con ASGI cada petición síncrona usa su propio hilo y las conexiones persistentes
+    # se quedarían abiertas por hilo: se cierran al terminar salvo que se use DB_POOL
+    os.environ.setdefault('DB_CONN_MAX_AGE', '0')
+else:
+    wsgi_app = 'inventario_project.wsgi:application'
+
+
+def on_starting(server):
+    """Descarta los valores de una ejecución anterior"""
+    directorio = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(directorio, ignore_errors=True)
+    os.makedirs(directorio, exist_ok=True)
+
+
+def child_exit(server, worker):
+    """Quita de los gauges 'live' los valores del worker que terminó"""
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -6,7 +6,14 @@ from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from decimal import Decimal
 from .models import (Material, Movimiento, ConfiguracionSistema, Monos, RecetaMonos, 
                    Simulacion, DetalleSimulacion, MovimientoEfectivo, ListaProduccion, 
-                   DetalleListaMonos, ResumenMateriales, VentaMonos, UserProfile)
+                   DetalleListaMonos, ResumenMateriales, VentaMonos, UserProfile,
+                   TransicionListaProduccion, PresentacionMaterial, VentaDiaria)
+
+
+class PresentacionMaterialInline(admin.TabularInline):
+    model = PresentacionMaterial
+    extra = 1
+    fields = ['proveedor', 'nombre', 'contenido', 'precio', 'disponibles', 'activo']
 
 
 @admin.register(Material)
@@ -26,6 +33,7 @@ class MaterialAdmin(admin.ModelAdmin):
     search_fields = ['codigo', 'nombre', 'categoria']
     list_editable = ['cantidad_disponible']
     readonly_fields = ['fecha_creacion', 'fecha_modificacion', 'costo_unitario', 'valor_inventario']
+    inlines = [PresentacionMaterialInline]
     
     fieldsets = (
         ('Información Básica', {
@@ -82,13 +90,14 @@ class MovimientoAdmin(admin.ModelAdmin):
         'usuario'
     ]
     list_filter = ['tipo_movimiento', 'fecha', 'material__categoria']
-    search_fields = ['material__codigo', 'material__nombre', 'detalle']
+    search_fields = ['material__codigo', 'material__nombre', 'detalle', 'lista_produccion__nombre']
     readonly_fields = ['fecha']
+    raw_id_fields = ['lista_produccion']
     date_hierarchy = 'fecha'
     
     fieldsets = (
         ('Movimiento', {
-            'fields': ('material', 'tipo_movimiento', 'cantidad', 'detalle')
+            'fields': ('material', 'tipo_movimiento', 'cantidad', 'detalle', 'lista_produccion')
         }),
         ('Estado del Inventario', {
             'fields': ('cantidad_anterior', 'cantidad_nueva')
@@ -304,8 +313,9 @@ class MovimientoEfectivoAdmin(admin.ModelAdmin):
         'fecha',
         'usuario'
     ]
-    search_fields = ['concepto', 'categoria']
-    readonly_fields = ['saldo_anterior', 'saldo_nuevo', 'automatico', 'movimiento_inventario', 'simulacion_relacionada']
+    search_fields = ['concepto', 'categoria', 'lista_produccion__nombre']
+    readonly_fields = ['saldo_anterior', 'saldo_nuevo', 'automatico', 'movimiento_inventario', 'simulacion_relacionada',
+                       'lista_produccion']
     date_hierarchy = 'fecha'
     
     fieldsets = [
@@ -329,7 +339,8 @@ class MovimientoEfectivoAdmin(admin.ModelAdmin):
                 'automatico',
                 'usuario',
                 'movimiento_inventario',
-                'simulacion_relacionada'
+                'simulacion_relacionada',
+                'lista_produccion'
             ],
             'classes': ['collapse']
         }),
@@ -368,10 +379,11 @@ class MovimientoEfectivoAdmin(admin.ModelAdmin):
     @admin.action(description='🔄 Migrar ventas seleccionadas a VentaMonos')
     def migrar_ventas_a_ventamonos(self, request, queryset):
         """Acción para migrar ventas antiguas de MovimientoEfectivo a VentaMonos"""
-        # Filtrar solo movimientos de venta
-        movimientos_venta = queryset.filter(tipo_movimiento='ingreso', categoria='venta')
+        from .migracion_ventas import migrar_ventas
+        
+        resultado = migrar_ventas(queryset, punto_control=None)
         
-        if not movimientos_venta.exists():
+        if not resultado['movimientos']:
             self.message_user(
                 request,
                 "No hay movimientos de venta en la selección.",
@@ -379,85 +391,15 @@ class MovimientoEfectivoAdmin(admin.ModelAdmin):
             )
             return
         
-        ventas_creadas = 0
-        ventas_ya_existen = 0
-        errores = 0
-        
-        for mov in movimientos_venta:
-            # Extraer nombre de lista del concepto
-            if 'Lista:' not in mov.concepto:
-                errores += 1
-                continue
-            
-            nombre_lista = mov.concepto.split('Lista:')[1].strip()
-            
-            try:
-                # Buscar listas con ese nombre
-                listas_candidatas = ListaProduccion.objects.filter(nombre=nombre_lista, estado='finalizado')
-                
-                if listas_candidatas.count() == 0:
-                    errores += 1
-                    continue
-                elif listas_candidatas.count() == 1:
-                    lista = listas_candidatas.first()
-                else:
-                    # Si hay múltiples, usar la más cercana en fecha
-                    lista = None
-                    menor_diferencia = None
-                    
-                    for l in listas_candidatas:
-                        if l.fecha_finalizacion:
-                            diferencia = abs((l.fecha_finalizacion - mov.fecha).total_seconds())
-                            if menor_diferencia is None or diferencia < menor_diferencia:
-                                menor_diferencia = diferencia
-                                lista = l
-                    
-                    if lista is None:
-                        lista = listas_candidatas.order_by('-fecha_creacion').first()
-                
-                # Verificar si ya existen ventas para esta lista
-                if VentaMonos.objects.filter(lista_produccion=lista).exists():
-                    ventas_ya_existen += 1
-                    continue
-                
-                # Crear VentaMonos por cada detalle
-                detalles = lista.detalles_monos.all()
-                
-                for detalle in detalles:
-                    if detalle.cantidad_producida > 0:
-                        cantidad_vendida = detalle.cantidad_producida
-                        mono = detalle.monos
-                        precio_unitario = mono.precio_venta
-                        ingreso_total = Decimal(cantidad_vendida) * precio_unitario
-                        costo_unitario = mono.costo_produccion
-                        ganancia_total = ingreso_total - (costo_unitario * cantidad_vendida)
-                        
-                        VentaMonos.objects.create(
-                            lista_produccion=lista,
-                            monos=mono,
-                            cantidad_vendida=cantidad_vendida,
-                            tipo_venta=mono.tipo_venta,
-                            precio_unitario=precio_unitario,
-                            ingreso_total=ingreso_total,
-                            costo_unitario=costo_unitario,
-                            ganancia_total=ganancia_total,
-                            fecha=mov.fecha,
-                            usuario=mov.usuario
-                        )
-                        ventas_creadas += 1
-                        
-            except Exception as e:
-                errores += 1
-                continue
-        
         # Mensaje de resultado
-        mensaje = f"Migración completada: {ventas_creadas} ventas creadas"
-        if ventas_ya_existen > 0:
-            mensaje += f", {ventas_ya_existen} ya existían"
-        if errores > 0:
-            mensaje += f", {errores} errores"
+        mensaje = f"Migración completada: {resultado['ventas_creadas']} ventas creadas"
+        if resultado['ventas_ya_existen'] > 0:
+            mensaje += f", {resultado['ventas_ya_existen']} ya existían"
+        if resultado['errores'] > 0:
+            mensaje += f", {resultado['errores']} errores"
+        mensaje += f" ({resultado['filas_por_segundo']:,.0f} ventas/s)"
         
-        nivel = messages.SUCCESS if ventas_creadas > 0 else messages.WARNING
+        nivel = messages.SUCCESS if resultado['ventas_creadas'] > 0 else messages.WARNING
         self.message_user(request, mensaje, level=nivel)
 
 
@@ -476,6 +418,18 @@ class ResumenMaterialesInline(admin.TabularInline):
     readonly_fields = ['cantidad_necesaria', 'cantidad_disponible', 'cantidad_faltante']
 
 
+class TransicionListaProduccionInline(admin.TabularInline):
+    model = TransicionListaProduccion
+    extra = 0
+    fields = ['fecha', 'estado_anterior', 'estado_nuevo', 'usuario', 'nota']
+    readonly_fields = fields
+    ordering = ['fecha']
+    can_delete = False
+    
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(ListaProduccion)
 class ListaProduccionAdmin(admin.ModelAdmin):
     list_display = [
@@ -491,8 +445,17 @@ class ListaProduccionAdmin(admin.ModelAdmin):
     list_filter = ['estado', 'fecha_creacion', 'usuario_creador']
     search_fields = ['nombre', 'descripcion']
     readonly_fields = ['fecha_creacion', 'fecha_modificacion', 'total_moños_planificados', 
-                       'total_moños_producidos', 'costo_total_estimado', 'ganancia_estimada']
-    inlines = [DetalleListaMonosInline, ResumenMaterialesInline]
+                       'total_moños_producidos', 'costo_total_estimado', 'ganancia_estimada',
+                       'costo_real', 'ganancia_real', 'materiales_faltantes_count', 'accion_siguiente']
+    inlines = [DetalleListaMonosInline, ResumenMaterialesInline, TransicionListaProduccionInline]
+    actions = [
+        'marcar_compradas',
+        'enviar_a_reabastecido',
+        'iniciar_produccion',
+        'enviar_a_salida',
+        'finalizar_con_ventas',
+        'archivar',
+    ]
     
     fieldsets = (
         ('Información Básica', {
@@ -504,10 +467,84 @@ class ListaProduccionAdmin(admin.ModelAdmin):
         }),
         ('Totales Calculados', {
             'fields': ('total_moños_planificados', 'total_moños_producidos', 
-                      'costo_total_estimado', 'ganancia_estimada'),
+                      'costo_total_estimado', 'ganancia_estimada', 'costo_real', 'ganancia_real',
+                      'materiales_faltantes_count', 'accion_siguiente'),
             'classes': ('collapse',)
         }),
     )
+    
+    def _transicionar_seleccion(self, request, queryset, destino, vender_producido=False):
+        """Aplica la transición en lote y reporta el resultado por lista"""
+        from .transiciones import transicionar_lote
+        
+        resultados = transicionar_lote(
+            queryset.values_list('id', flat=True), destino, request.user,
+            nota='Acción en lote desde el admin', vender_producido=vender_producido,
+        )
+        exitosas = [r for r in resultados if r['ok']]
+        if exitosas:
+            self.message_user(request, f'✅ {len(exitosas)} lista(s) actualizadas.', level=messages.SUCCESS)
+        for resultado in resultados:
+            if not resultado['ok']:
+                self.message_user(request, f'⚠️ {resultado["nombre"]}: {resultado["mensaje"]}', level=messages.WARNING)
+    
+    @admin.action(description='🛒 Marcar como compradas')
+    def marcar_compradas(self, request, queryset):
+        self._transicionar_seleccion(request, queryset, 'comprado')
+    
+    @admin.action(description='📦 Enviar a reabastecido')
+    def enviar_a_reabastecido(self, request, queryset):
+        self._transicionar_seleccion(request, queryset, 'reabastecido')
+    
+    @admin.action(description='🏭 Iniciar producción (descuenta materiales)')
+    def iniciar_produccion(self, request, queryset):
+        self._transicionar_seleccion(request, queryset, 'en_produccion')
+    
+    @admin.action(description='🚚 Enviar a salida')
+    def enviar_a_salida(self, request, queryset):
+        self._transicionar_seleccion(request, queryset, 'en_salida')
+    
+    @admin.action(description='💰 Vender todo lo producido y finalizar')
+    def finalizar_con_ventas(self, request, queryset):
+        self._transicionar_seleccion(request, queryset, 'finalizado', vender_producido=True)
+    
+    @admin.action(description='🗄️ Archivar')
+    def archivar(self, request, queryset):
+        self._transicionar_seleccion(request, queryset, 'archivado')
+    
+    def save_model(self, request, obj, form, change):
+        """Los cambios de estado hechos a mano también quedan en la bitácora"""
+        super().save_model(request, obj, form, change)
+        if 'estado' in form.changed_data:
+            TransicionListaProduccion.objects.create(
+                lista=obj,
+                estado_anterior=form.initial.get('estado', '') if change else '',
+                estado_nuevo=obj.estado,
+                usuario=request.user,
+                nota='Cambio manual desde el admin'
+            )
+    
+    def save_related(self, request, form, formsets, change):
+        """Recalcular el resumen de estado después de guardar los inlines"""
+        super().save_related(request, form, formsets, change)
+        form.instance.actualizar_resumen()
+
+
+@admin.register(TransicionListaProduccion)
+class TransicionListaProduccionAdmin(admin.ModelAdmin):
+    list_display = ['lista', 'estado_anterior', 'estado_nuevo', 'fecha', 'usuario', 'nota']
+    list_filter = ['estado_nuevo', 'fecha']
+    search_fields = ['lista__nombre', 'nota']
+    date_hierarchy = 'fecha'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(DetalleListaMonos)
@@ -555,9 +592,9 @@ class VentaMonosAdmin(admin.ModelAdmin):
         'fecha',
         'usuario'
     ]
-    list_filter = ['tipo_venta', 'monos', 'fecha']
+    list_filter = ['tipo_venta', 'costo_es_real', 'monos', 'fecha']
     search_fields = ['monos__nombre', 'lista_produccion__nombre']
-    readonly_fields = ['fecha', 'cantidad_total_monos']
+    readonly_fields = ['fecha', 'cantidad_total_monos', 'costo_es_real']
     date_hierarchy = 'fecha'
     
     fieldsets = (
@@ -565,7 +602,7 @@ class VentaMonosAdmin(admin.ModelAdmin):
             'fields': ('lista_produccion', 'monos', 'cantidad_vendida', 'tipo_venta', 'cantidad_total_monos')
         }),
         ('Finanzas', {
-            'fields': ('precio_unitario', 'ingreso_total', 'costo_unitario', 'ganancia_total')
+            'fields': ('precio_unitario', 'ingreso_total', 'costo_unitario', 'costo_es_real', 'ganancia_total')
         }),
         ('Metadatos', {
             'fields': ('fecha', 'usuario')
@@ -586,6 +623,28 @@ class VentaMonosAdmin(admin.ModelAdmin):
         )
     ganancia_total_formatted.short_description = "Ganancia"
     ganancia_total_formatted.admin_order_field = 'ganancia_total'
+    
+    def save_model(self, request, obj, form, change):
+        """Al editar una venta se mueve su aporte en el resumen diario"""
+        anterior = VentaMonos.objects.filter(pk=obj.pk).first() if change else None
+        super().save_model(request, obj, form, change)
+        if anterior is not None:
+            VentaDiaria.acumular([anterior], signo=-1)
+            VentaDiaria.acumular([obj])
+
+
+@admin.register(VentaDiaria)
+class VentaDiariaAdmin(admin.ModelAdmin):
+    list_display = ['fecha', 'monos', 'cantidad', 'cantidad_total_monos', 'ingresos', 'costos', 'ganancia', 'n_ventas']
+    list_filter = ['monos', 'fecha']
+    search_fields = ['monos__nombre']
+    date_hierarchy = 'fecha'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
 
 
 # ========================================================================================
@@ -0,0 +1,159 @@
+"""
+Almacenamiento compacto de listas archivadas.
+
+Una lista archivada se guarda como un snapshot JSON comprimido en
+ListaProduccionArchivo y sus filas de DetalleListaMonos y ResumenMateriales se
+eliminan de las tablas activas. Las VentaMonos se conservan (son la fuente de
+analytics); el snapshot solo guarda su resumen por moño.
+"""
+
+import json
+import zlib
+from collections import defaultdict
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Sum
+
+from .models import (DetalleListaMonos, ListaProduccion, ListaProduccionArchivo, Material, Monos,
+                     ResumenMateriales, VentaMonos)
+
+VERSION_SNAPSHOT = 1
+
+# Columnas guardadas por cada tabla (el snapshot guarda filas como listas)
+CAMPOS_DETALLE = ('monos_id', 'cantidad', 'cantidad_producida')
+CAMPOS_RESUMEN = (
+    'material_id', 'cantidad_necesaria', 'cantidad_disponible', 'cantidad_faltante',
+    'cantidad_comprada', 'precio_compra_real', 'proveedor', 'fecha_compra', 'cantidad_utilizada',
+)
+CAMPOS_VENTAS = ('monos_id', 'cantidad_vendida', 'ingreso_total', 'ganancia_total')
+
+
+def comprimir(contenido):
+    """Serializa a JSON compacto y comprime con zlib"""
+    texto = json.dumps(contenido, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return zlib.compress(texto.encode('utf-8'), 9)
+
+
+def descomprimir(datos):
+    """Inverso de ``comprimir`` (acepta bytes o memoryview)"""
+    return json.loads(zlib.decompress(bytes(datos)).decode('utf-8'))
+
+
+def _filas_por_lista(queryset, campos):
+    filas = defaultdict(list)
+    for fila in queryset.values_list('lista_produccion_id', *campos):
+        filas[fila[0]].append(list(fila[1:]))
+    return filas
+
+
+def compactar_listas(lista_ids):
+    """
+    Compacta las listas archivadas indicadas que aún no tienen snapshot.
+    Regresa (listas_compactadas, filas_eliminadas, bytes_snapshot).
+    """
+    with transaction.atomic():
+        ids = list(
+            ListaProduccion.objects.select_for_update()
+            .filter(id__in=lista_ids, estado='archivado', archivo__isnull=True)
+            .values_list('id', flat=True)
+        )
+        if not ids:
+            return 0, 0, 0
+
+        detalles = _filas_por_lista(DetalleListaMonos.objects.filter(lista_produccion_id__in=ids), CAMPOS_DETALLE)
+        resumen = _filas_por_lista(ResumenMateriales.objects.filter(lista_produccion_id__in=ids), CAMPOS_RESUMEN)
+
+        ventas = defaultdict(list)
+        for fila in (
+            VentaMonos.objects.filter(lista_produccion_id__in=ids)
+            .values('lista_produccion_id', 'monos_id')
+            .annotate(
+                cantidad=Sum('cantidad_vendida'),
+                ingreso=Sum('ingreso_total'),
+                ganancia=Sum('ganancia_total'),
+            )
+            .order_by()
+        ):
+            ventas[fila['lista_produccion_id']].append(
+                [fila['monos_id'], fila['cantidad'], fila['ingreso'], fila['ganancia']]
+            )
+
+        archivos = [
+            ListaProduccionArchivo(
+                lista_id=lista_id,
+                version=VERSION_SNAPSHOT,
+                datos=comprimir({
+                    'campos': {
+                        'detalles': CAMPOS_DETALLE,
+                        'resumen': CAMPOS_RESUMEN,
+                        'ventas': CAMPOS_VENTAS,
+                    },
+                    'detalles': detalles.get(lista_id, []),
+                    'resumen': resumen.get(lista_id, []),
+                    'ventas': ventas.get(lista_id, []),
+                }),
+                filas_compactadas=len(detalles.get(lista_id, [])) + len(resumen.get(lista_id, [])),
+            )
+            for lista_id in ids
+        ]
+        ListaProduccionArchivo.objects.bulk_create(archivos, batch_size=500)
+
+        detalles_eliminados, _ = DetalleListaMonos.objects.filter(lista_produccion_id__in=ids).delete()
+        resumen_eliminado, _ = ResumenMateriales.objects.filter(lista_produccion_id__in=ids).delete()
+
+    return len(ids), detalles_eliminados + resumen_eliminado, sum(len(a.datos) for a in archivos)
+
+
+def _instancias(modelo, campos, filas, relacion, objetos, lista):
+    """Construye instancias sin guardar convirtiendo cada valor con su campo"""
+    convertidores = {f.attname: f.to_python for f in modelo._meta.concrete_fields}
+    instancias = []
+    for fila in filas:
+        valores = {campo: convertidores[campo](valor) for campo, valor in zip(campos, fila)}
+        relacionado = objetos.get(valores[f'{relacion}_id'])
+        if relacionado is None:
+            continue  # El moño o material ya no existe
+        instancia = modelo(lista_produccion=lista, **valores)
+        setattr(instancia, relacion, relacionado)
+        instancias.append(instancia)
+    return instancias
+
+
+def columnas_detalles(archivo, *campos):
+    """Tuplas con las columnas pedidas de cada detalle del snapshot, sin crear instancias"""
+    contenido = archivo.contenido
+    indices = [contenido['campos']['detalles'].index(campo) for campo in campos]
+    return [tuple(fila[i] for i in indices) for fila in contenido['detalles']]
+
+
+def rehidratar_detalles(archivo):
+    """Detalles de moños del snapshot, con su moño ya cargado"""
+    contenido = archivo.contenido
+    campos = contenido['campos']['detalles']
+    filas = contenido['detalles']
+    monos = Monos.objects.in_bulk({fila[campos.index('monos_id')] for fila in filas})
+    return _instancias(DetalleListaMonos, campos, filas, 'monos', monos, archivo.lista)
+
+
+def rehidratar_resumen(archivo):
+    """Resumen de materiales del snapshot, con su material ya cargado"""
+    contenido = archivo.contenido
+    campos = contenido['campos']['resumen']
+    filas = contenido['resumen']
+    materiales = Material.objects.in_bulk({fila[campos.index('material_id')] for fila in filas})
+    return _instancias(ResumenMateriales, campos, filas, 'material', materiales, archivo.lista)
+
+
+def detalles_y_resumen(lista):
+    """
+    Detalles de moños y resumen de materiales de una lista, leídos de las
+    tablas activas o, si la lista está compactada, del snapshot.
+    """
+    archivo = getattr(lista, 'archivo', None)
+    if archivo is not None:
+        return archivo.detalles_monos(), archivo.resumen_materiales()
+    return (
+        lista.detalles_monos.select_related('monos').all(),
+        lista.resumen_materiales.select_related('material').all(),
+    )
@@ -0,0 +1,96 @@
+"""
+Cache de resultados de analytics.
+
+Cada resultado se guarda por (vista, periodo, mono_id) junto con la versión de
+los datos de ventas con la que se calculó. Cualquier cambio en VentaMonos
+incrementa VersionDatos('VentaMonos') en la misma transacción (ver
+VentaDiaria.acumular), así que una entrada solo se sirve mientras no haya
+ventas nuevas y no haya vencido su TTL. Las entradas menos usadas se desalojan
+al llegar al máximo.
+
+Los resultados viven en la memoria de cada proceso, pero la versión está en la
+base de datos: un worker deja de servir lo calculado en cuanto otro registra
+una venta.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from prometheus_client import Counter, Gauge
+
+from .models import VersionDatos
+
+TTL = getattr(settings, 'ANALYTICS_CACHE_TTL', 300)
+MAX_ENTRADAS = getattr(settings, 'ANALYTICS_CACHE_MAX_ENTRADAS', 128)
+
+_entradas = OrderedDict()
+_candado = threading.Lock()
+_contadores = {'aciertos': 0, 'fallos': 0, 'vencidos': 0, 'desalojos': 0}
+
+# Para /metrics (ver metricas.py); las entradas se suman entre los workers vivos
+CONSULTAS = Counter('inventario_cache_analytics', 'Consultas al cache de analytics por resultado', ['resultado'])
+ENTRADAS = Gauge(
+    'inventario_cache_analytics_entradas', 'Resultados guardados en el cache de analytics',
+    multiprocess_mode='livesum',
+)
+
+
+def version_ventas():
+    """Versión actual de los datos de ventas"""
+    return VersionDatos.actuales(['VentaMonos'])['VentaMonos']
+
+
+def obtener(vista, periodo, mono_id, calcular):
+    """
+    Resultado cacheado de ``calcular()`` para (vista, periodo, mono_id).
+    Se recalcula si cambió la versión de ventas o venció el TTL.
+    """
+    clave = (vista, periodo, mono_id)
+    version = version_ventas()
+    ahora = time.monotonic()
+
+    with _candado:
+        entrada = _entradas.get(clave)
+        if entrada is not None:
+            version_entrada, expira, valor = entrada
+            if version_entrada == version and expira > ahora:
+                _entradas.move_to_end(clave)
+                _contadores['aciertos'] += 1
+                CONSULTAS.labels('acierto').inc()
+                return valor
+            if version_entrada == version:
+                _contadores['vencidos'] += 1
+        _contadores['fallos'] += 1
+        CONSULTAS.labels('fallo').inc()
+
+    valor = calcular()
+
+    with _candado:
+        _entradas[clave] = (version, ahora + TTL, valor)
+        _entradas.move_to_end(clave)
+        while len(_entradas) > MAX_ENTRADAS:
+            _entradas.popitem(last=False)
+            _contadores['desalojos'] += 1
+        ENTRADAS.set(len(_entradas))
+    return valor
+
+
+def estadisticas():
+    """Contadores de aciertos/fallos y ocupación del cache"""
+    with _candado:
+        datos = dict(_contadores, entradas=len(_entradas), max_entradas=MAX_ENTRADAS, ttl=TTL)
+    total = datos['aciertos'] + datos['fallos']
+    datos['tasa_aciertos'] = datos['aciertos'] / total * 100 if total else 0
+    datos['version'] = version_ventas()
+    return datos
+
+
+def limpiar():
+    """Vacía el cache y reinicia los contadores"""
+    with _candado:
+        _entradas.clear()
+        ENTRADAS.set(0)
+        for nombre in _contadores:
+            _contadores[nombre] = 0
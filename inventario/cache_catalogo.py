@@ -0,0 +1,88 @@
+"""
+Cache de páginas y fragmentos del catálogo (materiales, moños, recetas y simulaciones).
+
+Cada grupo de datos se identifica por las versiones de sus modelos en
+VersionDatos, que las señales (y las operaciones en bloque) incrementan en la
+misma transacción que la escritura. Esas versiones forman parte de la clave de
+cada página (``cache_vista``) y de cada fragmento (``{% cache ... version_catalogo %}``),
+así que un cambio deja de servir todo lo calculado antes sin tener que buscar
+las claves. Como el contador está en la base de datos, todos los workers ven el
+cambio al instante aunque cada uno tenga su propio LocMemCache.
+
+Las páginas se guardan por sesión (Vary: Cookie), porque incluyen el menú del
+usuario, sus mensajes y el token CSRF; los fragmentos no dependen del usuario y
+se comparten.
+"""
+
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.middleware.cache import CacheMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.functional import SimpleLazyObject
+
+from . import metricas
+from .models import VersionDatos
+
+TTL = getattr(settings, 'CACHE_VISTAS_TTL', 60)
+
+# Modelos de VersionDatos que componen cada grupo
+GRUPOS = {
+    'catalogo': ('Material', 'Monos', 'RecetaMonos'),
+    'simulaciones': ('Simulacion',),
+}
+
+
+def version(*grupos):
+    """Versión combinada de los grupos dados, p. ej. '12.40.7' (una consulta)"""
+    modelos = [modelo for grupo in grupos for modelo in GRUPOS[grupo]]
+    versiones = VersionDatos.actuales(modelos)
+    return '.'.join(str(versiones[modelo]) for modelo in modelos)
+
+
+def cache_vista(*grupos, timeout=None):
+    """
+    Decorador de vistas de solo lectura: guarda la respuesta GET por sesión y URL
+    mientras no cambie la versión de ``grupos``. Va debajo de @login_required.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            if getattr(request, 'perfilando', False):
+                return vista(request, *args, **kwargs)  # Se perfila la vista, no el cache
+            if len(messages.get_messages(request)):
+                # Una copia cacheada no consumiría los mensajes: se verían otra vez después
+                return vista(request, *args, **kwargs)
+
+            generadas = []
+
+            def responder(request):
+                generadas.append(True)
+                respuesta = vista(request, *args, **kwargs)
+                # La sesión agrega Vary: Cookie después; aquí ya debe formar parte de la clave
+                patch_vary_headers(respuesta, ('Cookie',))
+                return respuesta
+
+            middleware = CacheMiddleware(
+                responder,
+                page_timeout=timeout or TTL,
+                key_prefix=f'vista:{vista.__name__}:{version(*grupos)}',
+            )
+            respuesta = middleware(request)
+            if request.method in ('GET', 'HEAD'):
+                metricas.registrar_cache_vista(vista.__name__, acierto=not generadas)
+            # El navegador no debe guardar su propia copia: no se enteraría de la invalidación
+            respuesta['Cache-Control'] = 'private, no-cache'
+            del respuesta['Expires']
+            return respuesta
+        return envoltura
+    return decorador
+
+
+def versiones(request):
+    """Context processor: versión del catálogo y TTL para las etiquetas {% cache %}"""
+    return {
+        'version_catalogo': SimpleLazyObject(lambda: version('catalogo')),
+        'cache_ttl': TTL,
+    }
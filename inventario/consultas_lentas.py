@@ -0,0 +1,82 @@
+"""
+Captura de consultas lentas con su plan de ejecución.
+
+Durante la petición RegistroConsultas (instrumentacion.py) aparta las sentencias
+que tardan al menos CONSULTAS_LENTAS_MS; al terminar, InstrumentacionMiddleware
+llama a ``guardar``, que las acumula en ConsultaLenta por vista y huella: veces,
+tiempo total y máximo, y las últimas duraciones para el p95.
+
+El plan se obtiene una sola vez por huella y solo para SELECT: EXPLAIN QUERY
+PLAN en SQLite y EXPLAIN sin ANALYZE en PostgreSQL, que no vuelve a ejecutar la
+consulta. La tabla se limita a CONSULTAS_LENTAS_MAX filas; al pasarse se borran
+las que llevan más tiempo sin repetirse.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+
+from .instrumentacion import huella_sql
+from .models import ConsultaLenta
+
+UMBRAL_MS = getattr(settings, 'CONSULTAS_LENTAS_MS', 200)
+MAX_FILAS = getattr(settings, 'CONSULTAS_LENTAS_MAX', 500)
+MUESTRAS = 100
+
+
+def umbral_segundos():
+    """Umbral para RegistroConsultas; None si la captura está desactivada (0)"""
+    return UMBRAL_MS / 1000 if UMBRAL_MS > 0 else None
+
+
+def _plan_sqlite(filas):
+    """Árbol de EXPLAIN QUERY PLAN (id, padre, _, detalle) con sangría por nivel"""
+    niveles = {0: -1}
+    lineas = []
+    for nodo, padre, _, detalle in filas:
+        niveles[nodo] = niveles.get(padre, -1) + 1
+        lineas.append('  ' * niveles[nodo] + detalle)
+    return '\n'.join(lineas)
+
+
+def plan(alias, sql, params):
+    """Plan de ejecución de una sentencia SELECT ('' para las demás)"""
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return ''
+    conexion = connections[alias]
+    prefijo = 'EXPLAIN QUERY PLAN ' if conexion.vendor == 'sqlite' else 'EXPLAIN '
+    try:
+        with transaction.atomic(using=alias), conexion.cursor() as cursor:
+            cursor.execute(prefijo + sql, params)
+            filas = cursor.fetchall()
+    except DatabaseError as error:
+        return f'No se pudo obtener el plan: {error}'
+    if conexion.vendor == 'sqlite':
+        return _plan_sqlite(filas)
+    return '\n'.join(str(fila[0]) for fila in filas)
+
+
+def guardar(vista, lentas):
+    """Acumula las consultas lentas de una petición [(alias, sql, params, segundos)]"""
+    nuevas = False
+    for alias, sql, params, segundos in lentas:
+        huella = huella_sql(sql)
+        milisegundos = round(segundos * 1000, 2)
+        with transaction.atomic():
+            fila, creada = ConsultaLenta.objects.select_for_update().get_or_create(
+                firma=hashlib.sha1(f'{vista}|{huella}'.encode()).hexdigest(),
+                defaults={'vista': vista[:100], 'huella': huella},
+            )
+            if creada:
+                fila.plan = plan(alias, sql, params)
+                nuevas = True
+            fila.sql_ejemplo = f'{sql}\n-- params: {params!r}'[:5000]
+            fila.veces += 1
+            fila.total_ms += milisegundos
+            fila.max_ms = max(fila.max_ms, milisegundos)
+            fila.muestras = [*fila.muestras, milisegundos][-MUESTRAS:]
+            fila.save()
+    if nuevas:
+        sobrantes = ConsultaLenta.objects.order_by('-ultima_vez').values_list('id', flat=True)[MAX_FILAS:]
+        ConsultaLenta.objects.filter(id__in=list(sobrantes)).delete()
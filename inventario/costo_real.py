@@ -0,0 +1,129 @@
+"""
+Costo real de las listas de producción.
+
+Al finalizar una lista se suma el ``costo_total_movimiento`` de sus movimientos
+de producción (lo que realmente salió del inventario) y se reparte entre sus
+moños según la parte de cada material que pide su receta. El resultado queda
+guardado en ListaProduccion (costo_real, ganancia_real) y en el costo_unitario
+de sus VentaMonos, de modo que los reportes de rentabilidad lo leen sin recalcular.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Sum
+
+from .models import (DetalleListaMonos, ListaProduccion, Movimiento, RecetaMonos, VentaDiaria, VentaMonos,
+                     VersionDatos)
+
+CENTAVO = Decimal('0.01')
+
+
+def costo_materiales_por_lista(lista_ids):
+    """{lista_id: {material_id: costo}} de los movimientos de producción de cada lista"""
+    filas = (
+        Movimiento.objects
+        .filter(lista_produccion_id__in=lista_ids, tipo_movimiento='produccion', costo_total_movimiento__isnull=False)
+        .values('lista_produccion_id', 'material_id')
+        .annotate(costo=Sum('costo_total_movimiento'))
+        .order_by()
+    )
+    costos = defaultdict(dict)
+    for fila in filas:
+        if fila['costo']:
+            costos[fila['lista_produccion_id']][fila['material_id']] = fila['costo']
+    return costos
+
+
+def repartir_por_receta(lista_ids, costos):
+    """
+    Reparte el costo de cada material entre los moños de la lista en proporción
+    a lo que pide su receta (cantidad necesaria × moños planificados).
+    Regresa {(lista_id, monos_id): costo}.
+    """
+    detalles = list(
+        DetalleListaMonos.objects.filter(lista_produccion_id__in=lista_ids)
+        .values_list('lista_produccion_id', 'monos_id', 'cantidad', 'monos__tipo_venta')
+    )
+    recetas = defaultdict(list)
+    for monos_id, material_id, cantidad in RecetaMonos.objects.filter(
+        monos_id__in={monos_id for _, monos_id, _, _ in detalles}
+    ).values_list('monos_id', 'material_id', 'cantidad_necesaria'):
+        recetas[monos_id].append((material_id, cantidad))
+
+    pesos = defaultdict(dict)
+    for lista_id, monos_id, cantidad, tipo_venta in detalles:
+        planificados = cantidad * (2 if tipo_venta == 'par' else 1)
+        for material_id, necesaria in recetas[monos_id]:
+            pesos[(lista_id, material_id)][monos_id] = (
+                pesos[(lista_id, material_id)].get(monos_id, Decimal('0')) + necesaria * planificados
+            )
+
+    repartido = defaultdict(Decimal)
+    for lista_id, por_material in costos.items():
+        for material_id, costo in por_material.items():
+            por_mono = pesos.get((lista_id, material_id))
+            total = sum(por_mono.values()) if por_mono else 0
+            if not total:
+                continue  # El material ya no está en ninguna receta de la lista
+            for monos_id, peso in por_mono.items():
+                repartido[(lista_id, monos_id)] += costo * peso / total
+    return repartido
+
+
+def costear_listas(listas):
+    """
+    Calcula y guarda el costo real de ``listas`` y de sus ventas.
+    Las listas sin movimientos de producción con costo se quedan sin costo real
+    y su ganancia se calcula con el costo estimado; sin ventas no hay ganancia.
+    """
+    listas = list(listas)
+    lista_ids = [lista.id for lista in listas]
+    costos = costo_materiales_por_lista(lista_ids)
+    por_mono = repartir_por_receta(list(costos), costos)
+
+    # Lo producido lo fija el registro de producción; las listas sin registro se costean con lo planificado
+    producidos = {
+        (lista_id, monos_id): producida or cantidad
+        for lista_id, monos_id, producida, cantidad in DetalleListaMonos.objects.filter(
+            lista_produccion_id__in=list(costos)
+        ).values_list('lista_produccion_id', 'monos_id', 'cantidad_producida', 'cantidad')
+    }
+    ingresos = dict(
+        VentaMonos.objects.filter(lista_produccion_id__in=lista_ids)
+        .values('lista_produccion_id').annotate(total=Sum('ingreso_total'))
+        .values_list('lista_produccion_id', 'total').order_by()
+    )
+
+    with transaction.atomic():
+        ventas = list(
+            VentaMonos.objects.select_for_update()
+            .filter(lista_produccion_id__in=list(costos))
+        )
+        anteriores = {venta.id: (venta.costo_unitario, venta.ganancia_total) for venta in ventas}
+        recosteadas = []
+        for venta in ventas:
+            clave = (venta.lista_produccion_id, venta.monos_id)
+            if not producidos.get(clave):
+                continue
+            venta.costo_unitario = (por_mono.get(clave, Decimal('0')) / producidos[clave]).quantize(CENTAVO)
+            venta.ganancia_total = venta.ingreso_total - venta.costo_unitario * venta.cantidad_vendida
+            venta.costo_es_real = True
+            recosteadas.append(venta)
+        VentaMonos.objects.bulk_update(
+            recosteadas, ['costo_unitario', 'ganancia_total', 'costo_es_real'], batch_size=500
+        )
+        VentaDiaria.ajustar_costos(recosteadas, anteriores)
+
+        for lista in listas:
+            if lista.id in costos:
+                lista.costo_real = sum(costos[lista.id].values(), Decimal('0')).quantize(CENTAVO)
+            else:
+                lista.costo_real = None
+            costo = lista.costo_real if lista.costo_real is not None else lista.costo_total_estimado
+            ingreso = ingresos.get(lista.id)
+            lista.ganancia_real = ingreso - (costo or Decimal('0')) if ingreso is not None else None
+        ListaProduccion.objects.bulk_update(listas, ['costo_real', 'ganancia_real'], batch_size=500)
+        VersionDatos.incrementar('ListaProduccion')
+    return listas
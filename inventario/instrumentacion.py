@@ -0,0 +1,97 @@
+"""
+Instrumentación de peticiones: consultas SQL, tiempo de base de datos y de Python.
+
+RegistroConsultas se instala como execute wrapper de las conexiones durante una
+petición (ver InstrumentacionMiddleware) y acumula, sin guardar el SQL completo
+de cada consulta, el número de consultas, el tiempo en la base de datos y
+cuántas veces se repitió cada huella (el SQL sin valores). Una huella que se
+repite muchas veces en la misma petición suele ser un N+1. Las sentencias que
+superan el umbral de consulta lenta se apartan con sus parámetros para
+consultas_lentas.guardar.
+"""
+
+import re
+import time
+from collections import Counter
+
+IN_LISTA = re.compile(r'\bIN\s*\((?:\s*(?:%s|\?|\'[^\']*\'|-?\d+(?:\.\d+)?)\s*,?)+\)', re.IGNORECASE)
+CADENA = re.compile(r"'(?:[^']|'')*'")
+NUMERO = re.compile(r'(?<![\w."])-?\b\d+(?:\.\d+)?\b')
+MARCADOR = re.compile(r'%s|\?')
+ESPACIOS = re.compile(r'\s+')
+
+
+def huella_sql(sql):
+    """SQL normalizado: sin valores, con las listas IN colapsadas y espacios uniformes"""
+    sql = IN_LISTA.sub('IN (...)', sql)
+    sql = CADENA.sub('?', sql)
+    sql = NUMERO.sub('?', sql)
+    sql = MARCADOR.sub('?', sql)
+    return ESPACIOS.sub(' ', sql).strip()
+
+
+class RegistroConsultas:
+    """Execute wrapper que mide cada consulta de la petición"""
+
+    def __init__(self, umbral_lenta=None, max_lentas=20):
+        self.consultas = 0
+        self.tiempo_db = 0.0
+        # El SQL de Django ya viene parametrizado: se cuenta tal cual y se normaliza
+        # al final una sola vez por texto distinto
+        self.sentencias = Counter()
+        # [(alias, sql, params, segundos)] de las que tardaron al menos umbral_lenta segundos
+        self.umbral_lenta = umbral_lenta
+        self.max_lentas = max_lentas
+        self.lentas = []
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = time.perf_counter() - inicio
+            self.registrar(sql, duracion)
+            if (self.umbral_lenta is not None and duracion >= self.umbral_lenta and not many
+                    and len(self.lentas) < self.max_lentas):
+                self.lentas.append((context['connection'].alias, sql, params, duracion))
+
+    def registrar(self, sql, duracion):
+        self.consultas += 1
+        self.tiempo_db += duracion
+        self.sentencias[sql] += 1
+
+    @property
+    def huellas(self):
+        huellas = Counter()
+        for sql, veces in self.sentencias.items():
+            huellas[huella_sql(sql)] += veces
+        return huellas
+
+    def duplicadas(self, minimo=2):
+        """[(huella, repeticiones)] de las consultas repetidas al menos ``minimo`` veces"""
+        return [(huella, veces) for huella, veces in self.huellas.most_common() if veces >= minimo]
+
+
+class RegistroDetallado(RegistroConsultas):
+    """Además del conteo guarda el tiempo de cada sentencia (perfilado bajo demanda)"""
+
+    def __init__(self):
+        super().__init__()
+        self.tiempos = Counter()
+        self.maximos = Counter()
+
+    def registrar(self, sql, duracion):
+        super().registrar(sql, duracion)
+        self.tiempos[sql] += duracion
+        self.maximos[sql] = max(self.maximos[sql], duracion)
+
+    def mas_costosas(self, limite=20):
+        """[{huella, veces, ms, max_ms}] agrupadas por huella, de mayor a menor tiempo total"""
+        grupos = {}
+        for sql, veces in self.sentencias.items():
+            grupo = grupos.setdefault(huella_sql(sql), {'veces': 0, 'ms': 0.0, 'max_ms': 0.0})
+            grupo['veces'] += veces
+            grupo['ms'] += self.tiempos[sql] * 1000
+            grupo['max_ms'] = max(grupo['max_ms'], self.maximos[sql] * 1000)
+        ordenadas = sorted(grupos.items(), key=lambda item: item[1]['ms'], reverse=True)[:limite]
+        return [{'huella': huella, **grupo} for huella, grupo in ordenadas]
@@ -3,10 +3,12 @@ Management command para archivar automáticamente listas finalizadas con más de
 Ejecutar: python manage.py archivar_listas_antiguas
 """
 
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.utils import timezone
 from datetime import timedelta
-from inventario.models import ListaProduccion
+from inventario.models import ListaProduccion, TransicionListaProduccion, VersionDatos
 
 
 class Command(BaseCommand):
@@ -24,6 +26,11 @@ class Command(BaseCommand):
             action='store_true',
             help='Mostrar qué se archivaría sin hacer cambios',
         )
+        parser.add_argument(
+            '--compactar',
+            action='store_true',
+            help='Después de archivar, mover las listas archivadas al almacenamiento compacto',
+        )
 
     def handle(self, *args, **options):
         dias = options['dias']
@@ -60,14 +67,31 @@ class Command(BaseCommand):
                     f'  - {lista.nombre} (finalizada hace {dias_antiguedad} días)'
                 )
         else:
-            # Archivar las listas
-            listas_a_archivar.update(estado='archivado')
+            # Archivar las listas bloqueando las filas y dejando registro en la bitácora
+            with transaction.atomic():
+                listas = list(listas_a_archivar.select_for_update())
+                ListaProduccion.objects.filter(
+                    id__in=[lista.id for lista in listas]
+                ).update(estado='archivado', accion_siguiente='')
+                VersionDatos.incrementar('ListaProduccion')
+                TransicionListaProduccion.objects.bulk_create([
+                    TransicionListaProduccion(
+                        lista=lista,
+                        estado_anterior='finalizado',
+                        estado_nuevo='archivado',
+                        nota=f'Archivado automático ({dias} días)',
+                    )
+                    for lista in listas
+                ], batch_size=500)
             
             self.stdout.write(
                 self.style.SUCCESS(
-                    f'✓ Se archivaron {cantidad} lista(s) finalizadas con más de {dias} días'
+                    f'✓ Se archivaron {len(listas)} lista(s) finalizadas con más de {dias} días'
                 )
             )
             
-            for lista in listas_a_archivar:
+            for lista in listas:
                 self.stdout.write(f'  ✓ {lista.nombre}')
+            
+            if options['compactar']:
+                call_command('compactar_listas_archivadas', stdout=self.stdout)
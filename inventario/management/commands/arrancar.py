@@ -0,0 +1,93 @@
+"""
+Management command de arranque para producción.
+Aplica migraciones solo si hay pendientes, ejecuta collectstatic solo si cambiaron
+los archivos estáticos (huella guardada en STATIC_ROOT) y crea el superusuario inicial.
+Ejecutar: python manage.py arrancar [--forzar]
+"""
+
+import hashlib
+import io
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles.finders import get_finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+HUELLA_ESTATICOS = '.huella_estaticos'
+
+
+def migraciones_pendientes():
+    """Migraciones del grafo que aún no están en la tabla django_migrations"""
+    executor = MigrationExecutor(connection)
+    return executor.migration_plan(executor.loader.graph.leaf_nodes())
+
+
+def huella_estaticos():
+    """Huella de los archivos que recolectaría collectstatic (ruta, tamaño y fecha de modificación)"""
+    huella = hashlib.sha256(type(staticfiles_storage).__qualname__.encode())
+    archivos = []
+    for finder in get_finders():
+        for ruta, storage in finder.list(['CVS', '.*', '*~']):
+            info = Path(storage.path(ruta)).stat()
+            archivos.append(f'{ruta}|{info.st_size}|{info.st_mtime_ns}')
+    for archivo in sorted(archivos):
+        huella.update(archivo.encode())
+    return huella.hexdigest()
+
+
+class Command(BaseCommand):
+    help = 'Prepara la app para servir: migrate, collectstatic y create_admin solo cuando hacen falta'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--forzar',
+            action='store_true',
+            help='Ejecutar migrate y collectstatic aunque no haya cambios',
+        )
+
+    def _paso(self, nombre, funcion):
+        inicio = time.perf_counter()
+        detalle = funcion()
+        self.stdout.write(f'  {nombre:<14} {time.perf_counter() - inicio:>7.2f} s  {detalle}')
+
+    def _migrar(self):
+        pendientes = migraciones_pendientes()
+        if not pendientes and not self.forzar:
+            return 'sin migraciones pendientes, se omite'
+        call_command('migrate', interactive=False, verbosity=0)
+        return f'{len(pendientes)} migración(es) aplicada(s)'
+
+    def _estaticos(self):
+        destino = Path(settings.STATIC_ROOT)
+        archivo_huella = destino / HUELLA_ESTATICOS
+        huella = huella_estaticos()
+        guardada = archivo_huella.read_text().strip() if archivo_huella.exists() else None
+        manifiesto = getattr(staticfiles_storage, 'manifest_name', None)
+        completo = not manifiesto or (destino / manifiesto).exists()
+        if guardada == huella and completo and not self.forzar:
+            return 'estáticos sin cambios, se omite'
+        call_command('collectstatic', interactive=False, verbosity=0)
+        archivo_huella.write_text(huella)
+        return 'collectstatic ejecutado'
+
+    def _admin(self):
+        from django.contrib.auth import get_user_model
+
+        if get_user_model().objects.filter(is_superuser=True).exists():
+            return 'ya existe un superusuario'
+        call_command('create_admin', stdout=io.StringIO())
+        return 'superusuario creado'
+
+    def handle(self, *args, **options):
+        self.forzar = options['forzar']
+        inicio = time.perf_counter()
+        self.stdout.write('🚀 Preparando arranque')
+        self._paso('migrate', self._migrar)
+        self._paso('collectstatic', self._estaticos)
+        self._paso('create_admin', self._admin)
+        self.stdout.write(self.style.SUCCESS(f'✓ Listo para servir en {time.perf_counter() - inicio:.2f} s'))
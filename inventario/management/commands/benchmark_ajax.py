@@ -0,0 +1,191 @@
+"""
+Management command para medir la latencia de las vistas AJAX mientras corren vistas pesadas.
+Compara el modo WSGI (N workers síncronos: las peticiones AJAX esperan turno detrás
+de las pesadas) con el modo ASGI (las vistas AJAX asíncronas se atienden en el event
+loop y las pesadas en hilos). Usa el cliente de pruebas de Django dentro del proceso para
+WSGI y el ASGIHandler real para ASGI.
+Ejecutar: python manage.py benchmark_ajax [--peticiones 200] [--pesadas 4] [--clientes 4] [--workers 2] [--demora-pesada 500]
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import get_resolver, resolve, reverse
+
+from inventario.models import Material
+
+
+def _patron(resolver, funcion):
+    """URLPattern cuya vista es ``funcion`` (para poder envolverla temporalmente)"""
+    for patron in resolver.url_patterns:
+        if hasattr(patron, 'url_patterns'):
+            encontrado = _patron(patron, funcion)
+            if encontrado:
+                return encontrado
+        elif patron.callback is funcion:
+            return patron
+    return None
+
+
+def _con_demora(vista, segundos):
+    """Simula una vista pesada (exportación, reporte) sumando tiempo de E/S bloqueante"""
+    @wraps(vista)
+    def envoltura(*args, **kwargs):
+        time.sleep(segundos)
+        return vista(*args, **kwargs)
+    return envoltura
+
+
+def _percentiles(tiempos):
+    tiempos = sorted(tiempos)
+    p50 = tiempos[len(tiempos) // 2] * 1000
+    p99 = tiempos[min(int(len(tiempos) * 0.99), len(tiempos) - 1)] * 1000
+    return p50, p99
+
+
+class Command(BaseCommand):
+    help = 'Latencia de las vistas AJAX con vistas pesadas en curso, en modo WSGI y ASGI'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--peticiones', type=int, default=200, help='Peticiones AJAX por modo (default: 200)')
+        parser.add_argument('--pesadas', type=int, default=4, help='Peticiones pesadas simultáneas (default: 4)')
+        parser.add_argument('--clientes', type=int, default=4, help='Clientes AJAX concurrentes (default: 4)')
+        parser.add_argument('--workers', type=int, default=2, help='Workers síncronos del modo WSGI (default: 2)')
+        parser.add_argument(
+            '--demora-pesada',
+            type=float,
+            default=500,
+            help='Milisegundos extra que tarda cada vista pesada (default: 500)',
+        )
+        parser.add_argument('--ruta-pesada', help='Ruta de la vista pesada (default: exportación de efectivo)')
+        parser.add_argument('--ruta-ajax', help='Ruta AJAX a medir (default: info del primer material activo)')
+
+    def handle(self, *args, **options):
+        usuario = get_user_model().objects.filter(is_superuser=True).first()
+        if usuario is None:
+            raise CommandError('Se necesita un superusuario para autenticar las peticiones')
+        ruta_ajax = options['ruta_ajax']
+        if not ruta_ajax:
+            material = Material.objects.filter(activo=True).first()
+            if material is None:
+                raise CommandError('No hay materiales activos; indique --ruta-ajax')
+            ruta_ajax = reverse('inventario:obtener_info_material', args=[material.id])
+        ruta_pesada = options['ruta_pesada'] or reverse('inventario:exportar_excel_efectivo')
+
+        patron = _patron(get_resolver(), resolve(ruta_pesada).func)
+        vista_original = patron.callback if patron else None
+        if patron and options['demora_pesada']:
+            patron.callback = _con_demora(vista_original, options['demora_pesada'] / 1000)
+
+        self.stdout.write(
+            f'🧪 AJAX {ruta_ajax} × {options["peticiones"]} con {options["pesadas"]} peticiones a {ruta_pesada} '
+            f'(+{options["demora_pesada"]:.0f} ms)'
+        )
+        self.stdout.write(f'  {"Modo":<22} {"AJAX p50 ms":>12} {"AJAX p99 ms":>12} {"total s":>9}')
+        try:
+            with override_settings(ALLOWED_HOSTS=['*']):
+                cliente = Client()
+                cliente.force_login(usuario)
+                for nombre, medir in (
+                    (f'wsgi ({options["workers"]} workers)', self._medir_wsgi),
+                    ('asgi', self._medir_asgi),
+                ):
+                    inicio = time.perf_counter()
+                    tiempos = medir(cliente.cookies, ruta_ajax, ruta_pesada, options)
+                    total = time.perf_counter() - inicio
+                    p50, p99 = _percentiles(tiempos)
+                    self.stdout.write(f'  {nombre:<22} {p50:>12.1f} {p99:>12.1f} {total:>9.2f}')
+                cliente.logout()
+        finally:
+            if patron:
+                patron.callback = vista_original
+            connections.close_all()
+
+        self.stdout.write(self.style.SUCCESS('✓ Benchmark terminado'))
+
+    def _medir_wsgi(self, cookies, ruta_ajax, ruta_pesada, options):
+        """Cola compartida por N workers síncronos: las pesadas llegan primero"""
+        def peticion(ruta, llegada):
+            try:
+                cliente = Client()
+                cliente.cookies = cookies
+                respuesta = cliente.get(ruta)
+                if respuesta.status_code != 200:
+                    raise CommandError(f'{ruta} respondió {respuesta.status_code}')
+                return time.perf_counter() - llegada
+            finally:
+                connections.close_all()
+
+        clientes = max(options['clientes'], 1)
+        with ThreadPoolExecutor(max_workers=max(options['workers'], 1)) as workers:
+            pesadas = [workers.submit(peticion, ruta_pesada, time.perf_counter()) for _ in range(options['pesadas'])]
+
+            def cliente_ajax(_):
+                # Cada cliente espera su respuesta antes de mandar la siguiente petición
+                return [
+                    workers.submit(peticion, ruta_ajax, time.perf_counter()).result()
+                    for _ in range(options['peticiones'] // clientes)
+                ]
+
+            with ThreadPoolExecutor(max_workers=clientes) as navegadores:
+                tiempos = [t for lote in navegadores.map(cliente_ajax, range(clientes)) for t in lote]
+            for pesada in pesadas:
+                pesada.result()
+            return tiempos
+
+    def _medir_asgi(self, cookies, ruta_ajax, ruta_pesada, options):
+        """Un event loop con el ASGIHandler real de Django atendiendo todo a la vez"""
+        # El AsyncClient de pruebas no abre un ThreadSensitiveContext por petición y
+        # serializaría las vistas síncronas; aquí se invoca la aplicación ASGI directamente
+        aplicacion = get_asgi_application()
+        clientes = max(options['clientes'], 1)
+        cookie = '; '.join(f'{nombre}={morsel.value}' for nombre, morsel in cookies.items())
+
+        async def peticion(ruta):
+            ruta, _, consulta = ruta.partition('?')
+            alcance = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+                'method': 'GET', 'scheme': 'http', 'path': ruta, 'raw_path': ruta.encode(),
+                'root_path': '', 'query_string': consulta.encode(),
+                'headers': [(b'host', b'localhost'), (b'cookie', cookie.encode())],
+                'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+            }
+            cuerpo_enviado = asyncio.Event()
+            respuesta = {}
+
+            async def recibir():
+                if not cuerpo_enviado.is_set():
+                    cuerpo_enviado.set()
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                await asyncio.Event().wait()  # El cliente nunca se desconecta
+
+            async def enviar(mensaje):
+                if mensaje['type'] == 'http.response.start':
+                    respuesta['status'] = mensaje['status']
+
+            llegada = time.perf_counter()
+            await aplicacion(alcance, recibir, enviar)
+            if respuesta.get('status') != 200:
+                raise CommandError(f'{ruta} respondió {respuesta.get("status")}')
+            return time.perf_counter() - llegada
+
+        async def carga():
+            pesadas = [asyncio.create_task(peticion(ruta_pesada)) for _ in range(options['pesadas'])]
+            await asyncio.sleep(0)
+
+            async def cliente_ajax():
+                return [await peticion(ruta_ajax) for _ in range(options['peticiones'] // clientes)]
+
+            lotes = await asyncio.gather(*(cliente_ajax() for _ in range(clientes)))
+            await asyncio.gather(*pesadas)
+            return [t for lote in lotes for t in lote]
+
+        return asyncio.run(carga())
@@ -0,0 +1,91 @@
+"""
+Management command para medir el arranque en frío de la aplicación.
+Cada repetición es un intérprete nuevo que mide la importación de settings,
+django.setup() y la carga de la aplicación WSGI; con --detalle muestra los
+módulos más lentos según ``python -X importtime``.
+Ejecutar: python manage.py benchmark_arranque [--repeticiones 5] [--detalle 10]
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+MEDICION = '''
+import json, os, time
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', {modulo!r})
+inicio = time.perf_counter()
+import importlib
+importlib.import_module(os.environ['DJANGO_SETTINGS_MODULE'])
+fases = {{'settings': time.perf_counter() - inicio}}
+marca = time.perf_counter()
+import django
+django.setup()
+fases['django.setup'] = time.perf_counter() - marca
+marca = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+fases['wsgi + urls'] = time.perf_counter() - marca
+fases['total'] = time.perf_counter() - inicio
+print(json.dumps(fases))
+'''
+
+
+def _interprete(argumentos):
+    """Ejecuta un intérprete limpio en la raíz del proyecto"""
+    return subprocess.run(
+        [sys.executable, *argumentos],
+        cwd=settings.BASE_DIR,
+        capture_output=True,
+        text=True,
+    )
+
+
+class Command(BaseCommand):
+    help = 'Mide el tiempo de arranque en frío (settings, django.setup, WSGI y URLs)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=5, help='Intérpretes a medir (default: 5)')
+        parser.add_argument(
+            '--detalle',
+            type=int,
+            default=0,
+            help='Mostrar los N módulos con mayor tiempo de importación acumulado',
+        )
+
+    def handle(self, *args, **options):
+        codigo = MEDICION.format(modulo=settings.SETTINGS_MODULE)
+        mediciones = []
+        for _ in range(max(options['repeticiones'], 1)):
+            proceso = _interprete(['-c', codigo])
+            if proceso.returncode:
+                raise CommandError(f'El arranque falló:\n{proceso.stderr}')
+            mediciones.append(json.loads(proceso.stdout.strip().splitlines()[-1]))
+
+        self.stdout.write(f'⏱️  Arranque en frío · {len(mediciones)} repeticiones')
+        self.stdout.write(f'  {"Fase":<14} {"mín ms":>9} {"mediana ms":>11} {"máx ms":>9}')
+        for fase in mediciones[0]:
+            tiempos = [m[fase] * 1000 for m in mediciones]
+            self.stdout.write(
+                f'  {fase:<14} {min(tiempos):>9.1f} {statistics.median(tiempos):>11.1f} {max(tiempos):>9.1f}'
+            )
+
+        if options['detalle']:
+            proceso = _interprete(['-X', 'importtime', '-c', codigo])
+            modulos = []
+            for linea in proceso.stderr.splitlines():
+                if not linea.startswith('import time:') or '|' not in linea:
+                    continue
+                _, acumulado, nombre = linea[len('import time:'):].split('|')
+                if acumulado.strip().isdigit():
+                    modulos.append((int(acumulado), nombre.strip()))
+            self.stdout.write('\n📦 Módulos con mayor tiempo de importación acumulado')
+            for microsegundos, nombre in sorted(modulos, reverse=True)[:options['detalle']]:
+                self.stdout.write(f'  {microsegundos / 1000:>9.1f} ms  {nombre}')
+
+        self.stdout.write(self.style.SUCCESS('✓ Benchmark terminado'))
@@ -0,0 +1,126 @@
+"""
+Management command para comparar el manejo de conexiones a la base de datos.
+Simula el ciclo de una petición (request_started → consulta → request_finished)
+con conexiones por petición, persistentes y, en PostgreSQL con psycopg 3, con pool.
+Ejecutar: python manage.py benchmark_conexiones [--peticiones 500] [--hilos 4] [--latencia-conexion 20]
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connection, connections
+
+from inventario.models import Material
+
+MODOS = {
+    'por_peticion': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+    'persistente': {'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': True},
+    'pool': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False},
+}
+
+
+def _pool_disponible():
+    """El pool de Django solo existe para PostgreSQL con psycopg 3 y psycopg_pool"""
+    if connection.vendor != 'postgresql':
+        return False
+    try:
+        import psycopg  # noqa: F401
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _peticion():
+    """Una petición mínima: abre/reusa la conexión según la configuración y hace una consulta"""
+    inicio = time.perf_counter()
+    request_started.send(sender=None)
+    try:
+        list(Material.objects.values_list('id', flat=True)[:20])
+    finally:
+        request_finished.send(sender=None)
+    return time.perf_counter() - inicio
+
+
+def _trabajador(peticiones):
+    try:
+        return [_peticion() for _ in range(peticiones)]
+    finally:
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Compara peticiones/s y p99 con conexiones por petición, persistentes y con pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--peticiones', type=int, default=500, help='Peticiones por modo (default: 500)')
+        parser.add_argument('--hilos', type=int, default=4, help='Peticiones concurrentes (default: 4)')
+        parser.add_argument(
+            '--latencia-conexion',
+            type=float,
+            default=0,
+            help='Milisegundos extra al abrir cada conexión, para simular una base remota con SQLite',
+        )
+        parser.add_argument('--pool-max', type=int, default=10, help='Tamaño máximo del pool (default: 10)')
+
+    def handle(self, *args, **options):
+        ajustes = connections.settings['default']
+        originales = {
+            'CONN_MAX_AGE': ajustes.get('CONN_MAX_AGE', 0),
+            'CONN_HEALTH_CHECKS': ajustes.get('CONN_HEALTH_CHECKS', False),
+            'OPTIONS': dict(ajustes.get('OPTIONS', {})),
+        }
+        modos = ['por_peticion', 'persistente']
+        if _pool_disponible():
+            modos.append('pool')
+        else:
+            self.stdout.write('ℹ️  Pool omitido: requiere PostgreSQL con psycopg 3 y psycopg_pool')
+
+        latencia = options['latencia_conexion'] / 1000
+        clase = type(connections['default'])
+        conectar = clase.get_new_connection
+        if latencia:
+            def conectar_lento(self, conn_params):
+                time.sleep(latencia)
+                return conectar(self, conn_params)
+            clase.get_new_connection = conectar_lento
+
+        self.stdout.write(
+            f'🔌 {connection.vendor} · {options["peticiones"]} peticiones por modo · '
+            f'{options["hilos"]} hilos · latencia de conexión {options["latencia_conexion"]:.0f} ms'
+        )
+        self.stdout.write(f'  {"Modo":<14} {"pet/s":>10} {"p50 ms":>9} {"p99 ms":>9}')
+
+        try:
+            for modo in modos:
+                connections.close_all()
+                ajustes.update(MODOS[modo])
+                ajustes['OPTIONS'] = dict(originales['OPTIONS'])
+                if modo == 'pool':
+                    ajustes['OPTIONS']['pool'] = {'min_size': options['hilos'], 'max_size': options['pool_max']}
+                else:
+                    ajustes['OPTIONS'].pop('pool', None)
+
+                _trabajador(options['hilos'])  # Calentamiento (y llenado del pool)
+
+                hilos = max(options['hilos'], 1)
+                por_hilo = max(options['peticiones'] // hilos, 1)
+                inicio = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+                    tiempos = sorted(t for lote in ejecutor.map(_trabajador, [por_hilo] * hilos) for t in lote)
+                total = time.perf_counter() - inicio
+
+                p50 = tiempos[len(tiempos) // 2] * 1000
+                p99 = tiempos[min(int(len(tiempos) * 0.99), len(tiempos) - 1)] * 1000
+                self.stdout.write(f'  {modo:<14} {len(tiempos) / total:>10,.0f} {p50:>9.2f} {p99:>9.2f}')
+
+                if modo == 'pool':
+                    connection.close_pool()
+        finally:
+            clase.get_new_connection = conectar
+            connections.close_all()
+            ajustes.update(originales)
+
+        self.stdout.write(self.style.SUCCESS('✓ Benchmark terminado'))
@@ -0,0 +1,80 @@
+"""
+Management command para medir el tiempo del solver de plan de compras.
+No toca la base de datos: genera catálogos sintéticos en memoria.
+Ejecutar: python manage.py benchmark_plan_compras [--materiales 500] [--presentaciones 4]
+"""
+
+import random
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from inventario.models import Material, PresentacionMaterial
+from inventario.plan_compras import estadisticas_cache, limpiar_cache, plan_compra
+
+
+class Command(BaseCommand):
+    help = 'Mide el tiempo del solver de compras con planes grandes generados al azar'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--materiales', type=int, default=500, help='Materiales en el plan (default: 500)')
+        parser.add_argument('--presentaciones', type=int, default=4, help='Presentaciones por material (default: 4)')
+        parser.add_argument('--faltante-max', type=int, default=20000, help='Faltante máximo en unidad base (default: 20000)')
+        parser.add_argument('--repeticiones', type=int, default=3, help='Veces que se resuelve el mismo plan (default: 3)')
+        parser.add_argument('--semilla', type=int, default=42)
+
+    def handle(self, *args, **options):
+        aleatorio = random.Random(options['semilla'])
+
+        plan = []
+        for i in range(options['materiales']):
+            material = Material(
+                id=i + 1,
+                codigo=f'B{i:04d}',
+                nombre=f'Material {i}',
+                unidad_base='cm',
+                factor_conversion=1000,
+                precio_compra=Decimal('50'),
+            )
+            presentaciones = [
+                PresentacionMaterial(
+                    material=material,
+                    proveedor=f'Proveedor {p}',
+                    nombre=f'Rollo {tamano} cm',
+                    contenido=Decimal(tamano),
+                    precio=Decimal(tamano) * Decimal(aleatorio.uniform(0.03, 0.08)).quantize(Decimal('0.001')),
+                    disponibles=aleatorio.choice([None, 5, 10, 50]),
+                )
+                for p, tamano in enumerate(aleatorio.sample([250, 500, 1000, 2500, 5000, 10000], options['presentaciones']))
+            ]
+            faltante = Decimal(aleatorio.randint(1, options['faltante_max']))
+            plan.append((material, faltante, presentaciones))
+
+        limpiar_cache()
+        self.stdout.write(
+            f"📦 Plan: {options['materiales']} materiales × {options['presentaciones']} presentaciones "
+            f"(faltante ≤ {options['faltante_max']})"
+        )
+
+        for repeticion in range(1, options['repeticiones'] + 1):
+            inicio = time.perf_counter()
+            costo_total = Decimal('0')
+            incompletos = 0
+            for material, faltante, presentaciones in plan:
+                resultado = plan_compra(material, faltante, presentaciones)
+                costo_total += resultado['costo_total']
+                incompletos += not resultado['completo']
+            duracion = time.perf_counter() - inicio
+
+            etiqueta = 'en frío' if repeticion == 1 else 'memorizado'
+            self.stdout.write(
+                f'  ⏱️  Corrida {repeticion} ({etiqueta}): {duracion * 1000:.1f} ms '
+                f'({duracion * 1000 / len(plan):.3f} ms/material) - costo ${costo_total:,.2f}, '
+                f'{incompletos} sin cobertura completa'
+            )
+
+        info = estadisticas_cache()
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Cache del solver: {info.hits} aciertos, {info.misses} fallos, {info.currsize} entradas'
+        ))
@@ -0,0 +1,47 @@
+"""
+Management command para medir el tiempo de ajuste del pronóstico de demanda.
+No toca la base de datos: genera series semanales sintéticas en memoria.
+Ejecutar: python manage.py benchmark_pronostico [--monos 1000] [--semanas 156]
+"""
+
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from inventario.pronostico import ajustar
+
+
+class Command(BaseCommand):
+    help = 'Mide el tiempo de ajuste de los modelos de pronóstico para muchos moños'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--monos', type=int, default=1000, help='Moños simulados (default: 1000)')
+        parser.add_argument('--semanas', type=int, default=156, help='Semanas de historia (default: 156)')
+        parser.add_argument('--horizonte', type=int, default=4, help='Semanas a pronosticar (default: 4)')
+        parser.add_argument('--repeticiones', type=int, default=3)
+        parser.add_argument('--semilla', type=int, default=42)
+
+    def handle(self, *args, **options):
+        aleatorio = np.random.default_rng(options['semilla'])
+        monos, semanas = options['monos'], options['semanas']
+
+        # Demanda base por moño con tendencia y temporada anual
+        base = aleatorio.uniform(0, 30, (monos, 1))
+        tiempo = np.arange(semanas)[None, :]
+        temporada = 1 + 0.4 * np.sin(2 * np.pi * tiempo / 52 + aleatorio.uniform(0, 2 * np.pi, (monos, 1)))
+        tendencia = 1 + aleatorio.normal(0, 0.002, (monos, 1)) * tiempo
+        serie = aleatorio.poisson(np.clip(base * temporada * tendencia, 0, None)).astype(float)
+
+        self.stdout.write(f'📈 Serie: {monos} moños × {semanas} semanas, horizonte {options["horizonte"]}')
+
+        for repeticion in range(1, options['repeticiones'] + 1):
+            inicio = time.perf_counter()
+            resultado = ajustar(serie, options['horizonte'])
+            duracion = time.perf_counter() - inicio
+            self.stdout.write(f'  ⏱️  Corrida {repeticion}: {duracion * 1000:.1f} ms')
+
+        conteo = np.bincount(resultado['mejor'], minlength=len(resultado['modelos']))
+        self.stdout.write(self.style.SUCCESS('✓ Modelo elegido por moño:'))
+        for nombre, cantidad in zip(resultado['modelos'], conteo):
+            self.stdout.write(f'  {nombre:<35} {cantidad:>6}')
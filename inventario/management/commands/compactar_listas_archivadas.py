@@ -0,0 +1,69 @@
+"""
+Management command para mover las listas archivadas al almacenamiento compacto.
+Ejecutar: python manage.py compactar_listas_archivadas [--lote 200] [--dry-run]
+"""
+
+from django.core.management.base import BaseCommand
+
+from inventario.archivo_listas import compactar_listas
+from inventario.models import ListaProduccion
+
+
+class Command(BaseCommand):
+    help = 'Guarda las listas archivadas como snapshot comprimido y libera sus filas de detalle'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=200,
+            help='Listas por transacción (default: 200)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Mostrar cuántas listas se compactarían sin hacer cambios',
+        )
+
+    def handle(self, *args, **options):
+        lote = max(1, options['lote'])
+        pendientes = ListaProduccion.objects.filter(
+            estado='archivado',
+            archivo__isnull=True
+        ).order_by('id')
+
+        if options['dry_run']:
+            self.stdout.write(
+                self.style.WARNING(f'[DRY RUN] Se compactarían {pendientes.count()} lista(s) archivada(s)')
+            )
+            return
+
+        total_listas = 0
+        total_filas = 0
+        total_bytes = 0
+        ultimo_id = 0
+
+        while True:
+            ids = list(
+                pendientes.filter(id__gt=ultimo_id).values_list('id', flat=True)[:lote]
+            )
+            if not ids:
+                break
+            ultimo_id = ids[-1]
+
+            listas, filas, tamano = compactar_listas(ids)
+            total_listas += listas
+            total_filas += filas
+            total_bytes += tamano
+            self.stdout.write(f'  📦 Lote hasta #{ultimo_id}: {listas} lista(s), {filas} fila(s) liberadas')
+
+        if total_listas == 0:
+            self.stdout.write(self.style.SUCCESS('✓ No hay listas archivadas pendientes de compactar'))
+            return
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✓ Se compactaron {total_listas} lista(s): {total_filas} fila(s) eliminadas de las '
+                f'tablas activas, {total_bytes / 1024:.1f} KB en snapshots'
+            )
+        )
@@ -0,0 +1,43 @@
+"""
+Management command para calcular el costo real de listas ya finalizadas.
+Ejecutar: python manage.py costear_listas [--recalcular]
+"""
+
+from django.core.management.base import BaseCommand
+
+from inventario.costo_real import costear_listas
+from inventario.models import ListaProduccion
+
+
+class Command(BaseCommand):
+    help = 'Calcula el costo real (movimientos de producción) de las listas finalizadas y archivadas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recalcular',
+            action='store_true',
+            help='Recalcular también las listas que ya tienen costo real',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=200,
+            help='Listas por transacción (default: 200)',
+        )
+
+    def handle(self, *args, **options):
+        listas = ListaProduccion.objects.filter(estado__in=['finalizado', 'archivado']).order_by('id')
+        if not options['recalcular']:
+            listas = listas.filter(costo_real__isnull=True)
+
+        ids = list(listas.values_list('id', flat=True))
+        self.stdout.write(f'📋 {len(ids)} lista(s) por costear')
+
+        costeadas = 0
+        for inicio in range(0, len(ids), options['lote']):
+            grupo = ListaProduccion.objects.filter(id__in=ids[inicio:inicio + options['lote']])
+            costeadas += sum(1 for lista in costear_listas(grupo) if lista.costo_real is not None)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ {costeadas} lista(s) con costo real; {len(ids) - costeadas} sin movimientos de producción')
+        )
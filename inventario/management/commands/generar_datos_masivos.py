@@ -0,0 +1,454 @@
+"""
+Management command para generar volúmenes de datos parecidos a producción.
+Crea materiales, moños con receta, listas de producción en todos los estados
+con su bitácora de transiciones, movimientos de inventario y de efectivo con cadenas de existencias y saldo
+consistentes, y ventas repartidas en varios años. Usa bulk_create por lotes y una
+semilla fija: con la misma semilla, opciones y día de ejecución genera los mismos
+datos. Todo lo generado lleva el prefijo GM (códigos y nombres) y --limpiar lo borra.
+Ejecutar: python manage.py generar_datos_masivos [--materiales 300] [--monos 1000] [--listas 5000] [--movimientos 1000000] [--movimientos-efectivo 1000000] [--ventas 500000] [--anios 3] [--semilla 42] [--limpiar]
+"""
+
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from inventario.models import (DetalleListaMonos, ListaProduccion, Material, Monos, Movimiento, MovimientoEfectivo,
+                               RecetaMonos, ResumenMateriales, TransicionListaProduccion, VentaDiaria, VentaMonos,
+                               VersionDatos)
+
+PREFIJO = 'GM'
+CATEGORIAS_MATERIAL = ('listón', 'piedra', 'adorno', 'broche', 'tela', 'encaje')
+ESTADOS = [estado for estado, _ in ListaProduccion.ESTADO_CHOICES]
+ESTADOS_COMPRADOS = {'comprado', 'reabastecido', 'en_produccion', 'en_salida', 'finalizado', 'archivado'}
+ESTADOS_PRODUCIDOS = {'en_salida', 'finalizado', 'archivado'}
+# Etapas que se saltan las listas con materiales suficientes (borrador -> reabastecido)
+ETAPAS_DE_COMPRA = ('pendiente_compra', 'comprado')
+EGRESOS = (('inventario', 40), ('produccion', 20), ('sueldo', 15), ('renta', 5), ('servicio', 10), ('otro_gasto', 10))
+MODELOS_VERSIONADOS = ('Material', 'Movimiento', 'Monos', 'RecetaMonos', 'Simulacion', 'ListaProduccion', 'VentaMonos', 'MovimientoEfectivo')
+
+
+def _decimal(centesimos):
+    """Entero en centésimos a Decimal con dos decimales"""
+    return Decimal(centesimos).scaleb(-2)
+
+
+@contextmanager
+def _fechas_manuales(*modelos):
+    """Desactiva auto_now/auto_now_add para que bulk_create guarde las fechas generadas"""
+    campos = [
+        (campo, campo.auto_now, campo.auto_now_add)
+        for modelo in modelos
+        for campo in modelo._meta.concrete_fields
+        if getattr(campo, 'auto_now', False) or getattr(campo, 'auto_now_add', False)
+    ]
+    for campo, _, _ in campos:
+        campo.auto_now = campo.auto_now_add = False
+    try:
+        yield
+    finally:
+        for campo, auto_now, auto_now_add in campos:
+            campo.auto_now, campo.auto_now_add = auto_now, auto_now_add
+
+
+def _borrar(consulta):
+    """DELETE directo de las filas de ``consulta``, sin cargarlas ni enviar señales"""
+    modelo = consulta.model
+    subconsulta, parametros = consulta.values('pk').query.sql_with_params()
+    tabla = connection.ops.quote_name(modelo._meta.db_table)
+    columna = connection.ops.quote_name(modelo._meta.pk.column)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {tabla} WHERE {columna} IN ({subconsulta})', parametros)
+        return cursor.rowcount
+
+
+class Command(BaseCommand):
+    help = 'Genera datos sintéticos a escala de producción (bulk_create por lotes, semilla fija)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--materiales', type=int, default=300, help='Materiales (default: 300)')
+        parser.add_argument('--monos', type=int, default=1000, help='Moños con receta (default: 1000)')
+        parser.add_argument('--listas', type=int, default=5000, help='Listas de producción (default: 5000)')
+        parser.add_argument('--movimientos', type=int, default=1_000_000, help='Movimientos de inventario (default: 1000000)')
+        parser.add_argument(
+            '--movimientos-efectivo',
+            type=int,
+            default=1_000_000,
+            help='Movimientos de efectivo (default: 1000000)',
+        )
+        parser.add_argument('--ventas', type=int, default=500_000, help='Ventas de moños (default: 500000)')
+        parser.add_argument('--anios', type=int, default=3, help='Años hacia atrás que cubren los datos (default: 3)')
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--lote', type=int, default=5000, help='Filas por bulk_create (default: 5000)')
+        parser.add_argument('--limpiar', action='store_true', help='Borrar antes los datos generados (prefijo GM)')
+
+    def handle(self, *args, **options):
+        Usuario = get_user_model()
+        usuario = Usuario.objects.filter(is_superuser=True).order_by('id').first()
+        if usuario is None:
+            # Base de datos vacía para benchmarks: autor inactivo, sin acceso al sistema
+            usuario, _ = Usuario.objects.get_or_create(username='datos_masivos', defaults={'is_active': False})
+        if options['materiales'] < 1 and (options['monos'] or options['movimientos']):
+            raise CommandError('Se necesita al menos un material para generar moños o movimientos')
+
+        if options['limpiar']:
+            self._limpiar()
+        elif Material.objects.filter(codigo__startswith=PREFIJO).exists():
+            raise CommandError(f'Ya hay datos generados (códigos {PREFIJO}...); use --limpiar para reemplazarlos')
+
+        self.aleatorio = random.Random(options['semilla'])
+        self.lote = max(options['lote'], 1)
+        self.usuario = usuario
+        # Fechas relativas al inicio del día: la misma semilla da los mismos datos todo el día
+        self.fin = timezone.make_aware(datetime.combine(timezone.localdate(), datetime.min.time()))
+        self.inicio = self.fin - timedelta(days=365 * max(options['anios'], 1))
+
+        self.stdout.write(
+            f'🏭 Generando datos de {self.inicio:%d/%m/%Y} a {self.fin:%d/%m/%Y} (semilla {options["semilla"]})'
+        )
+        inicio_total = time.perf_counter()
+        with _fechas_manuales(Material, Monos, ListaProduccion, Movimiento, MovimientoEfectivo, VentaMonos):
+            materiales = self._paso('Materiales', self._materiales, options['materiales'])
+            monos = self._paso('Moños y recetas', self._monos, materiales, options['monos'])
+            listas = self._paso('Listas de producción', self._listas, monos, options['listas'])
+            self._paso('Bitácora de transiciones', self._transiciones, listas)
+            self._paso('Movimientos de inventario', self._movimientos, materiales, listas, options['movimientos'])
+            self._paso('Movimientos de efectivo', self._movimientos_efectivo, options['movimientos_efectivo'])
+            self._paso('Ventas de moños', self._ventas, monos, listas, options['ventas'])
+
+        self._paso('Resumen diario de ventas', lambda: VentaDiaria.reconstruir(desde=self.inicio.date()))
+        # bulk_create no dispara señales: se invalidan a mano ETags y caches del catálogo
+        VersionDatos.incrementar(*MODELOS_VERSIONADOS)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Datos generados en {time.perf_counter() - inicio_total:.1f} s'
+        ))
+
+    def _paso(self, nombre, funcion, *args):
+        inicio = time.perf_counter()
+        resultado = funcion(*args)
+        duracion = time.perf_counter() - inicio
+        filas = resultado if isinstance(resultado, int) else len(resultado)
+        self.stdout.write(
+            f'  ✓ {nombre}: {filas:,} filas en {duracion:.1f} s ({filas / duracion if duracion else 0:,.0f} filas/s)'
+        )
+        return resultado
+
+    def _fechas(self, cantidad, inicio=None):
+        """``cantidad`` fechas crecientes repartidas entre ``inicio`` y el fin del periodo"""
+        inicio = inicio or self.inicio
+        paso = (self.fin - inicio).total_seconds() / max(cantidad, 1)
+        for i in range(cantidad):
+            yield inicio + timedelta(seconds=paso * (i + self.aleatorio.random()))
+
+    def _en_lotes(self, modelo, objetos):
+        """bulk_create de un iterable en lotes, cada uno en su transacción"""
+        total = 0
+        lote = []
+        for objeto in objetos:
+            lote.append(objeto)
+            if len(lote) >= self.lote:
+                with transaction.atomic():
+                    modelo.objects.bulk_create(lote)
+                total += len(lote)
+                lote = []
+        if lote:
+            with transaction.atomic():
+                modelo.objects.bulk_create(lote)
+            total += len(lote)
+        return total
+
+    def _materiales(self, cantidad):
+        aleatorio = self.aleatorio
+        materiales = []
+        for i in range(cantidad):
+            categoria = aleatorio.choice(CATEGORIAS_MATERIAL)
+            rollo = categoria in ('listón', 'tela', 'encaje')
+            materiales.append(Material(
+                codigo=f'{PREFIJO}{i:05d}',
+                nombre=f'{categoria.capitalize()} {PREFIJO}-{i}',
+                tipo_material='rollo' if rollo else 'paquete',
+                unidad_base='cm' if rollo else 'unidades',
+                factor_conversion=aleatorio.choice((500, 1000, 2000, 5000) if rollo else (10, 25, 50, 100)),
+                cantidad_disponible=Decimal('0'),
+                precio_compra=_decimal(aleatorio.randint(1500, 25000)),
+                categoria=categoria,
+                fecha_creacion=self.inicio,
+                fecha_modificacion=self.inicio,
+            ))
+        return Material.objects.bulk_create(materiales, batch_size=self.lote)
+
+    def _monos(self, materiales, cantidad):
+        aleatorio = self.aleatorio
+        monos = []
+        recetas = []
+        for i in range(cantidad):
+            ingredientes = aleatorio.sample(materiales, min(len(materiales), aleatorio.randint(2, 6)))
+            receta = [
+                (material, aleatorio.randint(10, 80) if material.unidad_base == 'cm' else aleatorio.randint(1, 12))
+                for material in ingredientes
+            ]
+            costo = sum(material.costo_unitario * necesaria for material, necesaria in receta)
+            mono = Monos(
+                codigo=f'{PREFIJO}O{i:06d}',
+                nombre=f'Moño {PREFIJO}-{i}',
+                precio_venta=max(Decimal('10'), (costo * Decimal(aleatorio.uniform(1.8, 3.5))).quantize(Decimal('1'))),
+                tipo_venta=aleatorio.choice(('individual', 'par')),
+                fecha_creacion=self.inicio,
+                fecha_modificacion=self.inicio,
+            )
+            mono.costo = costo.quantize(Decimal('0.01'))
+            mono.receta = receta
+            monos.append(mono)
+        Monos.objects.bulk_create(monos, batch_size=self.lote)
+        for mono in monos:
+            recetas.extend(
+                RecetaMonos(monos=mono, material=material, cantidad_necesaria=Decimal(necesaria))
+                for material, necesaria in mono.receta
+            )
+        self._en_lotes(RecetaMonos, recetas)
+        return monos
+
+    def _listas(self, monos, cantidad):
+        aleatorio = self.aleatorio
+        listas = []
+        for i, fecha in enumerate(self._fechas(cantidad)):
+            estado = ESTADOS[i % len(ESTADOS)]
+            detalles = [
+                (mono, aleatorio.randint(5, 60))
+                for mono in aleatorio.sample(monos, min(len(monos), aleatorio.randint(1, 5)))
+            ]
+            producido = estado in ESTADOS_PRODUCIDOS
+            planificados = sum(cantidad * (2 if mono.tipo_venta == 'par' else 1) for mono, cantidad in detalles)
+            costo = sum(mono.costo * cantidad for mono, cantidad in detalles)
+            ganancia = sum((mono.precio_venta - mono.costo) * cantidad for mono, cantidad in detalles)
+            lista = ListaProduccion(
+                nombre=f'[{PREFIJO}] Lista {i:06d}',
+                estado=estado,
+                fecha_creacion=fecha,
+                fecha_modificacion=min(fecha + timedelta(days=aleatorio.randint(0, 20)), self.fin),
+                usuario_creador=self.usuario,
+                total_moños_planificados=planificados,
+                total_moños_producidos=planificados if producido else 0,
+                costo_total_estimado=costo,
+                ganancia_estimada=ganancia,
+            )
+            if estado in ('finalizado', 'archivado'):
+                lista.costo_real = (costo * Decimal(aleatorio.uniform(0.95, 1.1))).quantize(Decimal('0.01'))
+                lista.ganancia_real = costo + ganancia - lista.costo_real
+            lista.detalles = detalles
+            listas.append(lista)
+
+        # El resumen de materiales se arma antes de guardar para conocer los faltantes
+        resumenes = []
+        for lista in listas:
+            necesarias = {}
+            for mono, cantidad in lista.detalles:
+                moños = cantidad * (2 if mono.tipo_venta == 'par' else 1)
+                for material, necesaria in mono.receta:
+                    necesarias[material] = necesarias.get(material, 0) + necesaria * moños
+            comprado = lista.estado in ESTADOS_COMPRADOS
+            lista.resumen = []
+            for material, necesaria in necesarias.items():
+                disponible = int(necesaria * aleatorio.uniform(0, 1.5))
+                faltante = max(necesaria - disponible, 0)
+                lista.resumen.append(ResumenMateriales(
+                    material=material,
+                    cantidad_necesaria=Decimal(necesaria),
+                    cantidad_disponible=Decimal(disponible),
+                    cantidad_faltante=Decimal(0 if comprado else faltante),
+                    cantidad_comprada=Decimal(faltante if comprado else 0),
+                    precio_compra_real=(material.costo_unitario * faltante).quantize(Decimal('0.01')) if comprado else 0,
+                    proveedor='Proveedor generado' if comprado and faltante else '',
+                    fecha_compra=lista.fecha_creacion + timedelta(days=1) if comprado and faltante else None,
+                    cantidad_utilizada=Decimal(necesaria if lista.estado in ESTADOS_PRODUCIDOS else 0),
+                ))
+            lista.materiales_faltantes_count = sum(1 for resumen in lista.resumen if resumen.cantidad_faltante > 0)
+            # bulk_create no llama a save(): la acción siguiente se calcula aquí
+            lista.accion_siguiente = lista.calcular_accion_siguiente()
+
+        ListaProduccion.objects.bulk_create(listas, batch_size=self.lote)
+        detalles = []
+        for lista in listas:
+            producido = lista.estado in ESTADOS_PRODUCIDOS
+            detalles.extend(
+                DetalleListaMonos(
+                    lista_produccion=lista,
+                    monos=mono,
+                    cantidad=cantidad,
+                    cantidad_producida=cantidad if producido else 0,
+                )
+                for mono, cantidad in lista.detalles
+            )
+            for resumen in lista.resumen:
+                resumen.lista_produccion = lista
+                resumenes.append(resumen)
+        self._en_lotes(DetalleListaMonos, detalles)
+        self._en_lotes(ResumenMateriales, resumenes)
+        return listas
+
+    def _transiciones(self, listas):
+        """
+        Recorrido de cada lista por la tabla TRANSICIONES hasta su estado actual, con
+        el registro inicial en su creación y el último cambio en su fecha de modificación.
+        """
+        aleatorio = self.aleatorio
+        compra = ESTADOS.index('reabastecido')
+
+        def generar():
+            for lista in listas:
+                posicion = ESTADOS.index(lista.estado)
+                camino = ESTADOS[:posicion + 1]
+                if posicion >= compra and aleatorio.random() < 0.3:
+                    camino = [estado for estado in camino if estado not in ETAPAS_DE_COMPRA]
+                segundos = (lista.fecha_modificacion - lista.fecha_creacion).total_seconds()
+                fechas = [lista.fecha_creacion] + [
+                    lista.fecha_creacion + timedelta(seconds=segundos * fraccion)
+                    for fraccion in sorted(aleatorio.random() for _ in range(len(camino) - 2))
+                ] + ([lista.fecha_modificacion] if len(camino) > 1 else [])
+                for anterior, nuevo, fecha in zip(['', *camino], camino, fechas):
+                    yield TransicionListaProduccion(
+                        lista=lista,
+                        estado_anterior=anterior,
+                        estado_nuevo=nuevo,
+                        fecha=fecha,
+                        usuario=self.usuario,
+                        nota='Lista creada' if not anterior else '',
+                    )
+
+        return self._en_lotes(TransicionListaProduccion, generar())
+
+    def _movimientos(self, materiales, listas, cantidad):
+        """Cadena de existencias por material: cantidad_anterior + cantidad = cantidad_nueva >= 0"""
+        aleatorio = self.aleatorio
+        existencias = {material.pk: 0 for material in materiales}  # En centésimos
+        costos = {material.pk: float(material.costo_unitario) for material in materiales}
+        producidas = [lista for lista in listas if lista.estado in ESTADOS_PRODUCIDOS | {'en_produccion'}]
+
+        def generar():
+            for fecha in self._fechas(cantidad):
+                material = aleatorio.choice(materiales)
+                anterior = existencias[material.pk]
+                if anterior < material.factor_conversion * 200 or aleatorio.random() < 0.2:
+                    tipo = 'entrada'
+                    delta = material.factor_conversion * aleatorio.randint(1, 10) * 100
+                else:
+                    tipo = aleatorio.choices(('produccion', 'salida', 'ajuste'), weights=(70, 25, 5))[0]
+                    delta = -aleatorio.randint(1, max(anterior // 4, 1))
+                nueva = anterior + delta
+                existencias[material.pk] = nueva
+                costo_unitario = costos[material.pk]
+                yield Movimiento(
+                    material=material,
+                    tipo_movimiento=tipo,
+                    cantidad=_decimal(delta),
+                    cantidad_anterior=_decimal(anterior),
+                    cantidad_nueva=_decimal(nueva),
+                    precio_unitario=_decimal(round(costo_unitario * 100)),
+                    costo_total_movimiento=_decimal(round(abs(delta) * costo_unitario)),
+                    detalle=f'[{PREFIJO}] {tipo}',
+                    fecha=fecha,
+                    usuario=self.usuario,
+                    lista_produccion=(
+                        aleatorio.choice(producidas) if tipo == 'produccion' and producidas and aleatorio.random() < 0.5
+                        else None
+                    ),
+                )
+
+        total = self._en_lotes(Movimiento, generar())
+        for material in materiales:
+            material.cantidad_disponible = _decimal(existencias[material.pk])
+        Material.objects.bulk_update(materiales, ['cantidad_disponible'], batch_size=self.lote)
+        return total
+
+    def _movimientos_efectivo(self, cantidad):
+        """Cadena de saldo a continuación del saldo actual: saldo_anterior ± monto = saldo_nuevo >= 0"""
+        aleatorio = self.aleatorio
+        saldo = int(MovimientoEfectivo.calcular_saldo_actual() * 100)
+        categorias_egreso = [categoria for categoria, _ in EGRESOS]
+        pesos_egreso = [peso for _, peso in EGRESOS]
+
+        def generar():
+            nonlocal saldo
+            for fecha in self._fechas(cantidad):
+                ingreso = saldo < 5_000_00 or (saldo < 1_000_000_00 and aleatorio.random() < 0.55)
+                if ingreso:
+                    categoria = 'venta' if aleatorio.random() < 0.9 else 'otro_ingreso'
+                    monto = aleatorio.randint(50_00, 3_000_00)
+                else:
+                    categoria = aleatorio.choices(categorias_egreso, weights=pesos_egreso)[0]
+                    monto = min(aleatorio.randint(50_00, 4_000_00), saldo)
+                anterior = saldo
+                saldo += monto if ingreso else -monto
+                yield MovimientoEfectivo(
+                    fecha=fecha,
+                    concepto=f'[{PREFIJO}] {categoria}',
+                    tipo_movimiento='ingreso' if ingreso else 'egreso',
+                    categoria=categoria,
+                    monto=_decimal(monto),
+                    saldo_anterior=_decimal(anterior),
+                    saldo_nuevo=_decimal(saldo),
+                    automatico=categoria in ('venta', 'inventario', 'produccion'),
+                    usuario=self.usuario,
+                )
+
+        return self._en_lotes(MovimientoEfectivo, generar())
+
+    def _ventas(self, monos, listas, cantidad):
+        """Ventas a lo largo del periodo; pocos moños concentran la mayoría (distribución de Zipf)"""
+        if not monos:
+            return 0
+        aleatorio = self.aleatorio
+        acumulados = []
+        suma = 0.0
+        for posicion in range(len(monos)):
+            suma += 1 / (posicion + 1)
+            acumulados.append(suma)
+        cerradas = [lista for lista in listas if lista.estado in ('finalizado', 'archivado')]
+
+        def generar():
+            for fecha in self._fechas(cantidad):
+                mono = aleatorio.choices(monos, cum_weights=acumulados)[0]
+                vendida = aleatorio.randint(1, 12)
+                ingreso = mono.precio_venta * vendida
+                yield VentaMonos(
+                    lista_produccion=aleatorio.choice(cerradas) if cerradas and aleatorio.random() < 0.3 else None,
+                    monos=mono,
+                    cantidad_vendida=vendida,
+                    tipo_venta=mono.tipo_venta,
+                    precio_unitario=mono.precio_venta,
+                    ingreso_total=ingreso,
+                    costo_unitario=mono.costo,
+                    ganancia_total=ingreso - mono.costo * vendida,
+                    fecha=fecha,
+                    usuario=self.usuario,
+                )
+
+        return self._en_lotes(VentaMonos, generar())
+
+    def _limpiar(self):
+        """Borra lo generado en corridas anteriores (prefijo GM)"""
+        materiales = Material.objects.filter(codigo__startswith=PREFIJO)
+        monos = Monos.objects.filter(codigo__startswith=f'{PREFIJO}O')
+        listas = ListaProduccion.objects.filter(nombre__startswith=f'[{PREFIJO}]')
+        inicio = time.perf_counter()
+        with transaction.atomic():
+            # Las tablas grandes se borran con un DELETE por tabla: delete() cargaría
+            # cada fila en memoria para enviar las señales post_delete
+            borrados = sum(_borrar(consulta) for consulta in (
+                MovimientoEfectivo.objects.filter(concepto__startswith=f'[{PREFIJO}]'),
+                VentaMonos.objects.filter(monos__in=monos),
+                VentaDiaria.objects.filter(monos__in=monos),
+                Movimiento.objects.filter(material__in=materiales),
+                TransicionListaProduccion.objects.filter(lista__in=listas),
+            ))
+            for consulta in (listas, monos, materiales):
+                borrados += consulta.delete()[0]
+            VersionDatos.incrementar(*MODELOS_VERSIONADOS)
+        self.stdout.write(f'  🗑️  Datos generados anteriores: {borrados:,} filas borradas en {time.perf_counter() - inicio:.1f} s')
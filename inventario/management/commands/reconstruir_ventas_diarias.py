@@ -0,0 +1,40 @@
+"""
+Management command para recalcular el resumen diario de ventas desde VentaMonos.
+Ejecutar: python manage.py reconstruir_ventas_diarias [--dias 30]
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from inventario.models import VentaDiaria, VentaMonos
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye la tabla VentaDiaria a partir de las ventas individuales'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=None,
+            help='Solo reconstruir los últimos N días (default: todo el historial)',
+        )
+
+    def handle(self, *args, **options):
+        desde = None
+        if options['dias']:
+            desde = timezone.localdate() - timedelta(days=options['dias'])
+            self.stdout.write(f'📅 Reconstruyendo desde {desde}')
+        else:
+            self.stdout.write('📅 Reconstruyendo todo el historial')
+
+        filas = VentaDiaria.reconstruir(desde)
+
+        ventas = VentaMonos.objects.all()
+        if desde is not None:
+            ventas = ventas.filter(fecha__date__gte=desde)
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ {ventas.count()} venta(s) resumidas en {filas} fila(s) diarias')
+        )
@@ -0,0 +1,46 @@
+"""
+Management command para reportar cuánto tiempo pasan las listas en cada etapa.
+Ejecutar: python manage.py reporte_etapas [--dias 90]
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from inventario.models import ListaProduccion
+from inventario.pasos_lista import PASO_POR_ESTADO
+from inventario.transiciones import duracion_por_estado
+
+
+class Command(BaseCommand):
+    help = 'Muestra la duración promedio de cada etapa según la bitácora de transiciones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=None,
+            help='Solo listas creadas en los últimos N días (default: todas)',
+        )
+
+    def handle(self, *args, **options):
+        listas = None
+        if options['dias']:
+            fecha_limite = timezone.now() - timedelta(days=options['dias'])
+            listas = ListaProduccion.objects.filter(fecha_creacion__gte=fecha_limite)
+
+        duraciones = duracion_por_estado(listas)
+
+        if not duraciones:
+            self.stdout.write(self.style.WARNING('⚠️ No hay etapas completadas en la bitácora'))
+            return
+
+        nombres = dict(ListaProduccion.ESTADO_CHOICES)
+        self.stdout.write(self.style.SUCCESS('📊 Duración promedio por etapa:'))
+        for estado in sorted(duraciones, key=lambda e: PASO_POR_ESTADO.get(e, 0)):
+            etapa = duraciones[estado]
+            horas = etapa['promedio'].total_seconds() / 3600
+            self.stdout.write(
+                f'  {nombres.get(estado, estado):<25} {horas:>8.1f} h  ({etapa["cantidad"]} lista(s))'
+            )
@@ -62,6 +62,15 @@ class Command(BaseCommand):
         self.stdout.write(f'   Engine: {db_config["ENGINE"]}')
         self.stdout.write(f'   Host: {db_config.get("HOST", "N/A")}')
         self.stdout.write(f'   Name: {db_config.get("NAME", "N/A")}')
+        self.stdout.write(f'   Origen: {getattr(settings, "DB_ORIGEN", "N/A")}')
+        pool = db_config.get('OPTIONS', {}).get('pool')
+        if pool:
+            self.stdout.write(f'   Pool: {pool.get("min_size")}-{pool.get("max_size")} conexiones')
+        else:
+            self.stdout.write(f'   CONN_MAX_AGE: {db_config.get("CONN_MAX_AGE", 0)} s '
+                              f'(health checks: {db_config.get("CONN_HEALTH_CHECKS", False)})')
+        for aviso in getattr(settings, 'DB_AVISOS', []):
+            self.stdout.write(self.style.WARNING(f'⚠️ {aviso}'))
         
         if 'postgresql' in db_config["ENGINE"]:
             self.stdout.write(
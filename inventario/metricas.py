@@ -0,0 +1,150 @@
+"""
+Métricas en formato de texto de Prometheus (endpoint /metrics).
+
+Los histogramas de latencia y de consultas por vista se alimentan de
+``request.metricas`` (InstrumentacionMiddleware) y los aciertos del cache de
+páginas de ``cache_vista``. Son objetos de prometheus_client: bajo gunicorn
+(gunicorn.conf.py define PROMETHEUS_MULTIPROC_DIR) cada worker escribe sus
+valores en archivos de ese directorio y el raspado los suma con
+MultiProcessCollector, así que cualquier worker que atienda /metrics devuelve
+los totales de todos y los contadores no retroceden entre raspados. Sin la
+variable (runserver, shell) se usa el registro del propio proceso.
+
+Las filas de las tablas de movimientos y los indicadores de negocio (valor del
+inventario, listas por estado, saldo) se calculan una vez por combinación de
+versiones de VersionDatos y se guardan en el cache de Django: mientras no haya
+escrituras, un raspado cuesta una consulta a la tabla de versiones, y aunque las
+haya se recalculan como mucho cada METRICAS_REFRESCO segundos. En
+PostgreSQL las filas se leen de las estadísticas de pg_class en lugar de COUNT(*).
+"""
+
+import hmac
+import os
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+
+from .models import ListaProduccion, Material, Movimiento, MovimientoEfectivo, VentaDiaria, VentaMonos, VersionDatos
+
+TOKEN = getattr(settings, 'METRICAS_TOKEN', '')
+TTL = getattr(settings, 'METRICAS_TTL', 300)
+REFRESCO = getattr(settings, 'METRICAS_REFRESCO', 30)
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+# Tablas que crecen con cada operación (libros de movimientos)
+TABLAS_LIBRO = (Movimiento, MovimientoEfectivo, VentaMonos, VentaDiaria)
+MODELOS_AGREGADOS = ('Material', 'Movimiento', 'ListaProduccion', 'VentaMonos', 'MovimientoEfectivo')
+
+CLAVE_AGREGADOS = 'metricas:agregados'
+TIPO_CONTENIDO = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCIA = Histogram(
+    'inventario_peticion_duracion_segundos', 'Duración de las peticiones por vista',
+    ['vista'], buckets=BUCKETS_SEGUNDOS,
+)
+CONSULTAS = Histogram(
+    'inventario_peticion_consultas', 'Consultas SQL por petición y vista',
+    ['vista'], buckets=BUCKETS_CONSULTAS,
+)
+CACHE_VISTAS = Counter(
+    'inventario_cache_vista', 'Peticiones a páginas cacheadas por resultado',
+    ['vista', 'resultado'],
+)
+
+
+def observar_peticion(metricas):
+    """Registra una petición medida por InstrumentacionMiddleware"""
+    vista = metricas['vista'] or 'sin_vista'
+    LATENCIA.labels(vista).observe(metricas['ms'] / 1000)
+    CONSULTAS.labels(vista).observe(metricas['consultas'])
+
+
+def registrar_cache_vista(vista, acierto):
+    """Cuenta un acierto o fallo del cache de páginas (ver cache_catalogo.cache_vista)"""
+    CACHE_VISTAS.labels(vista, 'acierto' if acierto else 'fallo').inc()
+
+
+def _registro():
+    """Registro a exportar: el agregado de todos los workers si hay directorio compartido"""
+    if not os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        return REGISTRY
+    registro = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registro)
+    return registro
+
+
+def _filas_tablas():
+    """{tabla: filas}; estimación de pg_class en PostgreSQL, COUNT(*) en el resto"""
+    tablas = [modelo._meta.db_table for modelo in TABLAS_LIBRO]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT relname, reltuples FROM pg_class WHERE relname = ANY(%s)', [tablas])
+            estimadas = {tabla: max(int(filas), 0) for tabla, filas in cursor.fetchall()}
+        return {tabla: estimadas.get(tabla, 0) for tabla in tablas}
+    return {modelo._meta.db_table: modelo.objects.count() for modelo in TABLAS_LIBRO}
+
+
+def _agregados(versiones):
+    """
+    Filas y valores de negocio. Se recalculan cuando cambian las versiones, pero
+    no más de una vez cada METRICAS_REFRESCO segundos aunque haya escrituras.
+    """
+    firma = tuple(versiones[modelo] for modelo in MODELOS_AGREGADOS)
+    guardado = cache.get(CLAVE_AGREGADOS)
+    if guardado is not None:
+        firma_guardada, calculado, datos = guardado
+        if firma_guardada == firma or time.time() - calculado < REFRESCO:
+            return datos
+
+    listas = dict(ListaProduccion.objects.values_list('estado').annotate(total=Count('id')).order_by())
+    # El saldo vigente es el del último movimiento (registrar_movimiento lo encadena)
+    saldo = MovimientoEfectivo.objects.order_by('-id').values_list('saldo_nuevo', flat=True).first()
+    datos = {
+        'filas': _filas_tablas(),
+        'valor_inventario': float(sum(m.valor_inventario for m in Material.objects.filter(activo=True))),
+        'listas': {estado: listas.get(estado, 0) for estado, _ in ListaProduccion.ESTADO_CHOICES},
+        'saldo': float(saldo or 0),
+    }
+    cache.set(CLAVE_AGREGADOS, (firma, time.time(), datos), TTL)
+    return datos
+
+
+def exportar():
+    """Texto de todas las métricas en formato de exposición de Prometheus"""
+    versiones = VersionDatos.actuales(sorted(set(MODELOS_AGREGADOS) | {'Monos', 'RecetaMonos'}))
+    agregados = _agregados(versiones)
+
+    lineas = [
+        '# HELP inventario_tabla_filas Filas de las tablas de movimientos (estimadas en PostgreSQL)',
+        '# TYPE inventario_tabla_filas gauge',
+        *(f'inventario_tabla_filas{{tabla="{tabla}"}} {filas}' for tabla, filas in agregados['filas'].items()),
+        '# HELP inventario_version_datos Escrituras acumuladas por modelo (VersionDatos)',
+        '# TYPE inventario_version_datos counter',
+        *(f'inventario_version_datos{{modelo="{modelo}"}} {version}' for modelo, version in versiones.items()),
+        '# HELP inventario_valor_inventario Valor del inventario de materiales activos',
+        '# TYPE inventario_valor_inventario gauge',
+        f'inventario_valor_inventario {agregados["valor_inventario"]:.2f}',
+        '# HELP inventario_listas_produccion Listas de producción por estado',
+        '# TYPE inventario_listas_produccion gauge',
+        *(f'inventario_listas_produccion{{estado="{estado}"}} {total}' for estado, total in agregados['listas'].items()),
+        '# HELP inventario_saldo_efectivo Saldo actual de efectivo',
+        '# TYPE inventario_saldo_efectivo gauge',
+        f'inventario_saldo_efectivo {agregados["saldo"]:.2f}',
+    ]
+    return generate_latest(_registro()).decode() + '\n'.join(lineas) + '\n'
+
+
+def vista_prometheus(request):
+    """Endpoint /metrics: token Bearer de METRICAS_TOKEN o sesión de staff"""
+    autorizacion = request.headers.get('Authorization', '')
+    con_token = bool(TOKEN) and hmac.compare_digest(autorizacion.encode(), f'Bearer {TOKEN}'.encode())
+    if not con_token and not request.user.is_staff:
+        return HttpResponseForbidden('Se requiere token de métricas o usuario staff')
+    return HttpResponse(exportar(), content_type=TIPO_CONTENIDO)
@@ -0,0 +1,293 @@
+"""
+Middleware de la app de inventario.
+
+InstrumentacionMiddleware mide cada petición (consultas SQL, tiempo de base de
+datos y de Python, tamaño de la respuesta y consultas repetidas), registra en
+el logger ``inventario.rendimiento`` las que superan los umbrales de settings,
+guarda las consultas lentas (ver consultas_lentas.py) y agrega un pie de página
+con el resumen para los superusuarios.
+
+ETagVersionesMiddleware responde 304 Not Modified sin ejecutar la vista cuando
+ninguno de los modelos de los que depende la página cambió desde que el
+navegador la recibió. El ETag (débil) combina la vista, sus argumentos, el
+usuario y su nivel, la fecha del día y las versiones de VersionDatos de los
+modelos relevantes, así que calcularlo cuesta una consulta.
+
+PerfilMiddleware corre la petición bajo cProfile cuando un superusuario la pide
+con ``?_perfil`` o la cabecera ``X-Perfil`` (ver perfilado.py).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import cProfile
+import time
+from contextlib import ExitStack
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.db import DatabaseError, connections
+from django.http import HttpResponseNotModified
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.html import escape
+from django.utils.http import parse_etags
+
+from . import consultas_lentas, metricas as metricas_prometheus, perfilado
+from .instrumentacion import RegistroConsultas, RegistroDetallado
+from .models import VersionDatos
+
+logger = logging.getLogger('inventario.rendimiento')
+
+UMBRAL_MS = getattr(settings, 'RENDIMIENTO_UMBRAL_MS', 500)
+UMBRAL_CONSULTAS = getattr(settings, 'RENDIMIENTO_UMBRAL_CONSULTAS', 30)
+UMBRAL_DUPLICADAS = getattr(settings, 'RENDIMIENTO_UMBRAL_DUPLICADAS', 5)
+PIE_SUPERUSUARIOS = getattr(settings, 'RENDIMIENTO_PIE_SUPERUSUARIOS', True)
+
+# Vista (nombre de URL) -> modelos cuyos cambios alteran la página
+VISTAS_VERSIONADAS = {
+    'inventario:home': ('Material', 'Movimiento'),
+    'inventario:lista_materiales': ('Material',),
+    'inventario:detalle_material': ('Material', 'Movimiento'),
+    'inventario:lista_monos': ('Monos', 'RecetaMonos', 'Material'),
+    'inventario:historial_movimientos': ('Movimiento', 'Material'),
+    'inventario:listas_produccion': ('ListaProduccion',),
+    'inventario:listas_archivadas': ('ListaProduccion',),
+    'inventario:contaduria_home': ('MovimientoEfectivo',),
+    'inventario:flujo_efectivo': ('MovimientoEfectivo',),
+    'inventario:estado_resultados': ('MovimientoEfectivo',),
+    'inventario:analytics_dashboard': ('VentaMonos', 'Monos'),
+    'inventario:analytics_detalle_mono': ('VentaMonos', 'Monos', 'RecetaMonos', 'Material'),
+}
+
+
+def _semilla_despliegue():
+    """Cambia con cada despliegue (plantillas o código nuevos invalidan los ETags)"""
+    for variable in ('RAILWAY_DEPLOYMENT_ID', 'RAILWAY_GIT_COMMIT_SHA'):
+        if os.environ.get(variable):
+            return os.environ[variable]
+    app = Path(__file__).resolve().parent
+    archivos = [*app.glob('*.py'), *app.glob('templates/**/*.html')]
+    return str(max((archivo.stat().st_mtime_ns for archivo in archivos), default=0))
+
+
+SEMILLA = _semilla_despliegue()
+
+
+def etag_vista(request, modelos):
+    """ETag débil de la página para el usuario actual y las versiones de ``modelos``"""
+    perfil = getattr(request.user, 'userprofile', None)
+    versiones = VersionDatos.actuales(modelos)
+    partes = [
+        SEMILLA,
+        request.resolver_match.view_name,
+        request.get_full_path(),
+        str(request.user.pk),
+        perfil.nivel if perfil else '',
+        # El token CSRF de la página guardada debe seguir siendo válido
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+        timezone.localdate().isoformat(),
+        *(f'{modelo}:{versiones[modelo]}' for modelo in modelos),
+    ]
+    return 'W/"%s"' % hashlib.sha1('|'.join(partes).encode()).hexdigest()
+
+
+class ETagVersionesMiddleware(MiddlewareMixin):
+    """Va después de AuthenticationMiddleware y MessageMiddleware"""
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method not in ('GET', 'HEAD') or request.resolver_match is None:
+            return None
+        if getattr(request, 'perfilando', False):
+            return None  # Se pidió perfilar: la vista debe ejecutarse
+        modelos = VISTAS_VERSIONADAS.get(request.resolver_match.view_name)
+        if not modelos or not request.user.is_authenticated:
+            return None
+        if len(messages.get_messages(request)):
+            return None  # Hay mensajes pendientes: la página debe mostrarlos
+
+        etag = etag_vista(request, modelos)
+        request.etag_versiones = etag
+        recibidos = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag.removeprefix('W/') in {recibido.removeprefix('W/') for recibido in recibidos}:
+            respuesta = HttpResponseNotModified()
+            respuesta['ETag'] = etag
+            patch_cache_control(respuesta, private=True, no_cache=True)
+            return respuesta
+        return None
+
+    def process_response(self, request, response):
+        etag = getattr(request, 'etag_versiones', None)
+        if etag and response.status_code == 200 and not response.has_header('ETag'):
+            response['ETag'] = etag
+            # El navegador guarda la página pero siempre revalida
+            response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+def _instalar_registro(registro):
+    for conexion in connections.all():
+        conexion.execute_wrappers.append(registro)
+
+
+def _retirar_registro(registro):
+    for conexion in connections.all():
+        if registro in conexion.execute_wrappers:
+            conexion.execute_wrappers.remove(registro)
+
+
+class InstrumentacionMiddleware:
+    """Va después de AuthenticationMiddleware; deja las métricas en ``request.metricas``"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        registro = RegistroConsultas(umbral_lenta=consultas_lentas.umbral_segundos())
+        inicio = time.perf_counter()
+        with ExitStack() as pila:
+            for conexion in connections.all():
+                pila.enter_context(conexion.execute_wrapper(registro))
+            response = self.get_response(request)
+        total = time.perf_counter() - inicio
+        if registro.lentas:
+            self._guardar_lentas(request, registro)
+        return self._procesar(request, response, registro, total, getattr(request, 'user', None))
+
+    async def __acall__(self, request):
+        # Con ASGI el ORM corre en el hilo de sync_to_async de la petición: el
+        # wrapper se instala en las conexiones de ese hilo, no en las del event loop
+        registro = RegistroConsultas(umbral_lenta=consultas_lentas.umbral_segundos())
+        inicio = time.perf_counter()
+        await sync_to_async(_instalar_registro)(registro)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(_retirar_registro)(registro)
+        total = time.perf_counter() - inicio
+        if registro.lentas:
+            await sync_to_async(self._guardar_lentas)(request, registro)
+        usuario = await request.auser() if hasattr(request, 'auser') else None
+        return self._procesar(request, response, registro, total, usuario)
+
+    def _guardar_lentas(self, request, registro):
+        """Acumula en ConsultaLenta las sentencias que superaron CONSULTAS_LENTAS_MS"""
+        vista = request.resolver_match.view_name if request.resolver_match else request.path
+        try:
+            consultas_lentas.guardar(vista, registro.lentas)
+        except DatabaseError:
+            logger.exception('No se pudieron guardar las consultas lentas de %s', vista)
+
+    def _procesar(self, request, response, registro, total, usuario):
+        duplicadas = registro.duplicadas(UMBRAL_DUPLICADAS)
+        request.metricas = metricas = {
+            'vista': request.resolver_match.view_name if request.resolver_match else '',
+            'metodo': request.method,
+            'ruta': request.path,
+            'estado': response.status_code,
+            'ms': round(total * 1000, 1),
+            'db_ms': round(registro.tiempo_db * 1000, 1),
+            'py_ms': round((total - registro.tiempo_db) * 1000, 1),
+            'consultas': registro.consultas,
+            'bytes': len(response.content) if not response.streaming else None,
+            'duplicadas': [{'veces': veces, 'sql': huella[:200]} for huella, veces in duplicadas],
+        }
+        metricas_prometheus.observar_peticion(metricas)
+        if (metricas['ms'] >= UMBRAL_MS or registro.consultas >= UMBRAL_CONSULTAS or duplicadas):
+            logger.warning(json.dumps(metricas, ensure_ascii=False))
+
+        if usuario is not None and usuario.is_superuser:
+            response['Server-Timing'] = f'db;dur={metricas["db_ms"]}, py;dur={metricas["py_ms"]}'
+            if PIE_SUPERUSUARIOS:
+                self._agregar_pie(response, metricas)
+        return response
+
+    def _agregar_pie(self, response, metricas):
+        """Resumen fijo al pie de las páginas HTML"""
+        if (response.streaming or response.status_code != 200
+                or 'text/html' not in response.get('Content-Type', '')):
+            return
+        contenido = response.content
+        posicion = contenido.rfind(b'</body>')
+        if posicion == -1:
+            return
+        repetidas = sum(d['veces'] for d in metricas['duplicadas'])
+        detalle = escape('\n'.join(f'{d["veces"]}× {d["sql"]}' for d in metricas['duplicadas']))
+        pie = (
+            f'<div title="{detalle}" style="position:fixed;bottom:0;right:0;z-index:9999;'
+            f'background:#212529;color:#f8f9fa;font:12px monospace;padding:2px 8px;opacity:.85">'
+            f'⏱ {metricas["ms"]:.0f} ms · db {metricas["db_ms"]:.0f} ms · py {metricas["py_ms"]:.0f} ms · '
+            f'{metricas["consultas"]} consultas'
+            f'{f" · {repetidas} repetidas" if repetidas else ""} · {len(contenido) / 1024:.0f} KB</div>'
+        ).encode()
+        response.content = contenido[:posicion] + pie + contenido[posicion:]
+        if response.has_header('Content-Length'):
+            response['Content-Length'] = str(len(response.content))
+
+
+class PerfilMiddleware:
+    """Va después de AuthenticationMiddleware; sin ``?_perfil`` ni X-Perfil no hace nada más"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not perfilado.solicitado(request) or not request.user.is_superuser:
+            return self.get_response(request)
+
+        request.perfilando = True
+        registro = RegistroDetallado()
+        perfilador = cProfile.Profile()
+        inicio = time.perf_counter()
+        with ExitStack() as pila:
+            for conexion in connections.all():
+                pila.enter_context(conexion.execute_wrapper(registro))
+            perfilador.enable()
+            try:
+                response = self.get_response(request)
+            finally:
+                perfilador.disable()
+        return self._guardar(request, response, perfilador, registro, time.perf_counter() - inicio)
+
+    async def __acall__(self, request):
+        if not perfilado.solicitado(request) or not (await request.auser()).is_superuser:
+            return await self.get_response(request)
+
+        request.perfilando = True
+        registro = RegistroDetallado()
+        perfilador = cProfile.Profile()
+        inicio = time.perf_counter()
+        await sync_to_async(_instalar_registro)(registro)
+        perfilador.enable()
+        try:
+            response = await self.get_response(request)
+        finally:
+            perfilador.disable()
+            await sync_to_async(_retirar_registro)(registro)
+        total = time.perf_counter() - inicio
+        return await sync_to_async(self._guardar)(request, response, perfilador, registro, total)
+
+    def _guardar(self, request, response, perfilador, registro, segundos):
+        perfil_id = perfilado.guardar(request, response, perfilador, registro, segundos)
+        response['X-Perfil-Id'] = str(perfil_id)
+        response['X-Perfil-Url'] = reverse('inventario:perfil_peticion', args=[perfil_id])
+        return response
@@ -0,0 +1,220 @@
+"""
+Migración de ventas antiguas (MovimientoEfectivo de venta) a VentaMonos.
+
+Motor compartido por el comando ``migrar_ventas_antiguas``, la vista web y la
+acción del admin. Trabaja por lotes de movimientos ordenados por id: resuelve
+las listas, las ventas ya existentes, los detalles y el costo de los moños con
+una consulta por lote, crea las ventas con bulk_create y guarda un
+PuntoControlMigracion para que una ejecución interrumpida continúe donde quedó.
+"""
+
+import re
+import time
+from bisect import bisect_right
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+
+from .models import (DetalleListaMonos, ListaProduccion, MovimientoEfectivo, PuntoControlMigracion,
+                     RecetaMonos, VentaDiaria, VentaMonos, VersionDatos)
+
+PUNTO_CONTROL = 'ventas_antiguas'
+LOTE = 500
+VENTA_DE_LISTA = re.compile(r'Lista:\s*(.+)$')
+
+
+def costos_por_mono(monos_ids):
+    """Costo de producción (igual que Monos.costo_produccion) de varios moños en una consulta"""
+    costos = {monos_id: Decimal('0') for monos_id in monos_ids}
+    for receta in RecetaMonos.objects.filter(monos_id__in=monos_ids).select_related('material'):
+        costos[receta.monos_id] += receta.material.costo_unitario * receta.cantidad_necesaria
+    return costos
+
+
+def resolver_listas(movimientos, guardar=True):
+    """
+    Enlaza los movimientos sin FK a su lista a partir del nombre en el concepto.
+    Todos los nombres se buscan en una sola consulta ``nombre__in``; si varias
+    listas comparten nombre se usa la más reciente creada antes del movimiento.
+    """
+    nombres = {}
+    for movimiento in movimientos:
+        if movimiento.lista_produccion_id is None:
+            coincidencia = VENTA_DE_LISTA.search(movimiento.concepto)
+            if coincidencia:
+                nombres[movimiento.id] = coincidencia.group(1).strip()
+    if not nombres:
+        return []
+
+    candidatas = defaultdict(list)
+    for lista in ListaProduccion.objects.filter(nombre__in=set(nombres.values())).order_by('fecha_creacion'):
+        candidatas[lista.nombre].append(lista)
+
+    enlazados = []
+    for movimiento in movimientos:
+        listas = candidatas.get(nombres.get(movimiento.id))
+        if not listas:
+            continue
+        posicion = bisect_right([lista.fecha_creacion for lista in listas], movimiento.fecha)
+        movimiento.lista_produccion = listas[max(posicion - 1, 0)]
+        enlazados.append(movimiento)
+    if guardar and enlazados:
+        MovimientoEfectivo.objects.bulk_update(enlazados, ['lista_produccion'], batch_size=LOTE)
+        VersionDatos.incrementar('MovimientoEfectivo')
+    return enlazados
+
+
+def _migrar_lote(movimientos, dry_run, resultado, costos, listas_migradas):
+    """Crea las VentaMonos de un lote de movimientos"""
+    resolver_listas(movimientos, guardar=not dry_run)
+
+    lista_ids = {m.lista_produccion_id for m in movimientos if m.lista_produccion_id}
+    con_ventas = set(
+        VentaMonos.objects.filter(lista_produccion_id__in=lista_ids)
+        .values_list('lista_produccion_id', flat=True).distinct()
+    ) | listas_migradas
+    detalles = defaultdict(list)
+    for detalle in DetalleListaMonos.objects.filter(
+        lista_produccion_id__in=lista_ids - con_ventas, cantidad_producida__gt=0
+    ).select_related('monos'):
+        detalles[detalle.lista_produccion_id].append(detalle)
+
+    faltantes = {d.monos_id for grupo in detalles.values() for d in grupo} - costos.keys()
+    costos.update(costos_por_mono(faltantes))
+
+    ventas = []
+    fechas = []
+    for mov in movimientos:
+        lista = mov.lista_produccion
+        registro = {
+            'concepto': mov.concepto,
+            'fecha': mov.fecha,
+            'monto': mov.monto,
+            'lista': lista.nombre if lista else '',
+            'ventas_creadas': [],
+        }
+        if lista is None:
+            resultado['errores'] += 1
+            resultado['errores_detalle'].append({
+                'concepto': mov.concepto,
+                'error': 'No se encontró la lista de producción del movimiento',
+            })
+            continue
+        if lista.id in con_ventas:
+            registro['estado'] = 'ya_existe'
+            registro['mensaje'] = 'La lista ya tiene ventas registradas'
+            resultado['ventas_ya_existen'] += 1
+            resultado['detalles'].append(registro)
+            continue
+
+        for detalle in detalles.get(lista.id, []):
+            mono = detalle.monos
+            cantidad_vendida = detalle.cantidad_producida
+            ingreso_total = Decimal(cantidad_vendida) * mono.precio_venta
+            costo_unitario = costos[mono.id]
+            ganancia_total = ingreso_total - costo_unitario * cantidad_vendida
+            ventas.append(VentaMonos(
+                lista_produccion=lista,
+                monos=mono,
+                cantidad_vendida=cantidad_vendida,
+                tipo_venta=mono.tipo_venta,
+                precio_unitario=mono.precio_venta,
+                ingreso_total=ingreso_total,
+                costo_unitario=costo_unitario,
+                ganancia_total=ganancia_total,
+                usuario=mov.usuario,
+            ))
+            fechas.append(mov.fecha)
+            registro['ventas_creadas'].append({
+                'mono': mono.nombre,
+                'cantidad': cantidad_vendida,
+                'tipo': mono.tipo_venta,
+                'ingreso': float(ingreso_total),
+                'ganancia': float(ganancia_total),
+            })
+
+        listas_migradas.add(lista.id)
+        if registro['ventas_creadas']:
+            registro['estado'] = 'simuladas' if dry_run else 'creadas'
+            registro['mensaje'] = f'{"Se crearían" if dry_run else "Creadas"} {len(registro["ventas_creadas"])} ventas'
+        else:
+            registro['estado'] = 'sin_datos'
+            registro['mensaje'] = 'No hay detalles con cantidad_producida > 0'
+        resultado['detalles'].append(registro)
+
+    resultado['ventas_creadas'] += len(ventas)
+    if dry_run or not ventas:
+        return
+
+    VentaMonos.objects.bulk_create(ventas, batch_size=LOTE)
+    # ``fecha`` es auto_now_add: bulk_create la sobrescribe, se restaura la del movimiento
+    for venta, fecha in zip(ventas, fechas):
+        venta.fecha = fecha
+    VentaMonos.objects.bulk_update(ventas, ['fecha'], batch_size=LOTE)
+    VentaDiaria.acumular(ventas)
+
+
+def migrar_ventas(movimientos=None, dry_run=False, punto_control=PUNTO_CONTROL, lote=LOTE):
+    """
+    Migra los movimientos de venta (todos, o el queryset ``movimientos``).
+
+    Con ``punto_control`` solo procesa movimientos posteriores al último id
+    guardado y lo avanza al terminar cada lote (en la misma transacción que las
+    ventas creadas). En modo ``dry_run`` no se escribe nada.
+    """
+    if movimientos is None:
+        movimientos = MovimientoEfectivo.objects.all()
+    movimientos = (
+        movimientos.filter(tipo_movimiento='ingreso', categoria='venta')
+        .select_related('lista_produccion', 'usuario')
+        .order_by('id')
+    )
+
+    avance = None
+    if punto_control and dry_run:
+        avance = PuntoControlMigracion.objects.filter(nombre=punto_control).first()
+    elif punto_control:
+        avance, _ = PuntoControlMigracion.objects.get_or_create(nombre=punto_control)
+
+    resultado = {
+        'ejecutado': True,
+        'dry_run': dry_run,
+        'ventas_creadas': 0,
+        'ventas_ya_existen': 0,
+        'errores': 0,
+        'detalles': [],
+        'errores_detalle': [],
+        'movimientos': 0,
+        'reanudado_desde': avance.ultimo_id if avance else 0,
+    }
+    costos = {}
+    listas_migradas = set()
+    ultimo_id = resultado['reanudado_desde']
+    inicio = time.perf_counter()
+
+    while True:
+        grupo = list(movimientos.filter(id__gt=ultimo_id)[:lote])
+        if not grupo:
+            break
+        creadas_antes = resultado['ventas_creadas']
+        with transaction.atomic():
+            _migrar_lote(grupo, dry_run, resultado, costos, listas_migradas)
+            if avance and not dry_run:
+                avance.ultimo_id = grupo[-1].id
+                avance.procesados += len(grupo)
+                avance.filas_creadas += resultado['ventas_creadas'] - creadas_antes
+                avance.save()
+        ultimo_id = grupo[-1].id
+        resultado['movimientos'] += len(grupo)
+
+    segundos = time.perf_counter() - inicio
+    resultado['segundos'] = segundos
+    resultado['movimientos_por_segundo'] = resultado['movimientos'] / segundos if segundos else 0
+    resultado['filas_por_segundo'] = resultado['ventas_creadas'] / segundos if segundos else 0
+    return resultado
+
+
+def reiniciar_punto_control(nombre=PUNTO_CONTROL):
+    """Olvida el avance guardado para volver a revisar todos los movimientos"""
+    PuntoControlMigracion.objects.filter(nombre=nombre).delete()
@@ -0,0 +1,79 @@
+# Generated by Django 5.1.4 on 2026-10-19 06:52
+
+from django.db import migrations, models
+
+
+ACCION_POR_ESTADO = {
+    'borrador': 'generar_archivo_compras',
+    'pendiente_compra': 'verificar_compras',
+    'comprado': 'enviar_a_reabastecimiento',
+    'reabastecido': 'iniciar_produccion',
+    'en_produccion': 'enviar_a_salida',
+    'en_salida': 'registrar_ventas_contaduria',
+}
+
+
+def poblar_resumen_estado(apps, schema_editor):
+    """Calcula los campos de resumen para las listas existentes"""
+    ListaProduccion = apps.get_model('inventario', 'ListaProduccion')
+    ResumenMateriales = apps.get_model('inventario', 'ResumenMateriales')
+    DetalleListaMonos = apps.get_model('inventario', 'DetalleListaMonos')
+
+    faltantes = dict(
+        ResumenMateriales.objects.filter(cantidad_faltante__gt=0)
+        .values('lista_produccion')
+        .annotate(total=models.Count('id'))
+        .values_list('lista_produccion', 'total')
+    )
+
+    multiplicador = models.Case(
+        models.When(monos__tipo_venta='par', then=models.Value(2)),
+        default=models.Value(1),
+    )
+    totales = {
+        fila['lista_produccion']: fila
+        for fila in DetalleListaMonos.objects.values('lista_produccion').annotate(
+            planificados=models.Sum(models.F('cantidad') * multiplicador),
+            producidos=models.Sum(models.F('cantidad_producida') * multiplicador),
+        )
+    }
+
+    listas = list(ListaProduccion.objects.all())
+    for lista in listas:
+        lista.materiales_faltantes_count = faltantes.get(lista.id, 0)
+        fila = totales.get(lista.id)
+        if fila:
+            lista.total_moños_planificados = fila['planificados'] or 0
+            lista.total_moños_producidos = fila['producidos'] or 0
+        if lista.estado == 'comprado' and lista.materiales_faltantes_count > 0:
+            lista.accion_siguiente = ''
+        else:
+            lista.accion_siguiente = ACCION_POR_ESTADO.get(lista.estado, '')
+
+    ListaProduccion.objects.bulk_update(
+        listas,
+        ['materiales_faltantes_count', 'accion_siguiente',
+         'total_moños_planificados', 'total_moños_producidos'],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0009_userprofile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listaproduccion',
+            name='accion_siguiente',
+            field=models.CharField(blank=True, default='', help_text='Siguiente acción del panel según el estado actual', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='listaproduccion',
+            name='materiales_faltantes_count',
+            field=models.PositiveIntegerField(default=0, help_text='Materiales del resumen con cantidad faltante > 0'),
+        ),
+        migrations.RunPython(poblar_resumen_estado, migrations.RunPython.noop),
+    ]
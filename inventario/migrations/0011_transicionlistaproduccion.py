@@ -0,0 +1,56 @@
+# Generated by Django 5.1.4 on 2026-10-19 06:57
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def registrar_estado_inicial(apps, schema_editor):
+    """Un registro inicial por lista existente, fechado en su última modificación"""
+    ListaProduccion = apps.get_model('inventario', 'ListaProduccion')
+    TransicionListaProduccion = apps.get_model('inventario', 'TransicionListaProduccion')
+
+    TransicionListaProduccion.objects.bulk_create([
+        TransicionListaProduccion(
+            lista_id=lista_id,
+            estado_anterior='',
+            estado_nuevo=estado,
+            fecha=fecha_modificacion,
+            usuario_id=usuario_id,
+            nota='Estado al habilitar la bitácora',
+        )
+        for lista_id, estado, fecha_modificacion, usuario_id in ListaProduccion.objects.values_list(
+            'id', 'estado', 'fecha_modificacion', 'usuario_creador_id'
+        ).iterator()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0010_listaproduccion_resumen_estado'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransicionListaProduccion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado_anterior', models.CharField(blank=True, choices=[('borrador', 'Borrador'), ('pendiente_compra', 'Pendiente de Compra'), ('comprado', 'Materiales Comprados'), ('reabastecido', 'Inventario Reabastecido'), ('en_produccion', 'En Producción'), ('en_salida', 'Lista en Salida'), ('finalizado', 'Finalizado'), ('archivado', 'Archivado')], help_text='Vacío para el registro inicial de la lista', max_length=20)),
+                ('estado_nuevo', models.CharField(choices=[('borrador', 'Borrador'), ('pendiente_compra', 'Pendiente de Compra'), ('comprado', 'Materiales Comprados'), ('reabastecido', 'Inventario Reabastecido'), ('en_produccion', 'En Producción'), ('en_salida', 'Lista en Salida'), ('finalizado', 'Finalizado'), ('archivado', 'Archivado')], max_length=20)),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('nota', models.CharField(blank=True, max_length=200)),
+                ('lista', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transiciones', to='inventario.listaproduccion')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Transición de Lista',
+                'verbose_name_plural': 'Transiciones de Listas',
+                'ordering': ['-fecha'],
+                'indexes': [models.Index(fields=['lista', 'fecha'], name='inventario__lista_i_433902_idx'), models.Index(fields=['estado_nuevo', 'fecha'], name='inventario__estado__b6921d_idx')],
+            },
+        ),
+        migrations.RunPython(registrar_estado_inicial, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.4 on 2026-10-19 07:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0011_transicionlistaproduccion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ListaProduccionArchivo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('datos', models.BinaryField(help_text='JSON comprimido con zlib')),
+                ('version', models.PositiveSmallIntegerField(default=1)),
+                ('filas_compactadas', models.PositiveIntegerField(default=0, help_text='Filas de detalle y resumen eliminadas de las tablas activas')),
+                ('fecha_archivo', models.DateTimeField(auto_now_add=True)),
+                ('lista', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='archivo', to='inventario.listaproduccion')),
+            ],
+            options={
+                'verbose_name': 'Archivo de Lista',
+                'verbose_name_plural': 'Archivos de Listas',
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.4 on 2026-10-19 07:04
+
+import django.core.validators
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0012_listaproduccionarchivo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PresentacionMaterial',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('proveedor', models.CharField(blank=True, help_text='Ej: Mercería Centro', max_length=100)),
+                ('nombre', models.CharField(help_text='Ej: Rollo 50 m', max_length=100)),
+                ('contenido', models.DecimalField(decimal_places=2, help_text='Cantidad que trae la presentación en unidad base', max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))])),
+                ('precio', models.DecimalField(decimal_places=2, help_text='Precio de una pieza de esta presentación', max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0'))])),
+                ('disponibles', models.PositiveIntegerField(blank=True, help_text='Piezas que puede surtir el proveedor (vacío = sin límite)', null=True)),
+                ('activo', models.BooleanField(default=True)),
+                ('material', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='presentaciones', to='inventario.material')),
+            ],
+            options={
+                'verbose_name': 'Presentación de Material',
+                'verbose_name_plural': 'Presentaciones de Materiales',
+                'ordering': ['material', 'contenido'],
+                'unique_together': {('material', 'proveedor', 'nombre')},
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.1.4 on 2026-10-19 07:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Sum, When
+from django.db.models.functions import TruncDate
+
+
+def llenar_ventas_diarias(apps, schema_editor):
+    """Resume las VentaMonos existentes por día y moño"""
+    VentaMonos = apps.get_model('inventario', 'VentaMonos')
+    VentaDiaria = apps.get_model('inventario', 'VentaDiaria')
+
+    filas = VentaMonos.objects.order_by().annotate(dia=TruncDate('fecha')).values('dia', 'monos_id').annotate(
+        total_cantidad=Sum('cantidad_vendida'),
+        total_monos=Sum(Case(
+            When(tipo_venta='par', then=F('cantidad_vendida') * 2),
+            default=F('cantidad_vendida'),
+            output_field=IntegerField(),
+        )),
+        total_ingresos=Sum('ingreso_total'),
+        total_costos=Sum(
+            F('costo_unitario') * F('cantidad_vendida'),
+            output_field=DecimalField(max_digits=14, decimal_places=2)
+        ),
+        total_ganancia=Sum('ganancia_total'),
+        total_ventas=Count('id'),
+    )
+    VentaDiaria.objects.bulk_create([
+        VentaDiaria(
+            fecha=fila['dia'],
+            monos_id=fila['monos_id'],
+            cantidad=fila['total_cantidad'],
+            cantidad_total_monos=fila['total_monos'],
+            ingresos=fila['total_ingresos'],
+            costos=fila['total_costos'],
+            ganancia=fila['total_ganancia'],
+            n_ventas=fila['total_ventas'],
+        )
+        for fila in filas.iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0013_presentacionmaterial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VentaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('cantidad', models.PositiveIntegerField(default=0, help_text='Pares o individuales vendidos')),
+                ('cantidad_total_monos', models.PositiveIntegerField(default=0, help_text='Moños vendidos (los pares cuentan doble)')),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('costos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('ganancia', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('n_ventas', models.PositiveIntegerField(default=0, help_text='Registros de VentaMonos resumidos')),
+                ('monos', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ventas_diarias', to='inventario.monos')),
+            ],
+            options={
+                'verbose_name': 'Venta Diaria',
+                'verbose_name_plural': 'Ventas Diarias',
+                'ordering': ['-fecha'],
+                'indexes': [models.Index(fields=['fecha'], name='inventario__fecha_133004_idx')],
+                'unique_together': {('fecha', 'monos')},
+            },
+        ),
+        migrations.RunPython(llenar_ventas_diarias, migrations.RunPython.noop),
+    ]
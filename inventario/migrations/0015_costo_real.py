@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-19 07:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0014_ventadiaria'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listaproduccion',
+            name='costo_real',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Costo de los materiales descontados para producir la lista', max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='listaproduccion',
+            name='ganancia_real',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Ingreso por ventas menos el costo real', max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='ventamonos',
+            name='costo_es_real',
+            field=models.BooleanField(default=False, help_text='El costo unitario viene de los movimientos de producción de la lista'),
+        ),
+    ]
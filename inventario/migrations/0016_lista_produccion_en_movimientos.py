@@ -0,0 +1,96 @@
+# Generated by Django 5.1.4 on 2026-10-19 07:21
+
+import re
+from bisect import bisect_right
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+LOTE = 500
+
+# Formatos con los que las vistas escribían la referencia a la lista
+LISTA_POR_ID = re.compile(r'^(?:Producción|Reabastecimiento) - Lista #(\d+):')
+COMPRA_PARA_LISTA = re.compile(r'^Compra para lista: (.+) - \d+ ')
+VENTA_DE_LISTA = re.compile(r'^Venta de producción - Lista: (.+)$')
+
+
+def _resolver_nombre(listas_por_nombre, nombre, fecha):
+    """Lista con ese nombre creada más recientemente antes de ``fecha``"""
+    candidatas = listas_por_nombre.get(nombre.strip())
+    if not candidatas:
+        return None
+    if len(candidatas) == 1:
+        return candidatas[0][1]
+    posicion = bisect_right([creada for creada, _ in candidatas], fecha)
+    return candidatas[posicion - 1][1] if posicion else None
+
+
+def _enlazar(modelo, campo_texto, resolver):
+    """Recorre los movimientos sin lista y guarda el FK en lotes"""
+    pendientes = []
+    filas = modelo.objects.filter(lista_produccion__isnull=True).only('id', campo_texto, 'fecha')
+    for movimiento in filas.iterator(chunk_size=2000):
+        lista_id = resolver(getattr(movimiento, campo_texto), movimiento.fecha)
+        if lista_id is None:
+            continue
+        movimiento.lista_produccion_id = lista_id
+        pendientes.append(movimiento)
+        if len(pendientes) >= LOTE:
+            modelo.objects.bulk_update(pendientes, ['lista_produccion'])
+            pendientes = []
+    modelo.objects.bulk_update(pendientes, ['lista_produccion'])
+
+
+def enlazar_movimientos(apps, schema_editor):
+    """Interpreta una sola vez las referencias en texto de Movimiento y MovimientoEfectivo"""
+    ListaProduccion = apps.get_model('inventario', 'ListaProduccion')
+    Movimiento = apps.get_model('inventario', 'Movimiento')
+    MovimientoEfectivo = apps.get_model('inventario', 'MovimientoEfectivo')
+
+    ids = set(ListaProduccion.objects.values_list('id', flat=True))
+    listas_por_nombre = defaultdict(list)
+    for lista_id, nombre, creada in ListaProduccion.objects.order_by('fecha_creacion').values_list(
+        'id', 'nombre', 'fecha_creacion'
+    ):
+        listas_por_nombre[nombre.strip()].append((creada, lista_id))
+
+    def lista_de_detalle(detalle, fecha):
+        coincidencia = LISTA_POR_ID.match(detalle)
+        if coincidencia:
+            lista_id = int(coincidencia.group(1))
+            return lista_id if lista_id in ids else None
+        coincidencia = COMPRA_PARA_LISTA.match(detalle)
+        if coincidencia:
+            return _resolver_nombre(listas_por_nombre, coincidencia.group(1), fecha)
+        return None
+
+    def lista_de_concepto(concepto, fecha):
+        coincidencia = VENTA_DE_LISTA.match(concepto)
+        if coincidencia:
+            return _resolver_nombre(listas_por_nombre, coincidencia.group(1), fecha)
+        return None
+
+    _enlazar(Movimiento, 'detalle', lista_de_detalle)
+    _enlazar(MovimientoEfectivo, 'concepto', lista_de_concepto)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0015_costo_real'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movimiento',
+            name='lista_produccion',
+            field=models.ForeignKey(blank=True, help_text='Lista de producción relacionada (si aplica)', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movimientos', to='inventario.listaproduccion'),
+        ),
+        migrations.AddField(
+            model_name='movimientoefectivo',
+            name='lista_produccion',
+            field=models.ForeignKey(blank=True, help_text='Lista de producción relacionada', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movimientos_efectivo', to='inventario.listaproduccion'),
+        ),
+        migrations.RunPython(enlazar_movimientos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.4 on 2026-10-19 07:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0016_lista_produccion_en_movimientos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PuntoControlMigracion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=50, unique=True)),
+                ('ultimo_id', models.PositiveBigIntegerField(default=0)),
+                ('procesados', models.PositiveIntegerField(default=0)),
+                ('filas_creadas', models.PositiveIntegerField(default=0)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Punto de Control de Migración',
+                'verbose_name_plural': 'Puntos de Control de Migración',
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.4 on 2026-10-19 07:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0018_versiondatos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsultaLenta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('firma', models.CharField(help_text='SHA-1 de vista y huella', max_length=40, unique=True)),
+                ('vista', models.CharField(blank=True, max_length=100)),
+                ('huella', models.TextField()),
+                ('sql_ejemplo', models.TextField(help_text='Última sentencia capturada, con sus parámetros')),
+                ('plan', models.TextField(blank=True)),
+                ('veces', models.PositiveIntegerField(default=0)),
+                ('total_ms', models.FloatField(default=0)),
+                ('max_ms', models.FloatField(default=0)),
+                ('muestras', models.JSONField(default=list, help_text='Últimas duraciones en ms')),
+                ('primera_vez', models.DateTimeField(auto_now_add=True)),
+                ('ultima_vez', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Consulta Lenta',
+                'verbose_name_plural': 'Consultas Lentas',
+                'ordering': ['-total_ms'],
+                'indexes': [models.Index(fields=['ultima_vez'], name='inventario__ultima__ba7b01_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.4 on 2026-10-19 08:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0019_consultalenta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PerfilPeticion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateTimeField(auto_now_add=True)),
+                ('usuario', models.CharField(max_length=150)),
+                ('metodo', models.CharField(max_length=10)),
+                ('ruta', models.TextField()),
+                ('vista', models.CharField(blank=True, max_length=100)),
+                ('estado', models.PositiveSmallIntegerField()),
+                ('ms', models.FloatField()),
+                ('db_ms', models.FloatField()),
+                ('consultas', models.PositiveIntegerField()),
+                ('funciones_acumulado', models.JSONField(default=list)),
+                ('funciones_propio', models.JSONField(default=list)),
+                ('sql', models.JSONField(default=list, help_text='Sentencias agrupadas por huella')),
+            ],
+            options={
+                'verbose_name': 'Perfil de Petición',
+                'verbose_name_plural': 'Perfiles de Peticiones',
+                'ordering': ['-fecha'],
+                'indexes': [models.Index(fields=['fecha'], name='inventario__fecha_f92db9_idx')],
+            },
+        ),
+    ]
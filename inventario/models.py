@@ -2,9 +2,13 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
 from decimal import Decimal
-from django.db.models.signals import post_save
+from django.utils import timezone
+from django.utils.functional import cached_property
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from .pasos_lista import PASO_POR_ESTADO, ACCION_POR_ESTADO, ACCIONES_SIGUIENTES
+
 
 class Material(models.Model):
     """Modelo para materiales/artículos del inventario"""
@@ -95,6 +99,51 @@ class Material(models.Model):
         return f"{self.codigo} - {self.nombre}"
 
 
+class PresentacionMaterial(models.Model):
+    """Presentación de compra de un material (tamaño, precio y proveedor)"""
+    
+    material = models.ForeignKey(
+        Material,
+        on_delete=models.CASCADE,
+        related_name='presentaciones'
+    )
+    proveedor = models.CharField(max_length=100, blank=True, help_text="Ej: Mercería Centro")
+    nombre = models.CharField(max_length=100, help_text="Ej: Rollo 50 m")
+    contenido = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        validators=[MinValueValidator(Decimal('0.01'))],
+        help_text="Cantidad que trae la presentación en unidad base"
+    )
+    precio = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        validators=[MinValueValidator(Decimal('0'))],
+        help_text="Precio de una pieza de esta presentación"
+    )
+    disponibles = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="Piezas que puede surtir el proveedor (vacío = sin límite)"
+    )
+    activo = models.BooleanField(default=True)
+    
+    class Meta:
+        verbose_name = "Presentación de Material"
+        verbose_name_plural = "Presentaciones de Materiales"
+        ordering = ['material', 'contenido']
+        unique_together = ['material', 'proveedor', 'nombre']
+    
+    def __str__(self):
+        proveedor = f" ({self.proveedor})" if self.proveedor else ""
+        return f"{self.material.nombre} - {self.nombre}{proveedor}"
+    
+    @property
+    def costo_unitario(self):
+        """Costo por unidad base de esta presentación"""
+        return self.precio / self.contenido if self.contenido else 0
+
+
 class Movimiento(models.Model):
     """Modelo para registrar movimientos de inventario"""
     
@@ -146,6 +195,14 @@ class Movimiento(models.Model):
         blank=True,
         help_text="Simulación relacionada (si aplica)"
     )
+    lista_produccion = models.ForeignKey(
+        'ListaProduccion',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='movimientos',
+        help_text="Lista de producción relacionada (si aplica)"
+    )
     
     class Meta:
         verbose_name = "Movimiento"
@@ -408,6 +465,14 @@ class MovimientoEfectivo(models.Model):
         blank=True,
         help_text="Simulación relacionada"
     )
+    lista_produccion = models.ForeignKey(
+        'ListaProduccion',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='movimientos_efectivo',
+        help_text="Lista de producción relacionada"
+    )
     
     class Meta:
         verbose_name = "Movimiento de Efectivo"
@@ -426,37 +491,56 @@ class MovimientoEfectivo(models.Model):
     @classmethod
     def calcular_saldo_actual(cls):
         """Calcula el saldo actual de efectivo"""
-        movimientos = cls.objects.all()
-        saldo = 0
-        for mov in movimientos:
-            saldo += mov.monto_con_signo
-        return saldo
+        saldo = cls.objects.aggregate(
+            saldo=models.Sum(
+                models.Case(
+                    models.When(tipo_movimiento='ingreso', then=models.F('monto')),
+                    default=-models.F('monto'),
+                )
+            )
+        )['saldo']
+        return saldo or Decimal('0')
+    
+    @classmethod
+    def bloquear_saldo(cls):
+        """
+        Bloquea el saldo hasta el fin de la transacción y lo regresa, para que dos
+        altas concurrentes no encadenen saldo_anterior desde el mismo saldo.
+        El bloqueo es sobre la fila de VersionDatos del modelo; debe llamarse
+        dentro de transaction.atomic().
+        """
+        VersionDatos.objects.select_for_update().get_or_create(modelo=cls.__name__)
+        return cls.calcular_saldo_actual()
     
     @classmethod
     def registrar_movimiento(cls, concepto, tipo_movimiento, categoria, monto, usuario=None, 
-                           movimiento_inventario=None, simulacion_relacionada=None):
+                           movimiento_inventario=None, simulacion_relacionada=None, lista_produccion=None):
         """
         Registra un nuevo movimiento de efectivo y actualiza el saldo
         """
-        saldo_anterior = cls.calcular_saldo_actual()
-        
-        if tipo_movimiento == 'ingreso':
-            saldo_nuevo = saldo_anterior + monto
-        else:  # egreso
-            saldo_nuevo = saldo_anterior - monto
+        from django.db import transaction
         
-        movimiento = cls.objects.create(
-            concepto=concepto,
-            tipo_movimiento=tipo_movimiento,
-            categoria=categoria,
-            monto=monto,
-            saldo_anterior=saldo_anterior,
-            saldo_nuevo=saldo_nuevo,
-            automatico=True if movimiento_inventario or simulacion_relacionada else False,
-            usuario=usuario,
-            movimiento_inventario=movimiento_inventario,
-            simulacion_relacionada=simulacion_relacionada
-        )
+        with transaction.atomic():
+            saldo_anterior = cls.bloquear_saldo()
+            
+            if tipo_movimiento == 'ingreso':
+                saldo_nuevo = saldo_anterior + monto
+            else:  # egreso
+                saldo_nuevo = saldo_anterior - monto
+            
+            movimiento = cls.objects.create(
+                concepto=concepto,
+                tipo_movimiento=tipo_movimiento,
+                categoria=categoria,
+                monto=monto,
+                saldo_anterior=saldo_anterior,
+                saldo_nuevo=saldo_nuevo,
+                automatico=True if movimiento_inventario or simulacion_relacionada or lista_produccion else False,
+                usuario=usuario,
+                movimiento_inventario=movimiento_inventario,
+                simulacion_relacionada=simulacion_relacionada,
+                lista_produccion=lista_produccion
+            )
         
         return movimiento
 
@@ -507,6 +591,10 @@ class VentaMonos(models.Model):
         default=0,
         help_text="Ganancia de esta venta"
     )
+    costo_es_real = models.BooleanField(
+        default=False,
+        help_text="El costo unitario viene de los movimientos de producción de la lista"
+    )
     fecha = models.DateTimeField(auto_now_add=True)
     usuario = models.ForeignKey(
         User,
@@ -535,6 +623,164 @@ class VentaMonos(models.Model):
         return f"{self.monos.nombre} - {self.cantidad_vendida} {self.tipo_venta} - ${self.ingreso_total}"
 
 
+class VentaDiaria(models.Model):
+    """Resumen diario de VentaMonos por moño (lo que leen los reportes de analytics)"""
+    
+    fecha = models.DateField()
+    monos = models.ForeignKey(
+        Monos,
+        on_delete=models.CASCADE,
+        related_name='ventas_diarias'
+    )
+    cantidad = models.PositiveIntegerField(default=0, help_text="Pares o individuales vendidos")
+    cantidad_total_monos = models.PositiveIntegerField(default=0, help_text="Moños vendidos (los pares cuentan doble)")
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    costos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    ganancia = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    n_ventas = models.PositiveIntegerField(default=0, help_text="Registros de VentaMonos resumidos")
+    
+    class Meta:
+        verbose_name = "Venta Diaria"
+        verbose_name_plural = "Ventas Diarias"
+        ordering = ['-fecha']
+        unique_together = ['fecha', 'monos']
+        indexes = [
+            models.Index(fields=['fecha']),
+        ]
+    
+    def __str__(self):
+        return f"{self.fecha} - {self.monos.nombre}: {self.cantidad_total_monos} moños"
+    
+    @classmethod
+    def acumular(cls, ventas, signo=1):
+        """
+        Suma (o resta con signo=-1) las ventas dadas al resumen de su día.
+        Se llama al crear VentaMonos, también después de un bulk_create.
+        """
+        from django.db import IntegrityError, transaction
+        from django.db.models import F
+        
+        deltas = {}
+        for venta in ventas:
+            clave = (timezone.localtime(venta.fecha).date(), venta.monos_id)
+            delta = deltas.setdefault(clave, {
+                'cantidad': 0, 'cantidad_total_monos': 0, 'ingresos': Decimal('0'),
+                'costos': Decimal('0'), 'ganancia': Decimal('0'), 'n_ventas': 0,
+            })
+            delta['cantidad'] += venta.cantidad_vendida * signo
+            delta['cantidad_total_monos'] += venta.cantidad_total_monos * signo
+            delta['ingresos'] += Decimal(venta.ingreso_total) * signo
+            delta['costos'] += Decimal(venta.costo_unitario) * venta.cantidad_vendida * signo
+            delta['ganancia'] += Decimal(venta.ganancia_total) * signo
+            delta['n_ventas'] += signo
+        
+        with transaction.atomic():
+            for (fecha, monos_id), delta in deltas.items():
+                incrementos = {campo: F(campo) + valor for campo, valor in delta.items()}
+                if cls.objects.filter(fecha=fecha, monos_id=monos_id).update(**incrementos):
+                    if signo < 0:
+                        cls.objects.filter(fecha=fecha, monos_id=monos_id, n_ventas__lte=0).delete()
+                    continue
+                if signo < 0:
+                    continue  # No hay resumen que descontar
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(fecha=fecha, monos_id=monos_id, **delta)
+                except IntegrityError:
+                    # Otro proceso creó el día entre el update y el create
+                    cls.objects.filter(fecha=fecha, monos_id=monos_id).update(**incrementos)
+            # Invalida cache_analytics; también cubre los bulk_create/bulk_update de ventas
+            VersionDatos.incrementar('VentaMonos')
+    
+    @classmethod
+    def ajustar_costos(cls, ventas, anteriores, lote=100):
+        """
+        Aplica al resumen solo el cambio de costo y ganancia de ``ventas``
+        recosteadas; ``anteriores`` es {venta_id: (costo_unitario, ganancia_total)}
+        previo. Cantidades, ingresos y n_ventas no cambian, así que basta un UPDATE
+        con CASE por cada ``lote`` días en lugar de restar y volver a sumar las ventas.
+        """
+        deltas = {}
+        for venta in ventas:
+            costo_anterior, ganancia_anterior = anteriores[venta.id]
+            delta = deltas.setdefault(
+                (timezone.localtime(venta.fecha).date(), venta.monos_id), [Decimal('0'), Decimal('0')]
+            )
+            delta[0] += (Decimal(venta.costo_unitario) - Decimal(costo_anterior)) * venta.cantidad_vendida
+            delta[1] += Decimal(venta.ganancia_total) - Decimal(ganancia_anterior)
+        deltas = [(clave, delta) for clave, delta in deltas.items() if any(delta)]
+        
+        def por_dia(claves, indice):
+            return models.Case(
+                *[models.When(fecha=fecha, monos_id=monos_id, then=models.Value(delta[indice]))
+                  for (fecha, monos_id), delta in claves],
+                default=models.Value(Decimal('0')),
+                output_field=models.DecimalField(max_digits=14, decimal_places=2),
+            )
+        
+        for inicio in range(0, len(deltas), lote):
+            claves = deltas[inicio:inicio + lote]
+            filtro = models.Q()
+            for (fecha, monos_id), _ in claves:
+                filtro |= models.Q(fecha=fecha, monos_id=monos_id)
+            cls.objects.filter(filtro).update(
+                costos=models.F('costos') + por_dia(claves, 0),
+                ganancia=models.F('ganancia') + por_dia(claves, 1),
+            )
+        if deltas:
+            VersionDatos.incrementar('VentaMonos')
+    
+    @classmethod
+    def reconstruir(cls, desde=None):
+        """
+        Recalcula el resumen desde VentaMonos (todo, o a partir de la fecha ``desde``).
+        Regresa el número de filas generadas.
+        """
+        from django.db import transaction
+        from django.db.models import Case, Count, DecimalField, F, IntegerField, Sum, When
+        from django.db.models.functions import TruncDate
+        
+        ventas = VentaMonos.objects.order_by()
+        resumenes = cls.objects.all()
+        if desde is not None:
+            ventas = ventas.filter(fecha__date__gte=desde)
+            resumenes = resumenes.filter(fecha__gte=desde)
+        
+        filas = ventas.annotate(dia=TruncDate('fecha')).values('dia', 'monos_id').annotate(
+            total_cantidad=Sum('cantidad_vendida'),
+            total_monos=Sum(Case(
+                When(tipo_venta='par', then=F('cantidad_vendida') * 2),
+                default=F('cantidad_vendida'),
+                output_field=IntegerField(),
+            )),
+            total_ingresos=Sum('ingreso_total'),
+            total_costos=Sum(
+                F('costo_unitario') * F('cantidad_vendida'),
+                output_field=DecimalField(max_digits=14, decimal_places=2)
+            ),
+            total_ganancia=Sum('ganancia_total'),
+            total_ventas=Count('id'),
+        )
+        
+        with transaction.atomic():
+            resumenes.delete()
+            creados = cls.objects.bulk_create([
+                cls(
+                    fecha=fila['dia'],
+                    monos_id=fila['monos_id'],
+                    cantidad=fila['total_cantidad'],
+                    cantidad_total_monos=fila['total_monos'],
+                    ingresos=fila['total_ingresos'],
+                    costos=fila['total_costos'],
+                    ganancia=fila['total_ganancia'],
+                    n_ventas=fila['total_ventas'],
+                )
+                for fila in filas.iterator()
+            ], batch_size=1000)
+            VersionDatos.incrementar('VentaMonos')
+        return len(creados)
+
+
 class ListaProduccion(models.Model):
     """Modelo principal para gestionar listas de producción de moños"""
     
@@ -549,6 +795,9 @@ class ListaProduccion(models.Model):
         ('archivado', 'Archivado'),
     ]
     
+    # Campos que recalcula actualizar_resumen
+    CAMPOS_RESUMEN = ['materiales_faltantes_count', 'total_moños_planificados', 'total_moños_producidos']
+    
     nombre = models.CharField(
         max_length=100, 
         help_text="Nombre descriptivo de la lista de producción"
@@ -584,6 +833,34 @@ class ListaProduccion(models.Model):
         default=0
     )
     
+    # Costo real (se calcula al finalizar con los movimientos de producción)
+    costo_real = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text="Costo de los materiales descontados para producir la lista"
+    )
+    ganancia_real = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        help_text="Ingreso por ventas menos el costo real"
+    )
+    
+    # Resumen de estado (se actualiza en las mismas transacciones que lo modifican)
+    materiales_faltantes_count = models.PositiveIntegerField(
+        default=0,
+        help_text="Materiales del resumen con cantidad faltante > 0"
+    )
+    accion_siguiente = models.CharField(
+        max_length=50,
+        blank=True,
+        default='',
+        help_text="Siguiente acción del panel según el estado actual"
+    )
+    
     class Meta:
         verbose_name = "Lista de Producción"
         verbose_name_plural = "Listas de Producción"
@@ -591,6 +868,54 @@ class ListaProduccion(models.Model):
     
     def __str__(self):
         return f"{self.nombre} ({self.get_estado_display()})"
+    
+    def save(self, *args, **kwargs):
+        # La acción siguiente depende solo de campos propios, se recalcula sin consultas
+        self.accion_siguiente = self.calcular_accion_siguiente()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'accion_siguiente' not in update_fields:
+            kwargs['update_fields'] = list(update_fields) + ['accion_siguiente']
+        super().save(*args, **kwargs)
+    
+    @property
+    def paso_actual(self):
+        """Número de paso (1-7) del flujo según el estado"""
+        return PASO_POR_ESTADO.get(self.estado, 1)
+    
+    @property
+    def accion_siguiente_info(self):
+        """Descriptor del botón de la acción siguiente (o None)"""
+        return ACCIONES_SIGUIENTES.get(self.accion_siguiente)
+    
+    def calcular_accion_siguiente(self):
+        """Determina la acción siguiente a partir del estado y los faltantes guardados"""
+        if self.estado == 'comprado' and self.materiales_faltantes_count > 0:
+            return ''
+        return ACCION_POR_ESTADO.get(self.estado, '')
+    
+    def actualizar_resumen(self, guardar=True):
+        """
+        Recalcula los campos de resumen (faltantes y totales planificados/producidos)
+        con una consulta agregada por tabla. Debe llamarse dentro de la misma
+        transacción que modifica los detalles o el resumen de materiales.
+        """
+        self.materiales_faltantes_count = self.resumen_materiales.filter(
+            cantidad_faltante__gt=0
+        ).count()
+        
+        multiplicador = models.Case(
+            models.When(monos__tipo_venta='par', then=models.Value(2)),
+            default=models.Value(1),
+        )
+        totales = self.detalles_monos.aggregate(
+            planificados=models.Sum(models.F('cantidad') * multiplicador),
+            producidos=models.Sum(models.F('cantidad_producida') * multiplicador),
+        )
+        self.total_moños_planificados = totales['planificados'] or 0
+        self.total_moños_producidos = totales['producidos'] or 0
+        
+        if guardar and self.pk:
+            self.save(update_fields=self.CAMPOS_RESUMEN)
 
 
 class DetalleListaMonos(models.Model):
@@ -777,6 +1102,223 @@ class ResumenMateriales(models.Model):
 # SISTEMA DE PERMISOS Y PERFILES DE USUARIO
 # ========================================================================================
 
+class TransicionListaProduccion(models.Model):
+    """Bitácora de solo-inserción de los cambios de estado de una lista de producción"""
+    
+    lista = models.ForeignKey(
+        ListaProduccion,
+        on_delete=models.CASCADE,
+        related_name='transiciones'
+    )
+    estado_anterior = models.CharField(
+        max_length=20,
+        choices=ListaProduccion.ESTADO_CHOICES,
+        blank=True,
+        help_text="Vacío para el registro inicial de la lista"
+    )
+    estado_nuevo = models.CharField(
+        max_length=20,
+        choices=ListaProduccion.ESTADO_CHOICES
+    )
+    fecha = models.DateTimeField(default=timezone.now)
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True
+    )
+    nota = models.CharField(max_length=200, blank=True)
+    
+    class Meta:
+        verbose_name = "Transición de Lista"
+        verbose_name_plural = "Transiciones de Listas"
+        ordering = ['-fecha']
+        indexes = [
+            models.Index(fields=['lista', 'fecha']),
+            models.Index(fields=['estado_nuevo', 'fecha']),
+        ]
+    
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError("Las transiciones no se pueden modificar una vez registradas")
+        super().save(*args, **kwargs)
+    
+    def __str__(self):
+        return f"{self.lista.nombre}: {self.estado_anterior or '-'} → {self.estado_nuevo}"
+
+
+class ListaProduccionArchivo(models.Model):
+    """Copia compacta (JSON comprimido) de una lista archivada y sus detalles"""
+    
+    lista = models.OneToOneField(
+        ListaProduccion,
+        on_delete=models.CASCADE,
+        related_name='archivo'
+    )
+    datos = models.BinaryField(help_text="JSON comprimido con zlib")
+    version = models.PositiveSmallIntegerField(default=1)
+    filas_compactadas = models.PositiveIntegerField(
+        default=0,
+        help_text="Filas de detalle y resumen eliminadas de las tablas activas"
+    )
+    fecha_archivo = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name = "Archivo de Lista"
+        verbose_name_plural = "Archivos de Listas"
+    
+    def __str__(self):
+        return f"Archivo de {self.lista.nombre} ({len(self.datos)} bytes)"
+    
+    @cached_property
+    def contenido(self):
+        """Snapshot descomprimido (se decodifica solo al consultarlo)"""
+        from .archivo_listas import descomprimir
+        return descomprimir(self.datos)
+    
+    def detalles_monos(self):
+        """DetalleListaMonos sin guardar, reconstruidos desde el snapshot"""
+        from .archivo_listas import rehidratar_detalles
+        return rehidratar_detalles(self)
+    
+    def resumen_materiales(self):
+        """ResumenMateriales sin guardar, reconstruidos desde el snapshot"""
+        from .archivo_listas import rehidratar_resumen
+        return rehidratar_resumen(self)
+
+
+class PuntoControlMigracion(models.Model):
+    """Último registro procesado por una migración de datos, para reanudarla"""
+    
+    nombre = models.CharField(max_length=50, unique=True)
+    ultimo_id = models.PositiveBigIntegerField(default=0)
+    procesados = models.PositiveIntegerField(default=0)
+    filas_creadas = models.PositiveIntegerField(default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Punto de Control de Migración"
+        verbose_name_plural = "Puntos de Control de Migración"
+    
+    def __str__(self):
+        return f"{self.nombre}: hasta #{self.ultimo_id} ({self.procesados} procesados)"
+
+
+class VersionDatos(models.Model):
+    """
+    Contador monótono de cambios por modelo. Se incrementa en la misma
+    transacción que la escritura (señales o llamada explícita tras operaciones
+    en bloque) y sirve para calcular ETags sin consultar los datos.
+    """
+    
+    modelo = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    
+    class Meta:
+        verbose_name = "Versión de Datos"
+        verbose_name_plural = "Versiones de Datos"
+    
+    def __str__(self):
+        return f"{self.modelo} v{self.version}"
+    
+    @classmethod
+    def incrementar(cls, *modelos):
+        """Incrementa la versión de los modelos dados (crea el contador si no existe)"""
+        from django.db import IntegrityError, transaction
+        from django.db.models import F
+        
+        for modelo in modelos:
+            if cls.objects.filter(modelo=modelo).update(version=F('version') + 1):
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(modelo=modelo, version=1)
+            except IntegrityError:
+                # Otro proceso creó el contador entre el update y el create
+                cls.objects.filter(modelo=modelo).update(version=F('version') + 1)
+    
+    @classmethod
+    def actuales(cls, modelos):
+        """{modelo: versión} en una consulta; 0 para los que nunca cambiaron"""
+        versiones = dict(cls.objects.filter(modelo__in=modelos).values_list('modelo', 'version'))
+        return {modelo: versiones.get(modelo, 0) for modelo in modelos}
+
+
+class ConsultaLenta(models.Model):
+    """
+    Consultas SQL que superaron CONSULTAS_LENTAS_MS, agrupadas por vista y huella
+    (el SQL sin valores). Guarda el plan de ejecución de la primera captura y las
+    últimas duraciones para el p95. La tabla se mantiene acotada (ver consultas_lentas.py).
+    """
+    
+    firma = models.CharField(max_length=40, unique=True, help_text="SHA-1 de vista y huella")
+    vista = models.CharField(max_length=100, blank=True)
+    huella = models.TextField()
+    sql_ejemplo = models.TextField(help_text="Última sentencia capturada, con sus parámetros")
+    plan = models.TextField(blank=True)
+    veces = models.PositiveIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    muestras = models.JSONField(default=list, help_text="Últimas duraciones en ms")
+    primera_vez = models.DateTimeField(auto_now_add=True)
+    ultima_vez = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = "Consulta Lenta"
+        verbose_name_plural = "Consultas Lentas"
+        ordering = ['-total_ms']
+        indexes = [
+            models.Index(fields=['ultima_vez']),
+        ]
+    
+    def __str__(self):
+        return f"{self.vista or '-'}: {self.huella[:60]} ({self.veces}×)"
+    
+    @property
+    def promedio_ms(self):
+        return self.total_ms / self.veces if self.veces else 0
+    
+    @property
+    def p95_ms(self):
+        """Percentil 95 de las duraciones guardadas"""
+        if not self.muestras:
+            return 0
+        ordenadas = sorted(self.muestras)
+        return ordenadas[min(int(len(ordenadas) * 0.95), len(ordenadas) - 1)]
+
+
+class PerfilPeticion(models.Model):
+    """
+    Resultado de perfilar una petición (?_perfil o cabecera X-Perfil): funciones
+    más costosas según cProfile y sentencias SQL agrupadas por huella. Se
+    conservan los últimos PERFILADO_MAX durante PERFILADO_TTL (ver perfilado.py).
+    """
+    
+    fecha = models.DateTimeField(auto_now_add=True)
+    usuario = models.CharField(max_length=150)
+    metodo = models.CharField(max_length=10)
+    ruta = models.TextField()
+    vista = models.CharField(max_length=100, blank=True)
+    estado = models.PositiveSmallIntegerField()
+    ms = models.FloatField()
+    db_ms = models.FloatField()
+    consultas = models.PositiveIntegerField()
+    funciones_acumulado = models.JSONField(default=list)
+    funciones_propio = models.JSONField(default=list)
+    sql = models.JSONField(default=list, help_text="Sentencias agrupadas por huella")
+    
+    class Meta:
+        verbose_name = "Perfil de Petición"
+        verbose_name_plural = "Perfiles de Peticiones"
+        ordering = ['-fecha']
+        indexes = [
+            models.Index(fields=['fecha']),
+        ]
+    
+    def __str__(self):
+        return f"{self.metodo} {self.ruta[:60]} ({self.ms:.0f} ms)"
+
+
 class UserProfile(models.Model):
     """Perfil de usuario con niveles de permisos personalizados"""
     
@@ -843,3 +1385,27 @@ def guardar_perfil_usuario(sender, instance, **kwargs):
             instance.userprofile.save()
         except Exception:
             pass  # Evitar errores si el perfil está siendo creado
+
+
+@receiver(post_save, sender=VentaMonos)
+def acumular_venta_diaria(sender, instance, created, **kwargs):
+    """Suma cada venta nueva al resumen diario (bulk_create llama a VentaDiaria.acumular)"""
+    if created and not kwargs.get('raw', False):
+        VentaDiaria.acumular([instance])
+
+
+@receiver(post_delete, sender=VentaMonos)
+def descontar_venta_diaria(sender, instance, **kwargs):
+    """Quita la venta eliminada de su resumen diario"""
+    VentaDiaria.acumular([instance], signo=-1)
+
+
+def incrementar_version_datos(sender, **kwargs):
+    """Marca el modelo como modificado (ETags y claves de cache_catalogo)"""
+    if not kwargs.get('raw', False):
+        VersionDatos.incrementar(sender.__name__)
+
+
+for _modelo in (Material, Movimiento, Monos, RecetaMonos, Simulacion, ListaProduccion, VentaMonos, MovimientoEfectivo):
+    post_save.connect(incrementar_version_datos, sender=_modelo, dispatch_uid=f'version_datos_save_{_modelo.__name__}')
+    post_delete.connect(incrementar_version_datos, sender=_modelo, dispatch_uid=f'version_datos_delete_{_modelo.__name__}')
@@ -0,0 +1,167 @@
+"""
+Descriptores de los 7 pasos del flujo de una lista de producción.
+
+Se construyen una sola vez al importar el módulo; las vistas (panel, tablero
+y sidebar) solo hacen búsquedas en estos diccionarios.
+"""
+
+# Pasos del panel unificado
+PASOS_LISTA = (
+    {
+        'numero': 1,
+        'nombre': 'Creada',
+        'estado_requerido': 'borrador',
+        'icono': 'fas fa-check-circle',
+        'color': 'success',
+        'descripcion': 'Lista creada exitosamente'
+    },
+    {
+        'numero': 2,
+        'nombre': 'Lista de Compras',
+        'estado_requerido': 'pendiente_compra',
+        'icono': 'fas fa-file-download',
+        'color': 'primary',
+        'descripcion': 'Descargar lista de materiales a comprar'
+    },
+    {
+        'numero': 3,
+        'nombre': 'Registrar Compras',
+        'estado_requerido': 'comprado',
+        'icono': 'fas fa-shopping-cart',
+        'color': 'info',
+        'descripcion': 'Ingresar cantidades compradas'
+    },
+    {
+        'numero': 4,
+        'nombre': 'Materiales Listos',
+        'estado_requerido': 'reabastecido',
+        'icono': 'fas fa-box-check',
+        'color': 'warning',
+        'descripcion': 'Verificar inventario actualizado'
+    },
+    {
+        'numero': 5,
+        'nombre': 'Produciendo',
+        'estado_requerido': 'en_produccion',
+        'icono': 'fas fa-industry',
+        'color': 'purple',
+        'descripcion': 'Crear moños y registrar producción'
+    },
+    {
+        'numero': 6,
+        'nombre': 'Salida y Ventas',
+        'estado_requerido': 'en_salida',
+        'icono': 'fas fa-cash-register',
+        'color': 'orange',
+        'descripcion': 'Registrar ventas realizadas'
+    },
+    {
+        'numero': 7,
+        'nombre': 'Completado',
+        'estado_requerido': 'finalizado',
+        'icono': 'fas fa-trophy',
+        'color': 'success',
+        'descripcion': 'Lista finalizada exitosamente'
+    },
+)
+
+# Paso del flujo que corresponde a cada estado
+PASO_POR_ESTADO = {
+    'borrador': 1,
+    'pendiente_compra': 2,
+    'comprado': 3,
+    'reabastecido': 4,
+    'en_produccion': 5,
+    'en_salida': 6,
+    'finalizado': 7,
+    'archivado': 7,
+}
+
+
+def _status_paso(numero, paso_actual):
+    if numero < paso_actual:
+        return 'completado'
+    if numero == paso_actual:
+        return 'actual'
+    return 'pendiente'
+
+
+# Pasos con su status ya resuelto, indexados por paso actual
+PASOS_POR_PASO_ACTUAL = {
+    paso_actual: tuple(
+        dict(paso, status=_status_paso(paso['numero'], paso_actual))
+        for paso in PASOS_LISTA
+    )
+    for paso_actual in range(1, len(PASOS_LISTA) + 1)
+}
+
+# Botón de "siguiente acción" del panel (la llave es el nombre de la URL)
+ACCIONES_SIGUIENTES = {
+    'generar_archivo_compras': {
+        'texto': 'Descargar Lista de Compras',
+        'url': 'inventario:generar_archivo_compras',
+        'clase': 'btn-primary',
+        'icono': 'fas fa-download',
+        'tipo': 'POST'
+    },
+    'verificar_compras': {
+        'texto': 'Registrar Compras Realizadas',
+        'url': 'inventario:verificar_compras',
+        'clase': 'btn-success',
+        'icono': 'fas fa-shopping-cart'
+    },
+    'enviar_a_reabastecimiento': {
+        'texto': 'Continuar a Materiales Listos',
+        'url': 'inventario:enviar_a_reabastecimiento',
+        'clase': 'btn-success',
+        'icono': 'fas fa-arrow-right',
+        'tipo': 'POST'
+    },
+    'iniciar_produccion': {
+        'texto': 'Iniciar Producción',
+        'url': 'inventario:iniciar_produccion',
+        'clase': 'btn-warning',
+        'icono': 'fas fa-play',
+        'tipo': 'POST'
+    },
+    'enviar_a_salida': {
+        'texto': 'Enviar a Salida',
+        'url': 'inventario:enviar_a_salida',
+        'clase': 'btn-info',
+        'icono': 'fas fa-truck',
+        'tipo': 'POST'
+    },
+    'registrar_ventas_contaduria': {
+        'texto': 'Registrar Ventas',
+        'url': 'inventario:registrar_ventas_contaduria',
+        'clase': 'btn-success',
+        'icono': 'fas fa-dollar-sign'
+    },
+}
+
+# Acción siguiente por estado ('comprado' solo si ya no hay faltantes)
+ACCION_POR_ESTADO = {
+    'borrador': 'generar_archivo_compras',
+    'pendiente_compra': 'verificar_compras',
+    'comprado': 'enviar_a_reabastecimiento',
+    'reabastecido': 'iniciar_produccion',
+    'en_produccion': 'enviar_a_salida',
+    'en_salida': 'registrar_ventas_contaduria',
+}
+
+# Columnas del tablero de listas (listado_listas_produccion);
+# 'siguiente' es el estado destino de la acción en lote de cada columna
+PASOS_TABLERO = (
+    ('borrador', {'nombre': 'Creada', 'numero': 1, 'icono': 'fas fa-check-circle', 'color': 'secondary',
+                  'siguiente': 'pendiente_compra', 'texto_lote': 'Enviar a compras'}),
+    ('pendiente_compra', {'nombre': 'Lista de Compras', 'numero': 2, 'icono': 'fas fa-file-download', 'color': 'warning',
+                          'siguiente': 'comprado', 'texto_lote': 'Marcar como compradas'}),
+    ('comprado', {'nombre': 'Registrar Compras', 'numero': 3, 'icono': 'fas fa-shopping-cart', 'color': 'info',
+                  'siguiente': 'reabastecido', 'texto_lote': 'Enviar a materiales listos'}),
+    ('reabastecido', {'nombre': 'Materiales Listos', 'numero': 4, 'icono': 'fas fa-box-check', 'color': 'success',
+                      'siguiente': 'en_produccion', 'texto_lote': 'Iniciar producción'}),
+    ('en_produccion', {'nombre': 'Produciendo', 'numero': 5, 'icono': 'fas fa-industry', 'color': 'primary',
+                       'siguiente': 'en_salida', 'texto_lote': 'Enviar a salida'}),
+    ('en_salida', {'nombre': 'Salida y Ventas', 'numero': 6, 'icono': 'fas fa-cash-register', 'color': 'dark',
+                   'siguiente': 'finalizado', 'texto_lote': 'Vender todo lo producido y finalizar'}),
+)
@@ -0,0 +1,102 @@
+"""
+Perfilado de peticiones bajo demanda para superusuarios.
+
+Una petición se perfila si lleva ``?_perfil`` en la URL o la cabecera
+``X-Perfil`` y el usuario es superusuario (ver PerfilMiddleware). La vista corre
+bajo cProfile y con un registro de cada sentencia SQL; el resultado (funciones
+más costosas y consultas agrupadas por huella) se guarda en PerfilPeticion,
+así que el enlace de X-Perfil-Url funciona aunque lo atienda otro worker, y se
+consulta en /inventario/debug/perfiles/. Las demás peticiones solo pagan
+la comprobación del parámetro y la cabecera: no se lee el usuario ni se activa
+el profiler.
+
+Con ASGI cProfile solo ve el hilo del event loop (vistas asíncronas); las
+consultas SQL se registran completas en ambos modos.
+"""
+
+import pstats
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import PerfilPeticion
+
+PARAMETRO = '_perfil'
+CABECERA_META = 'HTTP_X_PERFIL'
+
+MAX_PERFILES = getattr(settings, 'PERFILADO_MAX', 20)
+TTL = getattr(settings, 'PERFILADO_TTL', 86400)
+TOP = getattr(settings, 'PERFILADO_TOP', 40)
+
+# Prefijos que se recortan de las rutas de archivo para que la tabla sea legible
+_RAICES = sorted({str(settings.BASE_DIR), sys.prefix, sys.base_prefix}, key=len, reverse=True)
+
+
+def solicitado(request):
+    """¿La petición pide perfilado? (no comprueba permisos)"""
+    return CABECERA_META in request.META or PARAMETRO in request.GET
+
+
+def _ubicacion(archivo, linea):
+    for raiz in _RAICES:
+        if archivo.startswith(raiz):
+            archivo = archivo[len(raiz):].lstrip('/\\')
+            break
+    return f'{Path(archivo).as_posix()}:{linea}' if linea else archivo
+
+
+def _funciones(perfilador, limite):
+    """Top de funciones por tiempo acumulado y por tiempo propio"""
+    filas = []
+    for (archivo, linea, funcion), (primitivas, llamadas, propio, acumulado, _) in pstats.Stats(perfilador).stats.items():
+        filas.append({
+            'funcion': funcion,
+            'ubicacion': _ubicacion(archivo, linea),
+            'llamadas': llamadas if llamadas == primitivas else f'{llamadas}/{primitivas}',
+            'propio_ms': propio * 1000,
+            'acumulado_ms': acumulado * 1000,
+        })
+    por_acumulado = sorted(filas, key=lambda fila: fila['acumulado_ms'], reverse=True)[:limite]
+    por_propio = sorted(filas, key=lambda fila: fila['propio_ms'], reverse=True)[:limite]
+    return por_acumulado, por_propio
+
+
+def guardar(request, response, perfilador, registro, segundos):
+    """Guarda el perfil de la petición, descarta los sobrantes y devuelve su id"""
+    por_acumulado, por_propio = _funciones(perfilador, TOP)
+    perfil = PerfilPeticion.objects.create(
+        usuario=request.user.get_username(),
+        metodo=request.method,
+        ruta=request.get_full_path(),
+        vista=request.resolver_match.view_name[:100] if request.resolver_match else '',
+        estado=response.status_code,
+        ms=segundos * 1000,
+        db_ms=registro.tiempo_db * 1000,
+        consultas=registro.consultas,
+        funciones_acumulado=por_acumulado,
+        funciones_propio=por_propio,
+        sql=registro.mas_costosas(TOP),
+    )
+    sobrantes = PerfilPeticion.objects.values_list('id', flat=True)[MAX_PERFILES:]
+    PerfilPeticion.objects.filter(id__in=list(sobrantes)).delete()
+    PerfilPeticion.objects.filter(fecha__lt=_limite()).delete()
+    return perfil.id
+
+
+def _limite():
+    return timezone.now() - timedelta(seconds=TTL)
+
+
+def listar():
+    """Resúmenes de los últimos perfiles, del más reciente al más antiguo"""
+    return PerfilPeticion.objects.filter(fecha__gte=_limite()).defer(
+        'funciones_acumulado', 'funciones_propio', 'sql'
+    )
+
+
+def obtener(perfil_id):
+    """Perfil completo o None si venció o fue descartado"""
+    return PerfilPeticion.objects.filter(id=perfil_id, fecha__gte=_limite()).first()
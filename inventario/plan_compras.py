@@ -0,0 +1,270 @@
+"""
+Plan de compras de costo mínimo.
+
+Cada material puede comprarse en varias presentaciones (tamaño, precio,
+proveedor y piezas disponibles). Para cubrir un faltante se resuelve una
+mochila acotada de cobertura mínima: elegir cuántas piezas de cada
+presentación comprar para juntar al menos la cantidad faltante al menor costo.
+Los resultados se memorizan por (presentaciones del material, cantidad).
+"""
+
+import math
+from collections import defaultdict
+from decimal import Decimal
+from functools import lru_cache, reduce
+
+from .models import PresentacionMaterial
+
+# Máximo de operaciones (celdas × piezas) de la programación dinámica por
+# material (unas decenas de ms en CPython): el plan se calcula dentro de las
+# vistas. Si la cantidad requiere más, primero se compran por adelantado las
+# piezas que cualquier plan óptimo incluye (ver _adelantar); si el resto aún no
+# cabe, se adelantan más piezas de la presentación sin límite con mejor precio
+# por unidad, y como último recurso se agrupa en bloques mayores (redondeando el
+# contenido de cada presentación hacia abajo, así el plan nunca queda corto).
+MAX_OPERACIONES = 300000
+# Celdas que se dejan para la tabla por cada presentación al adelantar de más
+CELDAS_POR_OPCION = 2000
+
+
+def _centesimos(valor):
+    """Decimal con 2 decimales a entero (evita errores de punto flotante)"""
+    return int((Decimal(valor) * 100).to_integral_value(rounding='ROUND_CEILING'))
+
+
+def _margen(opciones, bloque):
+    """
+    Contenido que un plan óptimo puede cubrir sin la presentación sin límite más
+    barata por unidad, aparte de las limitadas aún más baratas: entre c/bloque
+    piezas peores siempre hay un subconjunto que suma un múltiplo de su contenido c
+    y puede cambiarse por ella sin costar más. Con todas limitadas no hace falta margen.
+    """
+    sin_limite = [(precio / contenido, contenido) for contenido, precio, limite in opciones if limite is None]
+    if not sin_limite:
+        return 0
+    contenido = min(sin_limite)[1]
+    return contenido // bloque * max(c for c, _, _ in opciones)
+
+
+def _adelantar(opciones, objetivo, resto):
+    """
+    Piezas de una sola presentación que se compran antes de la tabla: la sin
+    límite más barata por unidad o, si todas son limitadas, la más barata. Quedan
+    por resolver ``resto`` centésimos más todo lo que cubren las demás limitadas
+    (con presentación sin límite, solo las más baratas que ella). Con
+    ``resto >= _margen(...)`` las piezas adelantadas forman parte de un plan óptimo.
+    Regresa las piezas por opción.
+    """
+    fijas = [0] * len(opciones)
+    sin_limite = [i for i, (_, _, limite) in enumerate(opciones) if limite is None]
+    elegible = sin_limite or range(len(opciones))
+    mejor = min(elegible, key=lambda i: opciones[i][1] / opciones[i][0])
+    contenido, precio, limite = opciones[mejor]
+    resto += sum(
+        c * l for i, (c, p, l) in enumerate(opciones)
+        if i != mejor and l is not None and (not sin_limite or p * contenido < precio * c)
+    )
+    if objetivo > resto:
+        piezas = (objetivo - resto) // contenido
+        fijas[mejor] = piezas if limite is None else min(piezas, limite)
+    return fijas
+
+
+def _descontar(opciones, objetivo, fijas):
+    """Opciones con los límites descontados y objetivo que falta tras las piezas ``fijas``"""
+    restantes = tuple(
+        (contenido, precio, None if limite is None else limite - n)
+        for (contenido, precio, limite), n in zip(opciones, fijas)
+    )
+    return restantes, objetivo - sum(contenido * n for (contenido, _, _), n in zip(opciones, fijas))
+
+
+def _operaciones(opciones, bloque, objetivo):
+    celdas = -(-objetivo // bloque)
+    return celdas * len(_piezas(opciones, bloque, celdas))
+
+
+def _piezas(opciones, bloque, celdas):
+    """
+    División binaria de los límites: k piezas de una opción se representan con
+    potencias de 2. Regresa [(indice, piezas, peso en bloques, precio)].
+    """
+    piezas = []
+    for indice, (contenido, precio, limite) in enumerate(opciones):
+        peso = contenido // bloque
+        if peso == 0:
+            continue
+        maximo = -(-celdas // peso)
+        if limite is not None:
+            maximo = min(maximo, limite)
+        k = 1
+        while maximo > 0:
+            tomar = min(k, maximo)
+            piezas.append((indice, tomar, peso * tomar, precio * tomar))
+            maximo -= tomar
+            k *= 2
+    return piezas
+
+
+@lru_cache(maxsize=4096)
+def _resolver(opciones, objetivo):
+    """
+    Mochila acotada de cobertura mínima.
+
+    ``opciones``: tupla de (contenido, precio, limite) en centésimos; limite None
+    significa sin límite. ``objetivo``: cantidad a cubrir en centésimos.
+    Regresa (costo, piezas_por_opcion) o None si las piezas disponibles no alcanzan.
+    """
+    if objetivo <= 0:
+        return 0, (0,) * len(opciones)
+
+    if all(limite is not None for _, _, limite in opciones):
+        if sum(contenido * limite for contenido, _, limite in opciones) < objetivo:
+            return None
+
+    bloque = reduce(math.gcd, (contenido for contenido, _, _ in opciones))
+    fijas = (0,) * len(opciones)
+    if _operaciones(opciones, bloque, objetivo) > MAX_OPERACIONES:
+        margen = _margen(opciones, bloque)
+        restos = [margen]
+        if CELDAS_POR_OPCION * len(opciones) * bloque < margen:
+            restos.append(CELDAS_POR_OPCION * len(opciones) * bloque)  # Aproximado
+        for resto in restos:
+            fijas = _adelantar(opciones, objetivo, resto)
+            restantes, falta = _descontar(opciones, objetivo, fijas)
+            if _operaciones(restantes, bloque, falta) <= MAX_OPERACIONES:
+                break
+    costo_fijas = sum(precio * n for (_, precio, _), n in zip(opciones, fijas))
+    opciones, objetivo = _descontar(opciones, objetivo, fijas)
+    if objetivo <= 0:
+        return costo_fijas, tuple(fijas)
+
+    # El bloque no pasa de la presentación más grande, que siempre debe poder usarse
+    mayor = max(contenido for contenido, _, _ in opciones)
+    while True:
+        celdas = -(-objetivo // bloque)
+        piezas = _piezas(opciones, bloque, celdas)
+        operaciones = celdas * len(piezas)
+        if operaciones <= MAX_OPERACIONES or bloque >= mayor:
+            break
+        bloque = min(bloque * -(-operaciones // MAX_OPERACIONES), mayor)
+
+    infinito = float('inf')
+    costo = [0] + [infinito] * celdas
+    decisiones = []
+    for _, _, peso, precio in piezas:
+        tomada = bytearray(celdas + 1)
+        for t in range(celdas, 0, -1):
+            candidato = costo[t - peso if t > peso else 0] + precio
+            if candidato < costo[t]:
+                costo[t] = candidato
+                tomada[t] = 1
+        decisiones.append(tomada)
+
+    if costo[celdas] == infinito:
+        return None
+
+    cantidades = list(fijas)
+    t = celdas
+    for (indice, tomar, peso, _), tomada in zip(reversed(piezas), reversed(decisiones)):
+        if tomada[t]:
+            cantidades[indice] += tomar
+            t = t - peso if t > peso else 0
+    return costo_fijas + costo[celdas], tuple(cantidades)
+
+
+def presentaciones_de(material, presentaciones=None):
+    """
+    Presentaciones activas del material; si no tiene catálogo se usa la
+    presentación única definida en el propio material (factor y precio).
+    """
+    if presentaciones is None:
+        presentaciones = [p for p in material.presentaciones.all() if p.activo]
+    if presentaciones:
+        return list(presentaciones)
+    if not material.factor_conversion:
+        return []
+    return [PresentacionMaterial(
+        material=material,
+        nombre=material.get_tipo_material_display(),
+        contenido=Decimal(material.factor_conversion),
+        precio=material.precio_compra or Decimal('0'),
+    )]
+
+
+def plan_compra(material, cantidad, presentaciones=None):
+    """
+    Combinación más barata de presentaciones que cubre ``cantidad`` del material.
+
+    Regresa un dict con 'lineas' (presentacion, piezas, contenido, costo),
+    'costo_total', 'cantidad_cubierta', 'completo' y 'texto'.
+    """
+    opciones = presentaciones_de(material, presentaciones)
+    objetivo = _centesimos(max(Decimal(cantidad or 0), Decimal('0')))
+
+    resultado = None
+    if opciones and objetivo > 0:
+        resultado = _resolver(
+            tuple((_centesimos(p.contenido), _centesimos(p.precio), p.disponibles) for p in opciones),
+            objetivo,
+        )
+
+    completo = resultado is not None or objetivo == 0
+    if resultado is not None:
+        cantidades = resultado[1]
+    else:
+        # No alcanza lo disponible: se compra todo lo que hay
+        cantidades = [p.disponibles or 0 for p in opciones]
+
+    lineas = []
+    for presentacion, piezas in zip(opciones, cantidades):
+        if piezas:
+            lineas.append({
+                'presentacion': presentacion,
+                'piezas': piezas,
+                'contenido': presentacion.contenido * piezas,
+                'costo': presentacion.precio * piezas,
+            })
+
+    texto = ' + '.join(
+        f"{linea['piezas']} × {linea['presentacion'].nombre}"
+        + (f" ({linea['presentacion'].proveedor})" if linea['presentacion'].proveedor else '')
+        for linea in lineas
+    )
+    return {
+        'lineas': lineas,
+        'costo_total': sum((linea['costo'] for linea in lineas), Decimal('0')),
+        'cantidad_cubierta': sum((linea['contenido'] for linea in lineas), Decimal('0')),
+        'completo': completo,
+        'texto': texto or 'Sin presentaciones de compra',
+    }
+
+
+def asignar_planes(resumenes):
+    """
+    Calcula ``resumen.plan_compra`` para cada resumen con faltante, cargando
+    las presentaciones de todos los materiales en una sola consulta.
+    """
+    resumenes = [r for r in resumenes if r.cantidad_faltante > 0]
+    por_material = defaultdict(list)
+    for presentacion in PresentacionMaterial.objects.filter(
+        material_id__in={r.material_id for r in resumenes},
+        activo=True
+    ):
+        por_material[presentacion.material_id].append(presentacion)
+
+    for resumen in resumenes:
+        resumen.plan_compra = plan_compra(
+            resumen.material, resumen.cantidad_faltante, por_material.get(resumen.material_id, [])
+        )
+    return resumenes
+
+
+def limpiar_cache():
+    """Vacía la memoria de planes ya resueltos"""
+    _resolver.cache_clear()
+
+
+def estadisticas_cache():
+    """Aciertos y fallos de la memoria del solver"""
+    return _resolver.cache_info()
@@ -0,0 +1,243 @@
+"""
+Pronóstico de demanda semanal por moño.
+
+Se arma una matriz moños × semanas con las cantidades vendidas (pares o
+individuales, igual que DetalleListaMonos.cantidad) y se ajustan varios
+modelos simples para todos los moños a la vez con NumPy: promedio móvil,
+suavizado exponencial y estacional ingenuo. Para cada moño se elige el modelo
+con menor error absoluto en las últimas semanas y con él se propone una lista
+de producción para el siguiente período.
+"""
+
+import math
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+
+from .models import DetalleListaMonos, ListaProduccion, Monos, RecetaMonos, VentaDiaria, VentaMonos
+
+SEMANAS_HISTORIA = 156
+SEMANAS_VALIDACION = 12
+TEMPORADA = 52
+
+
+def _inicio_semana(fecha):
+    """Lunes de la semana de ``fecha``"""
+    return fecha - timedelta(days=fecha.weekday())
+
+
+def _como_fecha(valor):
+    """TruncWeek regresa date sobre DateField y datetime sobre DateTimeField"""
+    return valor.date() if isinstance(valor, datetime) else valor
+
+
+def serie_semanal(semanas=SEMANAS_HISTORIA, monos_ids=None):
+    """
+    Cantidades vendidas por moño en las últimas ``semanas`` semanas completas
+    (la semana en curso no cuenta). Usa el resumen diario si tiene datos y
+    VentaMonos si no. Regresa (ids de moños, lunes de cada semana, matriz
+    moños × semanas).
+    """
+    fin = _inicio_semana(timezone.localdate())
+    inicio = fin - timedelta(weeks=semanas)
+
+    if VentaDiaria.objects.exists():
+        ventas = VentaDiaria.objects.filter(fecha__gte=inicio, fecha__lt=fin)
+        campo = 'cantidad'
+    else:
+        ventas = VentaMonos.objects.filter(fecha__date__gte=inicio, fecha__date__lt=fin)
+        campo = 'cantidad_vendida'
+    if monos_ids is not None:
+        ventas = ventas.filter(monos_id__in=monos_ids)
+
+    filas = list(
+        ventas.order_by().annotate(semana=TruncWeek('fecha'))
+        .values_list('monos_id', 'semana').annotate(total=Sum(campo))
+    )
+
+    if monos_ids is None:
+        monos_ids = sorted({monos_id for monos_id, _, _ in filas})
+    ids = np.asarray(list(monos_ids), dtype=np.int64)
+    fechas = [inicio + timedelta(weeks=i) for i in range(semanas)]
+    matriz = np.zeros((len(ids), semanas))
+    if filas:
+        posicion = {monos_id: i for i, monos_id in enumerate(ids.tolist())}
+        renglones = np.fromiter((posicion[f[0]] for f in filas), dtype=np.int64, count=len(filas))
+        columnas = np.fromiter(
+            ((_como_fecha(f[1]) - inicio).days // 7 for f in filas),
+            dtype=np.int64, count=len(filas)
+        )
+        np.add.at(matriz, (renglones, columnas), [float(f[2]) for f in filas])
+    return ids, fechas, matriz
+
+
+def media_movil(serie, ventana, horizonte):
+    """Ajustes a un paso y pronóstico plano con el promedio de las últimas ``ventana`` semanas"""
+    n, semanas = serie.shape
+    acumulado = np.concatenate([np.zeros((n, 1)), np.cumsum(serie, axis=1)], axis=1)
+    ajustes = np.full((n, semanas), np.nan)
+    if semanas > ventana:
+        ajustes[:, ventana:] = (acumulado[:, ventana:semanas] - acumulado[:, :semanas - ventana]) / ventana
+    nivel = serie[:, -ventana:].mean(axis=1) if semanas else np.zeros(n)
+    return ajustes, np.repeat(nivel[:, None], horizonte, axis=1)
+
+
+def suavizado_exponencial(serie, alfa, horizonte):
+    """Suavizado exponencial simple: ajustes a un paso y pronóstico plano del último nivel"""
+    n, semanas = serie.shape
+    ajustes = np.full((n, semanas), np.nan)
+    if semanas == 0:
+        return ajustes, np.zeros((n, horizonte))
+    nivel = serie[:, 0].copy()
+    for t in range(1, semanas):
+        ajustes[:, t] = nivel
+        nivel += alfa * (serie[:, t] - nivel)
+    return ajustes, np.repeat(nivel[:, None], horizonte, axis=1)
+
+
+def estacional_ingenuo(serie, temporada, horizonte):
+    """Cada semana se pronostica igual a la misma semana de la temporada anterior"""
+    n, semanas = serie.shape
+    ajustes = np.full((n, semanas), np.nan)
+    if semanas < temporada:
+        return ajustes, np.full((n, horizonte), np.nan)
+    ajustes[:, temporada:] = serie[:, :semanas - temporada]
+    indices = semanas - temporada + (np.arange(horizonte) % temporada)
+    return ajustes, serie[:, indices]
+
+
+# Modelos candidatos: nombre → función(serie, horizonte) que regresa (ajustes, pronóstico)
+MODELOS = OrderedDict([
+    ('Promedio móvil 4 semanas', lambda serie, h: media_movil(serie, 4, h)),
+    ('Promedio móvil 12 semanas', lambda serie, h: media_movil(serie, 12, h)),
+    ('Suavizado exponencial α=0.2', lambda serie, h: suavizado_exponencial(serie, 0.2, h)),
+    ('Suavizado exponencial α=0.5', lambda serie, h: suavizado_exponencial(serie, 0.5, h)),
+    ('Estacional ingenuo (52 semanas)', lambda serie, h: estacional_ingenuo(serie, TEMPORADA, h)),
+])
+
+
+def ajustar(serie, horizonte=4, validacion=SEMANAS_VALIDACION):
+    """
+    Ajusta todos los modelos a la matriz moños × semanas y elige por moño el
+    de menor error absoluto medio en las últimas ``validacion`` semanas.
+    Regresa un dict con 'modelos' (nombres), 'mejor' (índice por moño),
+    'error' (MAE del mejor) y 'pronostico' (moños × horizonte, no negativo).
+    """
+    n = serie.shape[0]
+    errores = np.empty((len(MODELOS), n))
+    pronosticos = np.empty((len(MODELOS), n, horizonte))
+    real = serie[:, -validacion:]
+
+    for i, modelo in enumerate(MODELOS.values()):
+        ajustes, pronostico = modelo(serie, horizonte)
+        diferencia = np.abs(ajustes[:, -validacion:] - real)
+        validos = ~np.isnan(diferencia)
+        cuenta = validos.sum(axis=1)
+        suma = np.where(validos, diferencia, 0).sum(axis=1)
+        # Un modelo sin ajustes en la ventana de validación nunca se elige
+        errores[i] = np.where(cuenta > 0, suma / np.maximum(cuenta, 1), np.inf)
+        pronosticos[i] = np.nan_to_num(pronostico, nan=0.0)
+
+    mejor = errores.argmin(axis=0)
+    columnas = np.arange(n)
+    return {
+        'modelos': list(MODELOS),
+        'mejor': mejor,
+        'error': errores[mejor, columnas],
+        'pronostico': np.clip(pronosticos[mejor, columnas], 0, None),
+    }
+
+
+def pronosticar_demanda(horizonte=4, semanas=SEMANAS_HISTORIA):
+    """
+    Pronóstico de los moños activos para las próximas ``horizonte`` semanas.
+    Regresa una fila por moño con venta histórica, ordenadas por demanda.
+    """
+    activos = list(Monos.objects.filter(activo=True).values_list('id', flat=True))
+    ids, fechas, serie = serie_semanal(semanas, activos)
+    con_ventas = serie.sum(axis=1) > 0
+    ids, serie = ids[con_ventas], serie[con_ventas]
+    if len(ids) == 0:
+        return []
+
+    resultado = ajustar(serie, horizonte)
+    monos = Monos.objects.in_bulk(ids.tolist())
+    filas = []
+    for i, monos_id in enumerate(ids.tolist()):
+        total = float(resultado['pronostico'][i].sum())
+        filas.append({
+            'monos': monos[monos_id],
+            'modelo': resultado['modelos'][resultado['mejor'][i]],
+            'error': float(resultado['error'][i]),
+            'promedio_semanal': float(serie[i, -12:].mean()),
+            'pronostico_semanal': float(resultado['pronostico'][i, 0]),
+            'pronostico_total': total,
+            'cantidad_sugerida': math.ceil(total - 1e-9),
+        })
+    filas.sort(key=lambda fila: (-fila['pronostico_total'], fila['monos'].nombre))
+    return filas
+
+
+def materiales_requeridos(cantidades):
+    """
+    Materiales necesarios para producir ``cantidades`` ({monos_id: cantidad en
+    pares o individuales}), con lo disponible y lo faltante de cada uno.
+    """
+    necesidades = {}
+    for receta in RecetaMonos.objects.filter(monos_id__in=cantidades).select_related('material', 'monos'):
+        factor = 2 if receta.monos.tipo_venta == 'par' else 1
+        necesario = receta.cantidad_necesaria * cantidades[receta.monos_id] * factor
+        datos = necesidades.setdefault(receta.material_id, {
+            'material': receta.material,
+            'cantidad_necesaria': Decimal('0'),
+        })
+        datos['cantidad_necesaria'] += necesario
+
+    for datos in necesidades.values():
+        datos['cantidad_disponible'] = datos['material'].cantidad_disponible
+        datos['cantidad_faltante'] = max(Decimal('0'), datos['cantidad_necesaria'] - datos['cantidad_disponible'])
+    return sorted(necesidades.values(), key=lambda datos: (-datos['cantidad_faltante'], datos['material'].nombre))
+
+
+def crear_lista_sugerida(cantidades, usuario, nombre=None, descripcion=''):
+    """
+    Crea una lista de producción en borrador con las cantidades sugeridas y
+    su resumen de materiales. ``cantidades``: {monos_id: cantidad}.
+    """
+    from .transiciones import registrar_creacion
+    from .views import calcular_costos_estimados, calcular_materiales_necesarios
+
+    cantidades = {monos_id: cantidad for monos_id, cantidad in cantidades.items() if cantidad > 0}
+    if not cantidades:
+        raise ValueError('El pronóstico no sugiere producir ningún moño')
+    # Solo los moños activos que puede incluir el pronóstico
+    monos = Monos.objects.filter(activo=True).in_bulk(cantidades)
+    if len(monos) < len(cantidades):
+        raise ValueError('La lista incluye moños que no existen o ya no están activos')
+
+    with transaction.atomic():
+        lista = ListaProduccion.objects.create(
+            nombre=nombre or f'Sugerida {timezone.localdate():%d/%m/%Y}',
+            descripcion=descripcion,
+            usuario_creador=usuario,
+        )
+        registrar_creacion(lista, usuario)
+        DetalleListaMonos.objects.bulk_create([
+            DetalleListaMonos(lista_produccion=lista, monos_id=monos_id, cantidad=cantidad)
+            for monos_id, cantidad in cantidades.items()
+        ])
+        lista.total_moños_planificados = sum(
+            cantidad * (2 if monos[monos_id].tipo_venta == 'par' else 1)
+            for monos_id, cantidad in cantidades.items()
+        )
+        calcular_materiales_necesarios(lista)
+        calcular_costos_estimados(lista)
+        lista.actualizar_resumen(guardar=False)
+        lista.save()
+    return lista
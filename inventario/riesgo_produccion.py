@@ -0,0 +1,195 @@
+"""
+Simulación Monte Carlo de la ganancia de una lista de producción.
+
+En cada ensayo se sortea, por moño, qué fracción de lo planificado se vende
+(distribución Beta ajustada a lo vendido vs planificado en listas anteriores)
+y, por material, cuánto cambia su precio (lognormal ajustada a las compras
+registradas en Movimiento). Todos los ensayos se calculan a la vez con NumPy.
+"""
+
+import math
+from collections import defaultdict
+
+import numpy as np
+from django.db.models import Sum
+
+from .archivo_listas import columnas_detalles, detalles_y_resumen
+from .models import DetalleListaMonos, ListaProduccionArchivo, Movimiento, RecetaMonos, VentaMonos
+
+ENSAYOS = 10000
+
+# Supuestos cuando no hay historia suficiente
+TASA_VENTA_PREVIA = 0.9
+CONCENTRACION_PREVIA = 10.0
+VOLATILIDAD_PRECIO_PREVIA = 0.05
+
+
+def _beta_por_momentos(tasas):
+    """Parámetros (a, b) de una Beta con la media y varianza de ``tasas``"""
+    media = min(max(float(np.mean(tasas)), 0.01), 0.99)
+    varianza = float(np.var(tasas, ddof=1)) if len(tasas) > 1 else 0.0
+    if varianza > 0:
+        concentracion = min(max(media * (1 - media) / varianza - 1, 2.0), 200.0)
+    else:
+        concentracion = 200.0 if len(tasas) > 1 else CONCENTRACION_PREVIA
+    return media * concentracion, (1 - media) * concentracion
+
+
+def _planificados(lista_ids):
+    """(lista_id, monos_id, planificado) de las tablas activas y de los snapshots de listas compactadas"""
+    yield from DetalleListaMonos.objects.filter(
+        lista_produccion_id__in=lista_ids, cantidad__gt=0
+    ).values_list('lista_produccion_id', 'monos_id', 'cantidad')
+    for archivo in ListaProduccionArchivo.objects.filter(lista_id__in=lista_ids).only('lista_id', 'datos'):
+        for monos_id, planificado in columnas_detalles(archivo, 'monos_id', 'cantidad'):
+            if planificado > 0:
+                yield archivo.lista_id, monos_id, planificado
+
+
+def tasas_de_venta(monos_ids):
+    """
+    Fracción vendida de lo planificado en cada lista anterior con ventas (incluye
+    las listas archivadas y compactadas). Es la misma base con la que
+    simular_ganancia sortea los vendidos; cantidad_producida no sirve porque las
+    listas antiguas la sobrescribían con lo vendido al registrar las ventas.
+    Regresa ({monos_id: (a, b, observaciones)}, (a, b) del conjunto).
+    """
+    vendidos = {
+        (fila['lista_produccion_id'], fila['monos_id']): fila['total']
+        for fila in VentaMonos.objects.filter(lista_produccion__isnull=False)
+        .values('lista_produccion_id', 'monos_id').annotate(total=Sum('cantidad_vendida')).order_by()
+    }
+    observaciones = defaultdict(list)
+    for lista_id, monos_id, planificado in _planificados({lista_id for lista_id, _ in vendidos}):
+        observaciones[monos_id].append(min(vendidos.get((lista_id, monos_id), 0) / planificado, 1.0))
+
+    todas = [tasa for tasas in observaciones.values() for tasa in tasas]
+    if todas:
+        conjunto = _beta_por_momentos(todas)
+    else:
+        conjunto = (TASA_VENTA_PREVIA * CONCENTRACION_PREVIA, (1 - TASA_VENTA_PREVIA) * CONCENTRACION_PREVIA)
+
+    por_mono = {}
+    for monos_id in monos_ids:
+        tasas = observaciones.get(monos_id, [])
+        if len(tasas) >= 2:
+            por_mono[monos_id] = (*_beta_por_momentos(tasas), len(tasas))
+        else:
+            por_mono[monos_id] = (*conjunto, len(tasas))
+    return por_mono, conjunto
+
+
+def variacion_de_precios(material_ids):
+    """
+    Deriva y volatilidad del precio por unidad base de cada material, a partir
+    del cambio logarítmico entre compras consecutivas. Regresa {material_id: (mu, sigma, compras)}.
+    """
+    costos = defaultdict(list)
+    for material_id, cantidad, costo in Movimiento.objects.filter(
+        material_id__in=material_ids,
+        tipo_movimiento='entrada',
+        cantidad__gt=0,
+        costo_total_movimiento__gt=0,
+    ).order_by('material_id', 'fecha').values_list('material_id', 'cantidad', 'costo_total_movimiento'):
+        costos[material_id].append(float(costo) / float(cantidad))
+
+    cambios = {
+        material_id: np.diff(np.log(valores))
+        for material_id, valores in costos.items() if len(valores) >= 2
+    }
+    todos = np.concatenate(list(cambios.values())) if cambios else np.array([])
+    sigma_conjunto = float(np.std(todos, ddof=1)) if len(todos) > 1 else VOLATILIDAD_PRECIO_PREVIA
+
+    resultado = {}
+    for material_id in material_ids:
+        cambio = cambios.get(material_id)
+        if cambio is not None and len(cambio) >= 2:
+            resultado[material_id] = (float(cambio.mean()), float(cambio.std(ddof=1)), len(costos[material_id]))
+        else:
+            resultado[material_id] = (0.0, sigma_conjunto, len(costos.get(material_id, [])))
+    return resultado
+
+
+def simular_ganancia(lista, ensayos=ENSAYOS, semilla=None):
+    """
+    Distribución de la ganancia de ``lista`` en ``ensayos`` escenarios.
+    Regresa percentiles P5/P50/P95, media, probabilidad de pérdida,
+    histograma y los supuestos usados por moño y por material.
+    """
+    detalles, _ = detalles_y_resumen(lista)
+    detalles = [detalle for detalle in detalles if detalle.cantidad > 0]
+    if not detalles:
+        raise ValueError('La lista no tiene moños planificados')
+
+    monos = [detalle.monos for detalle in detalles]
+    monos_ids = [m.id for m in monos]
+    cantidades = np.array([detalle.cantidad for detalle in detalles], dtype=np.int64)
+    precios = np.array([float(m.precio_venta) for m in monos])
+    factores = np.array([2 if m.tipo_venta == 'par' else 1 for m in monos])
+
+    # Material necesario por lista completa y su costo al precio actual
+    necesario = defaultdict(float)
+    materiales = {}
+    posicion = {monos_id: i for i, monos_id in enumerate(monos_ids)}
+    for receta in RecetaMonos.objects.filter(monos_id__in=monos_ids).select_related('material'):
+        i = posicion[receta.monos_id]
+        necesario[receta.material_id] += float(receta.cantidad_necesaria) * cantidades[i] * factores[i]
+        materiales[receta.material_id] = receta.material
+    material_ids = list(materiales)
+    costo_base = np.array([necesario[mid] * float(materiales[mid].costo_unitario) for mid in material_ids])
+
+    tasas, _ = tasas_de_venta(monos_ids)
+    alfa = np.array([tasas[mid][0] for mid in monos_ids])
+    beta = np.array([tasas[mid][1] for mid in monos_ids])
+    precios_hist = variacion_de_precios(material_ids)
+    mu = np.array([precios_hist[mid][0] for mid in material_ids])
+    sigma = np.array([precios_hist[mid][1] for mid in material_ids])
+
+    generador = np.random.default_rng(semilla)
+    venta = generador.beta(alfa, beta, size=(ensayos, len(monos_ids)))
+    vendidos = generador.binomial(cantidades, venta)
+    ingreso = vendidos @ precios
+    if material_ids:
+        costo = np.exp(generador.normal(mu, sigma, size=(ensayos, len(material_ids)))) @ costo_base
+    else:
+        costo = np.zeros(ensayos)
+    ganancia = ingreso - costo
+
+    p5, p50, p95 = np.percentile(ganancia, [5, 50, 95])
+    conteos, bordes = np.histogram(ganancia, bins=30)
+    return {
+        'ensayos': ensayos,
+        'p5': float(p5),
+        'p50': float(p50),
+        'p95': float(p95),
+        'media': float(ganancia.mean()),
+        'probabilidad_perdida': float((ganancia < 0).mean()),
+        'ingreso_esperado': float(ingreso.mean()),
+        'costo_esperado': float(costo.mean()),
+        'ganancia_determinista': float(cantidades @ precios - costo_base.sum()),
+        'histograma': {
+            'conteos': conteos.tolist(),
+            'bordes': [round(float(borde), 2) for borde in bordes],
+        },
+        'monos': [
+            {
+                'monos': m,
+                'cantidad': int(cantidades[i]),
+                'tasa_venta': float(alfa[i] / (alfa[i] + beta[i])),
+                'observaciones': tasas[m.id][2],
+                'vendidos_promedio': float(vendidos[:, i].mean()),
+            }
+            for i, m in enumerate(monos)
+        ],
+        'materiales': [
+            {
+                'material': materiales[mid],
+                'cantidad_necesaria': necesario[mid],
+                'costo_base': float(costo_base[j]),
+                'deriva': math.expm1(mu[j]),
+                'volatilidad': float(sigma[j]),
+                'compras': precios_hist[mid][2],
+            }
+            for j, mid in enumerate(material_ids)
+        ],
+    }
@@ -0,0 +1,101 @@
+"""
+Sensibilidad de márgenes a cambios de precio de materiales.
+
+Se arma la matriz de recetas (moños × materiales) con una sola consulta y se
+recalcula el costo de todos los moños activos con un producto matricial, antes
+y después de los cambios de precio hipotéticos. El costo por moño es el mismo
+que ``Monos.costo_produccion`` (suma de cantidad × costo unitario del material).
+"""
+
+from datetime import timedelta
+
+import numpy as np
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import Material, Monos, RecetaMonos, VentaDiaria
+
+UMBRAL_MARGEN = 20
+DIAS_VOLUMEN = 90
+
+
+def matriz_recetas(monos_ids, material_ids):
+    """Cantidad de cada material (columnas) que lleva cada moño (renglones)"""
+    renglon = {monos_id: i for i, monos_id in enumerate(monos_ids)}
+    columna = {material_id: j for j, material_id in enumerate(material_ids)}
+    matriz = np.zeros((len(monos_ids), len(material_ids)))
+    for monos_id, material_id, cantidad in RecetaMonos.objects.filter(
+        monos_id__in=monos_ids
+    ).values_list('monos_id', 'material_id', 'cantidad_necesaria'):
+        if material_id in columna:
+            matriz[renglon[monos_id], columna[material_id]] = float(cantidad)
+    return matriz
+
+
+def analizar_cambios(cambios, umbral=UMBRAL_MARGEN, dias=DIAS_VOLUMEN):
+    """
+    Aplica ``cambios`` ({material_id: cambio en % del precio}) y recalcula costo,
+    ganancia unitaria y margen de todos los moños activos.
+
+    Regresa un dict con 'filas' (moños cuyo costo cambia, del menor al mayor
+    margen nuevo), 'en_riesgo' (los que quedan bajo ``umbral`` % de margen) y
+    totales ponderados por lo vendido en los últimos ``dias`` días.
+    """
+    materiales = list(Material.objects.values_list('id', 'precio_compra', 'factor_conversion'))
+    material_ids = [material_id for material_id, _, _ in materiales]
+    costo_actual = np.array([
+        float(precio) / factor if factor and precio else 0.0
+        for _, precio, factor in materiales
+    ])
+    factor_cambio = np.array([1 + float(cambios.get(material_id, 0)) / 100 for material_id in material_ids])
+    costo_nuevo = costo_actual * factor_cambio
+
+    monos = list(Monos.objects.filter(activo=True).order_by('nombre'))
+    monos_ids = [m.id for m in monos]
+    recetas = matriz_recetas(monos_ids, material_ids)
+    precios = np.array([float(m.precio_venta) for m in monos])
+
+    costo_antes = recetas @ costo_actual
+    costo_despues = recetas @ costo_nuevo
+    ganancia_antes = precios - costo_antes
+    ganancia_despues = precios - costo_despues
+    with np.errstate(divide='ignore', invalid='ignore'):
+        margen_antes = np.where(precios > 0, ganancia_antes / precios * 100, 0.0)
+        margen_despues = np.where(precios > 0, ganancia_despues / precios * 100, 0.0)
+
+    desde = timezone.localdate() - timedelta(days=dias)
+    volumen = {
+        fila['monos_id']: fila
+        for fila in VentaDiaria.objects.filter(fecha__gte=desde, monos_id__in=monos_ids)
+        .values('monos_id').annotate(vendidos=Sum('cantidad'), ingresos_recientes=Sum('ingresos')).order_by()
+    }
+
+    filas = []
+    for i in np.flatnonzero(~np.isclose(costo_antes, costo_despues)):
+        ventas = volumen.get(monos_ids[i], {})
+        vendidos = ventas.get('vendidos') or 0
+        filas.append({
+            'monos': monos[i],
+            'costo_antes': float(costo_antes[i]),
+            'costo_despues': float(costo_despues[i]),
+            'ganancia_antes': float(ganancia_antes[i]),
+            'ganancia_despues': float(ganancia_despues[i]),
+            'margen_antes': float(margen_antes[i]),
+            'margen_despues': float(margen_despues[i]),
+            'bajo_umbral': bool(margen_despues[i] < umbral),
+            'vendidos': vendidos,
+            'ingresos_recientes': float(ventas.get('ingresos_recientes') or 0),
+            'impacto_ganancia': float((costo_antes[i] - costo_despues[i]) * vendidos),
+        })
+    filas.sort(key=lambda fila: (fila['margen_despues'], fila['monos'].nombre))
+
+    en_riesgo = [fila for fila in filas if fila['bajo_umbral']]
+    return {
+        'filas': filas,
+        'en_riesgo': en_riesgo,
+        'monos_analizados': len(monos),
+        'ingresos_en_riesgo': sum(fila['ingresos_recientes'] for fila in en_riesgo),
+        'impacto_ganancia': sum(fila['impacto_ganancia'] for fila in filas),
+        'umbral': umbral,
+        'dias': dias,
+    }
@@ -1,3 +1,73 @@
-from django.test import TestCase
+import itertools
+import math
+import random
 
-# Create your tests here.
+from django.test import SimpleTestCase
+
+from . import plan_compras
+
+
+def _fuerza_bruta(opciones, objetivo, minimos=None):
+    """Costo mínimo probando todas las combinaciones de piezas (None si no alcanza)"""
+    minimos = minimos or (0,) * len(opciones)
+    rangos = []
+    for (contenido, _, limite), minimo in zip(opciones, minimos):
+        maximo = max(-(-objetivo // contenido), minimo)
+        if limite is not None:
+            maximo = min(maximo, limite)
+        rangos.append(range(minimo, maximo + 1))
+    mejor = None
+    for piezas in itertools.product(*rangos):
+        if sum(contenido * n for (contenido, _, _), n in zip(opciones, piezas)) >= objetivo:
+            costo = sum(precio * n for (_, precio, _), n in zip(opciones, piezas))
+            mejor = costo if mejor is None else min(mejor, costo)
+    return mejor
+
+
+def _opciones_aleatorias(aleatorio, contenido_max):
+    return tuple(
+        (aleatorio.randint(1, contenido_max), aleatorio.randint(1, 100), aleatorio.choice([None, 0, 1, 2, 3, 5]))
+        for _ in range(aleatorio.randint(1, 3))
+    )
+
+
+class PlanComprasTests(SimpleTestCase):
+    """El solver de plan_compras contra una búsqueda exhaustiva"""
+
+    def setUp(self):
+        plan_compras.limpiar_cache()
+
+    def assertPlanOptimo(self, opciones, objetivo):
+        resultado = plan_compras._resolver(opciones, objetivo)
+        esperado = _fuerza_bruta(opciones, objetivo)
+        if esperado is None:
+            self.assertIsNone(resultado, (opciones, objetivo))
+            return
+        costo, piezas = resultado
+        self.assertEqual(costo, esperado, (opciones, objetivo, piezas))
+        self.assertEqual(costo, sum(precio * n for (_, precio, _), n in zip(opciones, piezas)))
+        self.assertGreaterEqual(sum(contenido * n for (contenido, _, _), n in zip(opciones, piezas)), objetivo)
+        for (_, _, limite), n in zip(opciones, piezas):
+            self.assertTrue(limite is None or n <= limite)
+
+    def test_opcion_extra_no_empeora_el_plan(self):
+        self.assertEqual(plan_compras._resolver(((333, 2900, 2), (5000, 1400, 3)), 11959), (4200, (0, 3)))
+        self.assertEqual(plan_compras._resolver(((5000, 1400, 3),), 11959), (4200, (3,)))
+
+    def test_coincide_con_fuerza_bruta(self):
+        aleatorio = random.Random(2024)
+        for _ in range(3000):
+            opciones = _opciones_aleatorias(aleatorio, 60)
+            self.assertPlanOptimo(opciones, aleatorio.randint(1, 300))
+
+    def test_piezas_adelantadas_pertenecen_a_un_plan_optimo(self):
+        aleatorio = random.Random(7)
+        for _ in range(1500):
+            opciones = _opciones_aleatorias(aleatorio, 30)
+            objetivo = aleatorio.randint(1, 400)
+            optimo = _fuerza_bruta(opciones, objetivo)
+            if optimo is None:
+                continue
+            bloque = math.gcd(*(contenido for contenido, _, _ in opciones))
+            fijas = plan_compras._adelantar(opciones, objetivo, plan_compras._margen(opciones, bloque))
+            self.assertEqual(_fuerza_bruta(opciones, objetivo, fijas), optimo, (opciones, objetivo, fijas))
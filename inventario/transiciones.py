@@ -0,0 +1,463 @@
+"""
+Máquina de estados de las listas de producción.
+
+Todas las vistas cambian el estado con ``transicionar``: valida la transición
+contra la tabla ``TRANSICIONES``, ejecuta las guardas, bloquea la fila con
+``select_for_update`` y deja un registro en ``TransicionListaProduccion``.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import (Case, DecimalField, ExpressionWrapper, F, Sum, Value, When,
+                              Window, prefetch_related_objects)
+from django.db.models.functions import Lead
+from django.utils import timezone
+
+from .costo_real import costear_listas
+from .models import (DetalleListaMonos, ListaProduccion, Material, Movimiento, MovimientoEfectivo,
+                     ResumenMateriales, TransicionListaProduccion, VentaDiaria, VentaMonos, VersionDatos)
+
+
+class TransicionInvalida(Exception):
+    """La transición no está permitida o una guarda la rechazó"""
+
+
+# ============================================================================
+# GUARDAS
+# Cada guarda recibe la lista (ya bloqueada) y regresa (permitido, mensaje)
+# ============================================================================
+
+def sin_materiales_faltantes(lista):
+    """Todas las compras de la lista fueron registradas"""
+    if lista.materiales_faltantes_count > 0:
+        return False, f'Aún faltan {lista.materiales_faltantes_count} material(es). Complete las compras primero.'
+    return True, ''
+
+
+def materiales_suficientes(lista):
+    """El inventario alcanza para producir toda la lista"""
+    from .views import verificar_materiales_suficientes
+    return verificar_materiales_suficientes(lista)
+
+
+def tiene_monos(lista):
+    """La lista tiene al menos un moño planificado"""
+    if not lista.detalles_monos.exists():
+        return False, 'La lista no tiene moños planificados.'
+    return True, ''
+
+
+# ============================================================================
+# TABLA DE TRANSICIONES: (origen, destino) -> guardas
+# ============================================================================
+
+TRANSICIONES = {
+    ('borrador', 'pendiente_compra'): (tiene_monos,),
+    ('borrador', 'reabastecido'): (tiene_monos, materiales_suficientes),
+    ('pendiente_compra', 'comprado'): (),
+    ('comprado', 'reabastecido'): (sin_materiales_faltantes,),
+    ('reabastecido', 'en_produccion'): (materiales_suficientes,),
+    ('en_produccion', 'en_salida'): (),
+    ('en_salida', 'finalizado'): (),
+    ('finalizado', 'archivado'): (),
+}
+
+
+def destinos_permitidos(estado):
+    """Estados a los que se puede pasar desde ``estado``"""
+    return [destino for origen, destino in TRANSICIONES if origen == estado]
+
+
+def puede_transicionar(lista, destino):
+    """Indica si la transición existe en la tabla (sin ejecutar guardas)"""
+    return (lista.estado, destino) in TRANSICIONES
+
+
+def obtener_lista_bloqueada(**filtros):
+    """
+    Obtiene la lista con ``select_for_update``. Debe llamarse dentro de
+    ``transaction.atomic()``; lanza ListaProduccion.DoesNotExist si no existe.
+    """
+    return ListaProduccion.objects.select_for_update().get(**filtros)
+
+
+def registrar_creacion(lista, usuario=None):
+    """Registro inicial de la bitácora para una lista recién creada"""
+    return TransicionListaProduccion.objects.create(
+        lista=lista,
+        estado_anterior='',
+        estado_nuevo=lista.estado,
+        usuario=usuario,
+        nota='Lista creada',
+    )
+
+
+def transicionar(lista, destino, usuario=None, nota='', campos=()):
+    """
+    Cambia el estado de la lista a ``destino`` y registra la transición.
+
+    Bloquea la fila y relee la lista desde la base de datos antes de ejecutar
+    las guardas, de modo que dos peticiones concurrentes no puedan aplicar la
+    misma transición dos veces. Solo se guardan el estado y los ``campos`` que
+    el llamador modificó en memoria; esos no se releen.
+    """
+    with transaction.atomic():
+        releer = None
+        if campos:
+            releer = [
+                campo.attname for campo in ListaProduccion._meta.concrete_fields
+                if not campo.primary_key and campo.name not in campos and campo.attname not in campos
+            ]
+        lista.refresh_from_db(fields=releer, from_queryset=ListaProduccion.objects.select_for_update())
+        estado_actual = lista.estado
+
+        guardas = TRANSICIONES.get((estado_actual, destino))
+        if guardas is None:
+            raise TransicionInvalida(
+                f'La lista "{lista.nombre}" no puede pasar de '
+                f'"{lista.get_estado_display()}" a "{dict(ListaProduccion.ESTADO_CHOICES).get(destino, destino)}".'
+            )
+
+        for guarda in guardas:
+            permitido, mensaje = guarda(lista)
+            if not permitido:
+                raise TransicionInvalida(mensaje)
+
+        lista.estado = destino
+        lista.save(update_fields=['estado', 'fecha_modificacion', *campos])
+
+        TransicionListaProduccion.objects.create(
+            lista=lista,
+            estado_anterior=estado_actual,
+            estado_nuevo=destino,
+            usuario=usuario,
+            nota=nota[:200],
+        )
+
+        if destino == 'finalizado':
+            costear_listas([lista])
+
+    return lista
+
+
+# ============================================================================
+# REPORTES
+# ============================================================================
+
+def duracion_por_estado(listas=None):
+    """
+    Duración promedio de cada etapa a partir de la bitácora.
+
+    Usa LEAD(fecha) por lista para obtener el fin de cada etapa en una sola
+    consulta sobre el índice (lista, fecha). Las etapas aún abiertas no cuentan.
+    Regresa {estado: {'promedio': timedelta, 'total': timedelta, 'cantidad': int}}.
+    """
+    transiciones = TransicionListaProduccion.objects.all()
+    if listas is not None:
+        transiciones = transiciones.filter(lista__in=listas)
+
+    transiciones = transiciones.annotate(
+        fin=Window(
+            expression=Lead('fecha'),
+            partition_by=[F('lista_id')],
+            order_by=F('fecha').asc(),
+        )
+    ).order_by().values_list('estado_nuevo', 'fecha', 'fin')
+
+    resultado = {}
+    for estado, inicio, fin in transiciones:
+        if fin is None:
+            continue
+        etapa = resultado.setdefault(estado, {'total': timedelta(0), 'cantidad': 0})
+        etapa['total'] += fin - inicio
+        etapa['cantidad'] += 1
+
+    for etapa in resultado.values():
+        etapa['promedio'] = etapa['total'] / etapa['cantidad']
+
+    return resultado
+
+
+# ============================================================================
+# TRANSICIONES EN LOTE
+# Las guardas y los efectos se resuelven con consultas agregadas para todo el
+# lote y se escriben con bulk_create / bulk_update en una sola transacción.
+# ============================================================================
+
+def _necesidades_materiales(lista_ids):
+    """{lista_id: {material_id: cantidad}} calculado desde las recetas en una consulta"""
+    multiplicador = Case(
+        When(monos__tipo_venta='par', then=Value(2)),
+        default=Value(1),
+    )
+    filas = (
+        DetalleListaMonos.objects
+        .filter(lista_produccion_id__in=lista_ids, monos__recetas__isnull=False)
+        .values('lista_produccion_id', 'monos__recetas__material_id')
+        .annotate(necesario=Sum(ExpressionWrapper(
+            F('monos__recetas__cantidad_necesaria') * F('cantidad') * multiplicador,
+            output_field=DecimalField(max_digits=14, decimal_places=2),
+        )))
+    )
+    necesidades = defaultdict(dict)
+    for fila in filas:
+        necesidades[fila['lista_produccion_id']][fila['monos__recetas__material_id']] = fila['necesario']
+    return necesidades
+
+
+def _materiales_bloqueados(necesidades):
+    """Bloquea los materiales involucrados en el lote"""
+    material_ids = {mid for por_material in necesidades.values() for mid in por_material}
+    return Material.objects.select_for_update().in_bulk(material_ids)
+
+
+def _lote_tiene_monos(listas):
+    con_monos = set(
+        DetalleListaMonos.objects
+        .filter(lista_produccion__in=listas)
+        .values_list('lista_produccion_id', flat=True)
+        .distinct()
+    )
+    return {
+        lista.id: 'La lista no tiene moños planificados.'
+        for lista in listas if lista.id not in con_monos
+    }
+
+
+def _lote_sin_materiales_faltantes(listas):
+    rechazos = {}
+    for lista in listas:
+        permitido, mensaje = sin_materiales_faltantes(lista)
+        if not permitido:
+            rechazos[lista.id] = mensaje
+    return rechazos
+
+
+def _lote_materiales_suficientes(listas):
+    """El inventario debe alcanzar para todas las listas aceptadas del lote juntas"""
+    necesidades = _necesidades_materiales([lista.id for lista in listas])
+    materiales = _materiales_bloqueados(necesidades)
+    restante = {mid: material.cantidad_disponible for mid, material in materiales.items()}
+
+    rechazos = {}
+    for lista in listas:
+        por_material = necesidades.get(lista.id, {})
+        insuficiente = next(
+            (mid for mid, cantidad in por_material.items() if cantidad > restante[mid]),
+            None
+        )
+        if insuficiente is not None:
+            material = materiales[insuficiente]
+            rechazos[lista.id] = (
+                f"Material {material.nombre}: se necesita {por_material[insuficiente]} {material.unidad_base}, "
+                f"pero solo quedan {restante[insuficiente]} disponibles para este lote"
+            )
+            continue
+        for mid, cantidad in por_material.items():
+            restante[mid] -= cantidad
+    return rechazos
+
+
+GUARDAS_EN_LOTE = {
+    tiene_monos: _lote_tiene_monos,
+    sin_materiales_faltantes: _lote_sin_materiales_faltantes,
+    materiales_suficientes: _lote_materiales_suficientes,
+}
+
+
+def _lote_descontar_materiales(listas, usuario):
+    """Descuenta del inventario los materiales de todas las listas (inicio de producción)"""
+    necesidades = _necesidades_materiales([lista.id for lista in listas])
+    materiales = _materiales_bloqueados(necesidades)
+    resumenes = {
+        (resumen.lista_produccion_id, resumen.material_id): resumen
+        for resumen in ResumenMateriales.objects.filter(lista_produccion__in=listas)
+    }
+
+    movimientos = []
+    mensajes = {}
+    for lista in listas:
+        por_material = necesidades.get(lista.id, {})
+        for mid, cantidad in por_material.items():
+            material = materiales[mid]
+            cantidad_anterior = material.cantidad_disponible
+            material.cantidad_disponible -= cantidad
+            costo_unitario = material.costo_unitario
+            movimientos.append(Movimiento(
+                material=material,
+                tipo_movimiento='produccion',
+                cantidad=-cantidad,
+                cantidad_anterior=cantidad_anterior,
+                cantidad_nueva=material.cantidad_disponible,
+                precio_unitario=costo_unitario,
+                costo_total_movimiento=costo_unitario * cantidad if costo_unitario else None,
+                detalle=f"Producción - Lista #{lista.id}: {lista.nombre} (lote)",
+                usuario=usuario,
+                lista_produccion=lista,
+            ))
+            resumen = resumenes.get((lista.id, mid))
+            if resumen is not None:
+                resumen.cantidad_utilizada += cantidad
+        mensajes[lista.id] = f'{len(por_material)} materiales descontados'
+
+    ahora = timezone.now()
+    for material in materiales.values():
+        material.fecha_modificacion = ahora
+    Material.objects.bulk_update(materiales.values(), ['cantidad_disponible', 'fecha_modificacion'], batch_size=500)
+    Movimiento.objects.bulk_create(movimientos, batch_size=500)
+    VersionDatos.incrementar('Material', 'Movimiento')  # bulk_update/bulk_create no envían señales
+    ResumenMateriales.objects.bulk_update(resumenes.values(), ['cantidad_utilizada'], batch_size=500)
+    return mensajes
+
+
+def _lote_registrar_ventas(listas, usuario):
+    """
+    Registra como vendido todo lo producido de cada lista y el ingreso en
+    contaduría. Solo se aplica cuando el llamador lo confirma (``vender_producido``);
+    las ventas parciales se registran lista por lista en contaduría.
+    """
+    prefetch_related_objects(listas, 'detalles_monos__monos__recetas__material')
+
+    ventas = []
+    ingresos = {}
+    for lista in listas:
+        ingreso_lista = Decimal('0')
+        for detalle in lista.detalles_monos.all():
+            if detalle.cantidad_producida <= 0:
+                continue
+            monos = detalle.monos
+            ingreso_venta = monos.precio_venta * detalle.cantidad_producida
+            costo_unitario = monos.costo_produccion
+            ventas.append(VentaMonos(
+                lista_produccion=lista,
+                monos=monos,
+                cantidad_vendida=detalle.cantidad_producida,
+                tipo_venta=monos.tipo_venta,
+                precio_unitario=monos.precio_venta,
+                ingreso_total=ingreso_venta,
+                costo_unitario=costo_unitario,
+                ganancia_total=ingreso_venta - costo_unitario * detalle.cantidad_producida,
+                usuario=usuario,
+            ))
+            ingreso_lista += ingreso_venta
+        ingresos[lista.id] = ingreso_lista
+
+    saldo = MovimientoEfectivo.bloquear_saldo()
+    movimientos = []
+    for lista in listas:
+        if ingresos[lista.id] <= 0:
+            continue
+        movimientos.append(MovimientoEfectivo(
+            concepto=f'Venta de producción - Lista: {lista.nombre}',
+            tipo_movimiento='ingreso',
+            categoria='venta',
+            monto=ingresos[lista.id],
+            saldo_anterior=saldo,
+            saldo_nuevo=saldo + ingresos[lista.id],
+            automatico=True,
+            usuario=usuario,
+            lista_produccion=lista,
+        ))
+        saldo += ingresos[lista.id]
+
+    VentaMonos.objects.bulk_create(ventas, batch_size=500)
+    VentaDiaria.acumular(ventas)
+    MovimientoEfectivo.objects.bulk_create(movimientos, batch_size=500)
+    VersionDatos.incrementar('MovimientoEfectivo')
+    return {
+        lista.id: f'Vendido todo lo producido; ingreso registrado: ${ingresos[lista.id]:,.2f}'
+        for lista in listas
+    }
+
+
+# Efectos secundarios de cada transición al aplicarse en lote
+EFECTOS_EN_LOTE = {
+    ('reabastecido', 'en_produccion'): _lote_descontar_materiales,
+    ('en_salida', 'finalizado'): _lote_registrar_ventas,
+}
+
+
+def transicionar_lote(lista_ids, destino, usuario=None, nota='', vender_producido=False, **filtros):
+    """
+    Aplica la transición a ``destino`` a varias listas en una transacción.
+
+    Las listas que no admiten la transición o no pasan una guarda se omiten;
+    las demás se actualizan juntas. Finalizar en lote registra como vendido
+    todo lo producido, por lo que exige ``vender_producido=True``.
+    Regresa un resultado por id solicitado: {'id', 'nombre', 'ok', 'mensaje'}.
+    """
+    if destino == 'finalizado' and not vender_producido:
+        raise TransicionInvalida(
+            'Finalizar en lote registra como vendido todo lo producido; confirma la venta completa.'
+        )
+    lista_ids = list(dict.fromkeys(int(lista_id) for lista_id in lista_ids))
+    resultados = {
+        lista_id: {'id': lista_id, 'nombre': '', 'ok': False, 'mensaje': 'Lista no encontrada'}
+        for lista_id in lista_ids
+    }
+    nombre_destino = dict(ListaProduccion.ESTADO_CHOICES).get(destino, destino)
+
+    with transaction.atomic():
+        listas = list(
+            ListaProduccion.objects.select_for_update()
+            .filter(id__in=lista_ids, **filtros)
+            .order_by('id')
+        )
+
+        por_origen = defaultdict(list)
+        for lista in listas:
+            resultados[lista.id]['nombre'] = lista.nombre
+            if (lista.estado, destino) in TRANSICIONES:
+                por_origen[lista.estado].append(lista)
+            else:
+                resultados[lista.id]['mensaje'] = (
+                    f'No puede pasar de "{lista.get_estado_display()}" a "{nombre_destino}".'
+                )
+
+        aplicadas = []
+        transiciones = []
+        for origen, grupo in por_origen.items():
+            for guarda in TRANSICIONES[(origen, destino)]:
+                rechazos = GUARDAS_EN_LOTE[guarda](grupo)
+                for lista_id, mensaje in rechazos.items():
+                    resultados[lista_id]['mensaje'] = mensaje
+                grupo = [lista for lista in grupo if lista.id not in rechazos]
+
+            if not grupo:
+                continue
+
+            efecto = EFECTOS_EN_LOTE.get((origen, destino))
+            mensajes = efecto(grupo, usuario) if efecto else {}
+            if destino == 'finalizado':
+                costear_listas(grupo)
+
+            for lista in grupo:
+                lista.estado = destino
+                lista.accion_siguiente = lista.calcular_accion_siguiente()
+                resultados[lista.id].update(
+                    ok=True,
+                    mensaje=mensajes.get(lista.id, f'Enviada a "{nombre_destino}"'),
+                )
+                transiciones.append(TransicionListaProduccion(
+                    lista=lista,
+                    estado_anterior=origen,
+                    estado_nuevo=destino,
+                    usuario=usuario,
+                    nota=(nota or 'Transición en lote')[:200],
+                ))
+            aplicadas.extend(grupo)
+
+        ahora = timezone.now()
+        for lista in aplicadas:
+            lista.fecha_modificacion = ahora
+        if aplicadas:
+            ListaProduccion.objects.bulk_update(
+                aplicadas, ['estado', 'accion_siguiente', 'fecha_modificacion'], batch_size=500
+            )
+            VersionDatos.incrementar('ListaProduccion')
+            TransicionListaProduccion.objects.bulk_create(transiciones, batch_size=500)
+
+    return [resultados[lista_id] for lista_id in lista_ids]
@@ -2,7 +2,8 @@ from django.urls import path
 from . import views
 from .views_contaduria import contaduria_home, flujo_efectivo, registrar_movimiento_efectivo, estado_resultados, exportar_excel_efectivo
 from . import views_analytics
-from .views_debug import verificar_unidades_web, simular_descuento_lista, diagnostico_ventas_web, migrar_ventas_antiguas_web, diagnostico_perfiles_web
+from . import views_ajax
+from .views_debug import verificar_unidades_web, simular_descuento_lista, diagnostico_ventas_web, migrar_ventas_antiguas_web, diagnostico_perfiles_web, perfiles_peticiones, consultas_lentas_web
 
 app_name = 'inventario'
 
@@ -17,7 +18,7 @@ urlpatterns = [
     path('material/<int:material_id>/editar/', views.editar_material, name='editar_material'),
     
     # AJAX
-    path('ajax/material/<int:material_id>/info/', views.obtener_info_material, name='obtener_info_material'),
+    path('ajax/material/<int:material_id>/info/', views_ajax.obtener_info_material, name='obtener_info_material'),
     
     # Moños
     path('monos/', views.lista_monos, name='lista_monos'),
@@ -32,6 +33,7 @@ urlpatterns = [
     
     # Sistema de Listas de Producción (Nuevo)
     path('listas-produccion/', views.listado_listas_produccion, name='listas_produccion'),
+    path('listas-produccion/transicion-masiva/', views.transicion_masiva_listas, name='transicion_masiva_listas'),
     path('lista-produccion/crear/', views.crear_lista_produccion, name='crear_lista_produccion'),
     path('lista-produccion/<int:lista_id>/', views.panel_lista_produccion, name='panel_lista_produccion'),  # Panel unificado
     path('lista-produccion/<int:lista_id>/detalle/', views.detalle_lista_produccion, name='detalle_lista_produccion'),  # Vista anterior
@@ -82,6 +84,10 @@ urlpatterns = [
     # Sistema de Análisis y Reportes
     path('analytics/', views_analytics.analytics_dashboard, name='analytics_dashboard'),
     path('analytics/mono/<int:mono_id>/', views_analytics.analytics_detalle_mono, name='analytics_detalle_mono'),
+    path('analytics/graficos/<slug:grafico>/', views_analytics.analytics_grafico, name='analytics_grafico'),
+    path('analytics/pronostico/', views_analytics.pronostico_demanda, name='pronostico_demanda'),
+    path('analytics/sensibilidad-precios/', views_analytics.sensibilidad_precios, name='sensibilidad_precios'),
+    path('analytics/lista-produccion/<int:lista_id>/riesgo/', views_analytics.riesgo_lista_produccion, name='riesgo_lista_produccion'),
     
     # DEBUG - Vista temporal para verificar unidades
     path('debug/verificar-unidades/', verificar_unidades_web, name='verificar_unidades_web'),
@@ -89,12 +95,15 @@ urlpatterns = [
     path('debug/diagnostico-ventas/', diagnostico_ventas_web, name='diagnostico_ventas_web'),
     path('debug/migrar-ventas-antiguas/', migrar_ventas_antiguas_web, name='migrar_ventas_antiguas_web'),
     path('debug/diagnostico-perfiles/', diagnostico_perfiles_web, name='diagnostico_perfiles_web'),
+    path('debug/perfiles/', perfiles_peticiones, name='perfiles_peticiones'),
+    path('debug/perfiles/<int:perfil_id>/', perfiles_peticiones, name='perfil_peticion'),
+    path('debug/consultas-lentas/', consultas_lentas_web, name='consultas_lentas_web'),
     
     # AJAX
-    path('api/monos/<int:monos_id>/', views.get_monos_info, name='get_monos_info'),
-    path('material-info-entrada/<int:material_id>/', views.material_info_entrada, name='material_info_entrada'),
-    path('material-info-salida/<int:material_id>/', views.material_info_salida, name='material_info_salida'),
-    path('api/material-info/', views.material_info_api, name='material_info_api'),
-    path('detalle-movimiento/<int:movimiento_id>/', views.detalle_movimiento_ajax, name='detalle_movimiento_ajax'),
+    path('api/monos/<int:monos_id>/', views_ajax.get_monos_info, name='get_monos_info'),
+    path('material-info-entrada/<int:material_id>/', views_ajax.material_info_entrada, name='material_info_entrada'),
+    path('material-info-salida/<int:material_id>/', views_ajax.material_info_salida, name='material_info_salida'),
+    path('api/material-info/', views_ajax.material_info_api, name='material_info_api'),
+    path('detalle-movimiento/<int:movimiento_id>/', views_ajax.detalle_movimiento_ajax, name='detalle_movimiento_ajax'),
 
 ]
\ No newline at end of file
@@ -1,7 +1,7 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q
+from django.db.models import Q, Prefetch
 from django.http import JsonResponse
 from django.utils import timezone
 import math
@@ -13,6 +13,11 @@ from .forms import (MaterialForm, MonosForm, RecetaMonosFormSet, SimulacionForm,
                    EntradaDesdeSimulacionForm, SalidaDesdeSimulacionForm, MovimientoEfectivoForm, 
                    FiltroMovimientosEfectivoForm, ListaProduccionForm, DetalleListaMonosFormSet)
 from .permissions import requiere_nivel
+from .cache_catalogo import cache_vista
+from .pasos_lista import PASOS_POR_PASO_ACTUAL, PASOS_TABLERO
+from .transiciones import (TransicionInvalida, transicionar, obtener_lista_bloqueada,
+                           registrar_creacion)
+from .plan_compras import asignar_planes, plan_compra
 from django.core.paginator import Paginator
 from decimal import Decimal
 import math
@@ -97,6 +102,7 @@ def _crear_materiales_basicos():
 
 
 @login_required
+@cache_vista('catalogo')
 def lista_materiales(request):
     """Vista para listar todos los materiales"""
     query = request.GET.get('q', '')
@@ -196,26 +202,10 @@ def editar_material(request, material_id):
     })
 
 
-# ================ VISTAS AJAX ================
-
-@login_required
-def obtener_info_material(request, material_id):
-    """Vista AJAX para obtener información del material"""
-    try:
-        material = Material.objects.get(id=material_id, activo=True)
-        data = {
-            'unidad_base': material.unidad_base,
-            'precio_unitario': float(material.costo_unitario),
-            'nombre': material.nombre,
-            'disponible': float(material.cantidad_disponible)
-        }
-        return JsonResponse(data)
-    except Material.DoesNotExist:
-        return JsonResponse({'error': 'Material no encontrado'}, status=404)
-
 # ================ VISTAS PARA SISTEMA DE SIMULACIÓN ================
 
 @login_required
+@cache_vista('catalogo')
 def lista_monos(request):
     """Vista para listar todos los moños"""
     query = request.GET.get('q', '')
@@ -251,6 +241,7 @@ def lista_monos(request):
 
 
 @login_required
+@cache_vista('catalogo', 'simulaciones')
 def detalle_monos(request, monos_id):
     """Vista para ver detalles de un moño"""
     monos = get_object_or_404(Monos, id=monos_id, activo=True)
@@ -571,6 +562,7 @@ def simulador(request):
 
 
 @login_required
+@cache_vista('simulaciones', 'catalogo')
 def historial_simulaciones(request):
     """Vista para ver historial de simulaciones"""
     form = SimulacionBusquedaForm(request.GET or None)
@@ -641,6 +633,7 @@ def crear_lista_produccion(request):
                     lista = form.save(commit=False)
                     lista.usuario_creador = request.user
                     lista.save()
+                    registrar_creacion(lista, request.user)
                     
                     # 2. Procesar moños del formset
                     moños_agregados = 0
@@ -673,22 +666,20 @@ def crear_lista_produccion(request):
                     # 5. Calcular costos estimados
                     calcular_costos_estimados(lista)
                     
-                    # 6. Verificar si hay materiales suficientes y ajustar estado automáticamente
-                    materiales_suficientes, mensaje_verificacion = verificar_materiales_suficientes(lista)
+                    # 6. Ajustar estado automáticamente según los materiales faltantes
+                    lista.actualizar_resumen(guardar=False)
+                    campos_calculados = [*ListaProduccion.CAMPOS_RESUMEN, 'costo_total_estimado', 'ganancia_estimada']
                     
-                    if materiales_suficientes:
+                    if lista.materiales_faltantes_count == 0:
                         # Hay suficientes materiales, saltar directamente a reabastecido (Paso 4)
-                        lista.estado = 'reabastecido'
-                        lista.save()
+                        transicionar(lista, 'reabastecido', request.user, campos=campos_calculados)
                         mensaje_estado = " La lista está lista para producción (todos los materiales disponibles)."
                         messages.success(request, f'Lista de producción "{lista.nombre}" creada exitosamente con {moños_agregados} tipo(s) de moños.{mensaje_estado}')
                         return redirect('inventario:panel_lista_produccion', lista_id=lista.id)
                     else:
                         # Faltan materiales, ir a paso de compras (Paso 2)
-                        lista.estado = 'pendiente_compra'
-                        lista.save()
-                        materiales_faltantes = lista.resumen_materiales.filter(cantidad_faltante__gt=0).count()
-                        mensaje_estado = f" Se requiere comprar {materiales_faltantes} material(es)."
+                        transicionar(lista, 'pendiente_compra', request.user, campos=campos_calculados)
+                        mensaje_estado = f" Se requiere comprar {lista.materiales_faltantes_count} material(es)."
                         messages.success(request, f'Lista de producción "{lista.nombre}" creada exitosamente con {moños_agregados} tipo(s) de moños.{mensaje_estado}')
                         return redirect('inventario:lista_de_compras')
                     
@@ -853,6 +844,7 @@ def editar_lista_produccion(request, lista_id):
                     # 5. Recalcular costos estimados
                     calcular_costos_estimados(lista)
                     
+                    lista.actualizar_resumen(guardar=False)
                     lista.save()
                     
                     messages.success(request, f'Lista de producción "{lista.nombre}" actualizada exitosamente.')
@@ -935,8 +927,18 @@ def generar_archivo_compras(request, lista_id):
     
     lista = get_object_or_404(ListaProduccion, id=lista_id, usuario_creador=request.user)
     
-    # Obtener materiales faltantes
-    materiales_faltantes = lista.resumen_materiales.filter(cantidad_faltante__gt=0)
+    # Solo el POST avanza el estado (Paso 2 → Paso 3); el GET únicamente descarga
+    if request.method == 'POST' and lista.estado == 'pendiente_compra':
+        try:
+            transicionar(lista, 'comprado', request.user, nota='Lista de compras descargada')
+            messages.success(request, f'Lista "{lista.nombre}" descargada. Ahora pasa al Paso 3 para registrar tus compras.')
+        except TransicionInvalida as e:
+            messages.error(request, str(e))
+    
+    # Obtener materiales faltantes con su plan de compra más barato
+    materiales_faltantes = asignar_planes(
+        lista.resumen_materiales.filter(cantidad_faltante__gt=0).select_related('material')
+    )
     
     # Generar contenido simple
     contenido = f"LISTA DE COMPRAS - {lista.nombre}\n"
@@ -945,14 +947,18 @@ def generar_archivo_compras(request, lista_id):
     contenido += "MATERIALES A COMPRAR:\n"
     contenido += "="*50 + "\n\n"
     
-    if materiales_faltantes.exists():
+    if materiales_faltantes:
+        costo_total = Decimal('0')
         for resumen in materiales_faltantes:
-            material = resumen.material
-            paquetes_necesarios = resumen.paquetes_rollos_necesarios
-            unidad = resumen.unidad_compra_display
-            
-            # Formato simple: Material - Cantidad Paquetes/Rollos
-            contenido += f"{material.nombre} - {paquetes_necesarios} {unidad}{'s' if paquetes_necesarios > 1 else ''}\n"
+            plan = resumen.plan_compra
+            costo_total += plan['costo_total']
+            
+            # Formato simple: Material - Presentaciones (proveedor)
+            contenido += f"{resumen.material.nombre} - {plan['texto']}"
+            if not plan['completo']:
+                contenido += " (los proveedores no alcanzan a cubrir todo)"
+            contenido += "\n"
+        contenido += f"\nCosto estimado: ${costo_total:,.2f}\n"
     else:
         contenido += "No hay materiales faltantes.\n"
     
@@ -968,12 +974,6 @@ def generar_archivo_compras(request, lista_id):
     filename = f"compras_{lista.nombre.replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.txt"
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
     
-    # Cambiar estado a comprado cuando se descarga (Paso 2 → Paso 3)
-    if lista.estado == 'pendiente_compra':
-        lista.estado = 'comprado'
-        lista.save()
-        messages.success(request, f'Lista "{lista.nombre}" descargada. Ahora pasa al Paso 3 para registrar tus compras.')
-    
     return response
 
 
@@ -992,8 +992,7 @@ def marcar_como_comprado(request, lista_id):
                 return redirect('inventario:detalle_lista_produccion', lista_id=lista.id)
             
             # Cambiar estado a comprado
-            lista.estado = 'comprado'
-            lista.save()
+            transicionar(lista, 'comprado', request.user)
             
             messages.success(request, f'Lista "{lista.nombre}" marcada como comprada. Ahora puede registrar las compras en "Compra de Productos".')
             return redirect('inventario:detalle_lista_produccion', lista_id=lista.id)
@@ -1008,6 +1007,7 @@ def marcar_como_comprado(request, lista_id):
 @login_required
 def verificar_compras(request, lista_id):
     """Vista simple para ingresar cuántos paquetes/rollos se compraron realmente"""
+    from django.db import transaction
     
     lista = get_object_or_404(ListaProduccion, id=lista_id, usuario_creador=request.user)
     
@@ -1020,83 +1020,91 @@ def verificar_compras(request, lista_id):
     
     if request.method == 'POST':
         try:
-            materiales_procesados = 0
-            materiales_registrados = 0
+            with transaction.atomic():
+                # Bloquear la lista para que dos envíos no registren la misma compra
+                lista = obtener_lista_bloqueada(id=lista.id)
+                if lista.estado != 'comprado':
+                    messages.warning(request, f'La lista "{lista.nombre}" ya no está en Paso 3 (Comprado).')
+                    return redirect('inventario:listado_compras_paso3')
+                
+                materiales_procesados = 0
+                materiales_registrados = 0
             
-            for resumen in materiales_necesarios:
-                # Obtener cantidad comprada ingresada por el usuario
-                cantidad_comprada_key = f'cantidad_comprada_{resumen.id}'
-                cantidad_comprada_str = request.POST.get(cantidad_comprada_key, '0').strip()
+                for resumen in materiales_necesarios:
+                    # Obtener cantidad comprada ingresada por el usuario
+                    cantidad_comprada_key = f'cantidad_comprada_{resumen.id}'
+                    cantidad_comprada_str = request.POST.get(cantidad_comprada_key, '0').strip()
                 
-                if not cantidad_comprada_str or cantidad_comprada_str == '0':
-                    continue  # Material no comprado, saltar
+                    if not cantidad_comprada_str or cantidad_comprada_str == '0':
+                        continue  # Material no comprado, saltar
                 
-                try:
-                    paquetes_comprados = int(cantidad_comprada_str)
+                    try:
+                        paquetes_comprados = int(cantidad_comprada_str)
                     
-                    if paquetes_comprados < 0:
-                        messages.warning(request, f'Cantidad inválida para {resumen.material.nombre}')
-                        continue
+                        if paquetes_comprados < 0:
+                            messages.warning(request, f'Cantidad inválida para {resumen.material.nombre}')
+                            continue
                     
-                    if paquetes_comprados > 0:
-                        # Calcular cantidad en unidad base
-                        cantidad_total = paquetes_comprados * resumen.material.factor_conversion
+                        if paquetes_comprados > 0:
+                            # Calcular cantidad en unidad base
+                            cantidad_total = paquetes_comprados * resumen.material.factor_conversion
                         
-                        # Guardar cantidad anterior para el movimiento
-                        cantidad_anterior = resumen.material.cantidad_disponible
+                            # Guardar cantidad anterior para el movimiento
+                            cantidad_anterior = resumen.material.cantidad_disponible
                         
-                        # Registrar entrada al inventario
-                        resumen.material.cantidad_disponible += cantidad_total
-                        resumen.material.save()
+                            # Registrar entrada al inventario
+                            resumen.material.cantidad_disponible += cantidad_total
+                            resumen.material.save()
                         
-                        # Crear movimiento
-                        Movimiento.objects.create(
-                            material=resumen.material,
-                            tipo_movimiento='entrada',
-                            cantidad=cantidad_total,
-                            cantidad_anterior=cantidad_anterior,
-                            cantidad_nueva=resumen.material.cantidad_disponible,
-                            usuario=request.user,
-                            detalle=f'Compra para lista: {lista.nombre} - {paquetes_comprados} {resumen.unidad_compra_display}{"s" if paquetes_comprados > 1 else ""}'
-                        )
+                            # Crear movimiento
+                            Movimiento.objects.create(
+                                material=resumen.material,
+                                tipo_movimiento='entrada',
+                                cantidad=cantidad_total,
+                                cantidad_anterior=cantidad_anterior,
+                                cantidad_nueva=resumen.material.cantidad_disponible,
+                                usuario=request.user,
+                                lista_produccion=lista,
+                                detalle=f'Compra para lista: {lista.nombre} - {paquetes_comprados} {resumen.unidad_compra_display}{"s" if paquetes_comprados > 1 else ""}'
+                            )
                         
-                        # Actualizar resumen
-                        resumen.cantidad_disponible = resumen.material.cantidad_disponible
-                        resumen.cantidad_faltante = max(0, resumen.cantidad_necesaria - resumen.cantidad_disponible)
-                        resumen.fecha_compra = timezone.now()
-                        resumen.save()
+                            # Actualizar resumen
+                            resumen.cantidad_disponible = resumen.material.cantidad_disponible
+                            resumen.cantidad_faltante = max(0, resumen.cantidad_necesaria - resumen.cantidad_disponible)
+                            resumen.fecha_compra = timezone.now()
+                            resumen.save()
                         
-                        materiales_registrados += 1
+                            materiales_registrados += 1
                     
-                    materiales_procesados += 1
+                        materiales_procesados += 1
                     
-                except (ValueError, TypeError) as e:
-                    messages.error(request, f'Error con {resumen.material.nombre}: {str(e)}')
-                    continue
+                    except (ValueError, TypeError) as e:
+                        messages.error(request, f'Error con {resumen.material.nombre}: {str(e)}')
+                        continue
             
-            if materiales_registrados > 0:
-                # Verificar si ya se cubrieron todos los materiales
-                materiales_aun_faltantes = lista.resumen_materiales.filter(cantidad_faltante__gt=0).count()
+                if materiales_registrados > 0:
+                    # Verificar si ya se cubrieron todos los materiales
+                    lista.actualizar_resumen()
+                    materiales_aun_faltantes = lista.materiales_faltantes_count
                 
-                if materiales_aun_faltantes == 0:
-                    # Todos los materiales están listos, mover a Paso 4
-                    lista.estado = 'reabastecido'
-                    lista.save()
-                    messages.success(
-                        request,
-                        f'✅ Compras de "{lista.nombre}" registradas: {materiales_registrados} material(es). 🎉 Lista enviada al Paso 4 (Reabastecido).'
-                    )
-                else:
-                    # Aún faltan materiales
-                    messages.success(
-                        request,
-                        f'✅ Compras de "{lista.nombre}" registradas: {materiales_registrados} material(es). Aún faltan {materiales_aun_faltantes} material(es).'
-                    )
+                    if materiales_aun_faltantes == 0:
+                        # Todos los materiales están listos, mover a Paso 4
+                        transicionar(lista, 'reabastecido', request.user)
+                        messages.success(
+                            request,
+                            f'✅ Compras de "{lista.nombre}" registradas: {materiales_registrados} material(es). 🎉 Lista enviada al Paso 4 (Reabastecido).'
+                        )
+                    else:
+                        # Aún faltan materiales
+                        messages.success(
+                            request,
+                            f'✅ Compras de "{lista.nombre}" registradas: {materiales_registrados} material(es). Aún faltan {materiales_aun_faltantes} material(es).'
+                        )
                 
-                # Redirigir de vuelta al listado del Paso 3 para que pueda registrar otras listas
-                return redirect('inventario:listado_compras_paso3')
-            else:
-                messages.warning(request, 'No se registró ninguna compra. Ingresa las cantidades.')
+                    # Redirigir de vuelta al listado del Paso 3 para que pueda registrar otras listas
+                    return redirect('inventario:listado_compras_paso3')
+                else:
+                    messages.warning(request, 'No se registró ninguna compra. Ingresa las cantidades.')
         
         except Exception as e:
             messages.error(request, f'Error al procesar compras: {str(e)}')
@@ -1127,19 +1135,21 @@ def enviar_a_reabastecimiento(request, lista_id):
                 return redirect('inventario:compra_productos')
             
             # Verificar si aún faltan materiales
-            materiales_faltantes = lista.resumen_materiales.filter(cantidad_faltante__gt=0).count()
+            materiales_faltantes = lista.materiales_faltantes_count
             
             if materiales_faltantes > 0:
                 messages.warning(request, f'La lista "{lista.nombre}" aún tiene {materiales_faltantes} material(es) faltante(s). Complete las compras primero.')
                 return redirect('inventario:compra_productos')
             
             # Cambiar estado a reabastecido
-            lista.estado = 'reabastecido'
-            lista.save()
+            transicionar(lista, 'reabastecido', request.user)
             
             messages.success(request, f'Lista "{lista.nombre}" enviada a reabastecimiento. Ya está lista para producción.')
             return redirect('inventario:reabastecimiento')
             
+        except TransicionInvalida as e:
+            messages.error(request, str(e))
+            return redirect('inventario:compra_productos')
         except Exception as e:
             messages.error(request, f'Error al enviar a reabastecimiento: {str(e)}')
             return redirect('inventario:compra_productos')
@@ -1169,6 +1179,8 @@ def registrar_entrada_reabastecimiento(request, lista_id):
         
         try:
             with transaction.atomic():
+                lista = obtener_lista_bloqueada(id=lista.id)
+                
                 for resumen in materiales_pendientes:
                     cantidad_key = f'cantidad_{resumen.id}'
                     precio_key = f'precio_{resumen.id}'
@@ -1200,7 +1212,8 @@ def registrar_entrada_reabastecimiento(request, lista_id):
                                     precio_unitario=precio_compra if precio_compra > 0 else None,
                                     costo_total_movimiento=precio_compra * cantidad_entrada if precio_compra > 0 else None,
                                     detalle=f'Reabastecimiento - Lista #{lista.id}: {lista.nombre}',
-                                    usuario=request.user
+                                    usuario=request.user,
+                                    lista_produccion=lista
                                 )
                                 
                                 print(f"✅ Entrada registrada: {resumen.material.nombre}")
@@ -1225,10 +1238,9 @@ def registrar_entrada_reabastecimiento(request, lista_id):
                     messages.success(request, f'✅ Se registraron {materiales_ingresados} entrada(s) de materiales correctamente.')
                     
                     # Verificar si ya no faltan materiales y cambiar estado automáticamente
-                    materiales_aun_faltantes = lista.resumen_materiales.filter(cantidad_faltante__gt=0).count()
-                    if materiales_aun_faltantes == 0 and lista.estado == 'comprado':
-                        lista.estado = 'reabastecido'
-                        lista.save()
+                    lista.actualizar_resumen()
+                    if lista.materiales_faltantes_count == 0 and lista.estado == 'comprado':
+                        transicionar(lista, 'reabastecido', request.user)
                         messages.info(request, f'🎉 Lista "{lista.nombre}" movida automáticamente a estado "Reabastecido" - ¡Lista para producción!')
                 elif errores:
                     for error in errores:
@@ -1263,73 +1275,36 @@ def listado_listas_produccion(request):
     
     if ver_finalizadas:
         # Mostrar solo listas finalizadas
-        todas_listas = ListaProduccion.objects.filter(
+        todas_listas = list(ListaProduccion.objects.filter(
             usuario_creador=request.user,
             estado='finalizado'
-        ).prefetch_related('detalles_monos__monos').order_by('-fecha_modificacion')
+        ).order_by('-fecha_modificacion'))
         
         context = {
             'listas_finalizadas': todas_listas,
-            'total_listas': todas_listas.count(),
+            'total_listas': len(todas_listas),
             'titulo': 'Listas Completadas',
             'ver_finalizadas': True
         }
         
         return render(request, 'inventario/listado_listas_produccion.html', context)
     
-    # Obtener todas las listas (excluyendo finalizadas)
-    todas_listas = ListaProduccion.objects.filter(
+    # Obtener todas las listas (excluyendo finalizadas) en una sola consulta;
+    # el tablero solo usa los campos de resumen de cada lista
+    todas_listas = list(ListaProduccion.objects.filter(
         usuario_creador=request.user
-    ).exclude(estado='finalizado').prefetch_related('detalles_monos__monos').order_by('-fecha_creacion')
+    ).exclude(estado='finalizado').order_by('-fecha_creacion'))
     
     # Agrupar listas por paso/estado
     listas_por_paso = {
-        'borrador': {
-            'nombre': 'Creada',
-            'numero': 1,
-            'icono': 'fas fa-check-circle',
-            'color': 'secondary',
-            'listas': todas_listas.filter(estado='borrador')
-        },
-        'pendiente_compra': {
-            'nombre': 'Lista de Compras',
-            'numero': 2,
-            'icono': 'fas fa-file-download',
-            'color': 'warning',
-            'listas': todas_listas.filter(estado='pendiente_compra')
-        },
-        'comprado': {
-            'nombre': 'Registrar Compras',
-            'numero': 3,
-            'icono': 'fas fa-shopping-cart',
-            'color': 'info',
-            'listas': todas_listas.filter(estado='comprado')
-        },
-        'reabastecido': {
-            'nombre': 'Materiales Listos',
-            'numero': 4,
-            'icono': 'fas fa-box-check',
-            'color': 'success',
-            'listas': todas_listas.filter(estado='reabastecido')
-        },
-        'en_produccion': {
-            'nombre': 'Produciendo',
-            'numero': 5,
-            'icono': 'fas fa-industry',
-            'color': 'primary',
-            'listas': todas_listas.filter(estado='en_produccion')
-        },
-        'en_salida': {
-            'nombre': 'Salida y Ventas',
-            'numero': 6,
-            'icono': 'fas fa-cash-register',
-            'color': 'dark',
-            'listas': todas_listas.filter(estado='en_salida')
-        }
+        estado: dict(paso, listas=[]) for estado, paso in PASOS_TABLERO
     }
+    for lista in todas_listas:
+        if lista.estado in listas_por_paso:
+            listas_por_paso[lista.estado]['listas'].append(lista)
     
     # Contar totales
-    total_listas = todas_listas.count()
+    total_listas = len(todas_listas)
     
     context = {
         'listas_por_paso': listas_por_paso,
@@ -1340,6 +1315,15 @@ def listado_listas_produccion(request):
     return render(request, 'inventario/listado_listas_produccion.html', context)
 
 
+def _prefetch_materiales_faltantes():
+    """Prefetch de los materiales con faltante > 0 en lista.materiales_faltantes_lista"""
+    return Prefetch(
+        'resumen_materiales',
+        queryset=ResumenMateriales.objects.filter(cantidad_faltante__gt=0).select_related('material'),
+        to_attr='materiales_faltantes_lista'
+    )
+
+
 # Buscar la función lista_de_compras (línea ~1239)
 
 @login_required
@@ -1350,13 +1334,16 @@ def lista_de_compras(request):
     listas_pendientes = ListaProduccion.objects.filter(
         usuario_creador=request.user,
         estado='pendiente_compra'
-    ).prefetch_related('detalles_monos__monos', 'resumen_materiales__material').order_by('-fecha_creacion')
+    ).prefetch_related('detalles_monos__monos', _prefetch_materiales_faltantes()).order_by('-fecha_creacion')
     
-    # Calcular información de materiales faltantes para cada lista
+    # Información de materiales faltantes para cada lista (conteo guardado en la lista)
     for lista in listas_pendientes:
-        materiales_faltantes = lista.resumen_materiales.filter(cantidad_faltante__gt=0)
-        lista.total_materiales_faltantes = materiales_faltantes.count()
-        lista.materiales_faltantes_lista = materiales_faltantes
+        lista.total_materiales_faltantes = lista.materiales_faltantes_count
+    
+    # Combinación de presentaciones más barata para cada faltante
+    asignar_planes(
+        resumen for lista in listas_pendientes for resumen in lista.materiales_faltantes_lista
+    )
     
     context = {
         'listas_pendientes': listas_pendientes,
@@ -1374,13 +1361,16 @@ def listado_compras_paso3(request):
     listas_compradas = ListaProduccion.objects.filter(
         usuario_creador=request.user,
         estado='comprado'
-    ).prefetch_related('detalles_monos__monos', 'resumen_materiales__material').order_by('-fecha_creacion')
+    ).prefetch_related('detalles_monos__monos', _prefetch_materiales_faltantes()).order_by('-fecha_creacion')
     
-    # Calcular información de materiales faltantes para cada lista
+    # Información de materiales faltantes para cada lista (conteo guardado en la lista)
     for lista in listas_compradas:
-        materiales_faltantes = lista.resumen_materiales.filter(cantidad_faltante__gt=0)
-        lista.total_materiales_faltantes = materiales_faltantes.count()
-        lista.materiales_faltantes_lista = materiales_faltantes
+        lista.total_materiales_faltantes = lista.materiales_faltantes_count
+    
+    # Combinación de presentaciones más barata para cada faltante
+    asignar_planes(
+        resumen for lista in listas_compradas for resumen in lista.materiales_faltantes_lista
+    )
     
     context = {
         'listas_compradas': listas_compradas,
@@ -1410,6 +1400,12 @@ def consolidar_materiales_listas(listas_produccion):
                     'cantidad_faltante': max(0, resumen.cantidad_faltante),
                 }
     
+    # Presentaciones de compra de todos los materiales en una consulta
+    from .models import PresentacionMaterial
+    presentaciones = {}
+    for presentacion in PresentacionMaterial.objects.filter(material_id__in=materiales_consolidados, activo=True):
+        presentaciones.setdefault(presentacion.material_id, []).append(presentacion)
+    
     # Recalcular con stock actual y calcular paquetes/rollos necesarios
     resultado = []
     for material_data in materiales_consolidados.values():
@@ -1438,7 +1434,8 @@ def consolidar_materiales_listas(listas_produccion):
             'paquetes_rollos_necesarios': paquetes_rollos_necesarios,
             'cantidad_total_compra': cantidad_total_compra,
             'unidad_compra_display': unidad_compra_display,
-            'costo_estimado_compra': paquetes_rollos_necesarios * material.precio_compra if material.precio_compra > 0 else 0
+            'costo_estimado_compra': paquetes_rollos_necesarios * material.precio_compra if material.precio_compra > 0 else 0,
+            'plan_compra': plan_compra(material, cantidad_faltante, presentaciones.get(material.id, [])),
         })
     
     # Ordenar por nombre de material
@@ -1450,15 +1447,16 @@ def consolidar_materiales_listas(listas_produccion):
 def detalle_lista_produccion(request, lista_id):
     """Vista para mostrar detalles de una lista de producción específica"""
     
+    from .archivo_listas import detalles_y_resumen
+    
     lista = get_object_or_404(
-        ListaProduccion, 
+        ListaProduccion.objects.select_related('archivo'), 
         id=lista_id, 
         usuario_creador=request.user
     )
     
-    # Obtener detalles de moños y materiales
-    detalles_monos = lista.detalles_monos.select_related('monos').all()
-    resumen_materiales = lista.resumen_materiales.select_related('material').all()
+    # Obtener detalles de moños y materiales (del snapshot si la lista está compactada)
+    detalles_monos, resumen_materiales = detalles_y_resumen(lista)
     
     context = {
         'lista': lista,
@@ -1484,7 +1482,8 @@ def compra_productos(request):
     # Obtener todos los materiales de todas las listas en estado comprado
     materiales_pendientes = []
     for lista in listas_comprado:
-        for resumen in lista.resumen_materiales.filter(cantidad_faltante__gt=0):
+        resumenes = asignar_planes(lista.resumen_materiales.filter(cantidad_faltante__gt=0))
+        for resumen in resumenes:
             # Solo materiales que aún faltan por comprar completamente
             if resumen.cantidad_comprada < resumen.cantidad_faltante:
                 materiales_pendientes.append({
@@ -1495,7 +1494,8 @@ def compra_productos(request):
                     'paquetes_rollos_necesarios': resumen.paquetes_rollos_necesarios,
                     'unidad_compra_display': resumen.unidad_compra_display,
                     'cantidad_total_compra': resumen.paquetes_rollos_necesarios * resumen.material.factor_conversion,
-                    'costo_estimado': resumen.paquetes_rollos_necesarios * resumen.material.precio_compra if resumen.material.precio_compra > 0 else 0
+                    'costo_estimado': resumen.paquetes_rollos_necesarios * resumen.material.precio_compra if resumen.material.precio_compra > 0 else 0,
+                    'plan_compra': resumen.plan_compra,
                 })
     
     # Procesar formulario de compra
@@ -1554,6 +1554,7 @@ def compra_productos(request):
             # Verificar si todas las compras están completas
             listas_reabastecidas = []
             for lista in listas_comprado:
+                lista.actualizar_resumen()
                 compras_completas = True
                 for resumen in lista.resumen_materiales.all():
                     if resumen.material.cantidad_disponible < resumen.cantidad_necesaria:
@@ -1561,9 +1562,11 @@ def compra_productos(request):
                         break
                 
                 if compras_completas and lista.estado == 'comprado':
-                    lista.estado = 'reabastecido'
-                    lista.save()
-                    listas_reabastecidas.append(lista.nombre)
+                    try:
+                        transicionar(lista, 'reabastecido', request.user)
+                        listas_reabastecidas.append(lista.nombre)
+                    except TransicionInvalida:
+                        continue
             
             mensaje_base = f'✅ Se registraron {materiales_actualizados} compra(s) por ${total_invertido:.2f}.'
             if listas_reabastecidas:
@@ -1594,6 +1597,7 @@ def compra_productos(request):
 @login_required
 def reabastecimiento(request):
     """Vista para gestionar el proceso de producción/reabastecimiento"""
+    from django.db import transaction
     
     # Obtener listas en estado 'reabastecido' listas para producción
     listas_reabastecidas = ListaProduccion.objects.filter(
@@ -1610,46 +1614,25 @@ def reabastecimiento(request):
             lista = ListaProduccion.objects.get(id=lista_id, usuario_creador=request.user)
             
             if accion == 'iniciar_produccion':
-                # Verificar que hay suficientes materiales antes de iniciar producción
-                materiales_suficientes, mensaje_verificacion = verificar_materiales_suficientes(lista)
-                
-                if not materiales_suficientes:
-                    messages.error(
-                        request, 
-                        f'No se puede iniciar la producción de "{lista.nombre}". {mensaje_verificacion}'
-                    )
-                    return redirect('inventario:reabastecimiento')
-                
-                # Cambiar estado a 'en_produccion'
-                lista.estado = 'en_produccion'
-                lista.save()
-                
-                # Verificar nuevamente justo antes del descuento (por seguridad)
-                materiales_suficientes_final, _ = verificar_materiales_suficientes(lista)
-                if not materiales_suficientes_final:
-                    # Revertir estado si ya no hay suficientes materiales
-                    lista.estado = 'reabastecido'
-                    lista.save()
-                    messages.error(
-                        request, 
-                        f'Error: Los materiales cambiaron durante el proceso. No se pudo iniciar la producción de "{lista.nombre}".'
-                    )
-                    return redirect('inventario:reabastecimiento')
-                
-                # Descontar materiales del inventario
+                # La guarda de la transición verifica los materiales con la lista bloqueada;
+                # si el descuento falla, la transacción revierte también el cambio de estado
                 try:
-                    materiales_descontados = descontar_materiales_produccion(lista, request.user)
+                    with transaction.atomic():
+                        transicionar(lista, 'en_produccion', request.user)
+                        materiales_descontados = descontar_materiales_produccion(lista, request.user)
                     
                     messages.success(
                         request, 
                         f'Se inició la producción de "{lista.nombre}". '
                         f'Se descontaron {materiales_descontados} materiales del inventario.'
                     )
+                except TransicionInvalida as e:
+                    messages.error(
+                        request, 
+                        f'No se puede iniciar la producción de "{lista.nombre}". {e}'
+                    )
+                    return redirect('inventario:reabastecimiento')
                 except Exception as e:
-                    # Revertir estado si hay error
-                    lista.estado = 'reabastecido'
-                    lista.save()
-                    
                     import traceback
                     error_detalle = traceback.format_exc()
                     print(f"\n❌ ERROR AL DESCONTAR MATERIALES:\n{error_detalle}")
@@ -1661,57 +1644,59 @@ def reabastecimiento(request):
                     return redirect('inventario:reabastecimiento')
                 
             elif accion == 'finalizar_produccion':
-                # Obtener cantidades producidas del formulario
-                cantidades_actualizadas = 0
-                
-                for detalle in lista.detalles_monos.all():
-                    cantidad_key = f'cantidad_producida_{detalle.id}'
-                    cantidad_producida = request.POST.get(cantidad_key)
+                with transaction.atomic():
+                    lista = obtener_lista_bloqueada(id=lista.id)
                     
-                    if cantidad_producida:
-                        try:
-                            cantidad = int(cantidad_producida)
-                            if cantidad >= 0:
-                                detalle.cantidad_producida = cantidad
-                                detalle.save()
-                                cantidades_actualizadas += 1
-                        except (ValueError, TypeError):
-                            continue
+                    # Obtener cantidades producidas del formulario
+                    cantidades_actualizadas = 0
                 
-                if cantidades_actualizadas > 0:
-                    # Actualizar total de moños producidos
-                    total_producidos = sum(
-                        detalle.cantidad_total_producida 
-                        for detalle in lista.detalles_monos.all()
-                    )
-                    lista.total_moños_producidos = total_producidos
+                    for detalle in lista.detalles_monos.all():
+                        cantidad_key = f'cantidad_producida_{detalle.id}'
+                        cantidad_producida = request.POST.get(cantidad_key)
                     
-                    # SIEMPRE cambiar a estado EN_SALIDA al guardar producción
-                    lista.estado = 'en_salida'
-                    lista.save()
+                        if cantidad_producida:
+                            try:
+                                cantidad = int(cantidad_producida)
+                                if cantidad >= 0:
+                                    detalle.cantidad_producida = cantidad
+                                    detalle.save()
+                                    cantidades_actualizadas += 1
+                            except (ValueError, TypeError):
+                                continue
+                
+                    if cantidades_actualizadas > 0:
+                        # Actualizar total de moños producidos
+                        lista.actualizar_resumen(guardar=False)
+                        total_producidos = lista.total_moños_producidos
                     
-                    # Verificar si la producción está completa para el mensaje
-                    produccion_completa = all(
-                        detalle.cantidad_producida >= detalle.cantidad 
-                        for detalle in lista.detalles_monos.all()
-                    )
+                        # SIEMPRE cambiar a estado EN_SALIDA al guardar producción
+                        if lista.estado == 'en_salida':
+                            lista.save(update_fields=ListaProduccion.CAMPOS_RESUMEN)
+                        else:
+                            transicionar(lista, 'en_salida', request.user, campos=ListaProduccion.CAMPOS_RESUMEN)
                     
-                    if produccion_completa:
-                        messages.success(
-                            request, 
-                            f'✅ Producción de "{lista.nombre}" completada! '
-                            f'Se produjeron {total_producidos} moños en total. '
-                            f'Lista enviada a Salida para registrar ventas.'
+                        # Verificar si la producción está completa para el mensaje
+                        produccion_completa = all(
+                            detalle.cantidad_producida >= detalle.cantidad 
+                            for detalle in lista.detalles_monos.all()
                         )
+                    
+                        if produccion_completa:
+                            messages.success(
+                                request, 
+                                f'✅ Producción de "{lista.nombre}" completada! '
+                                f'Se produjeron {total_producidos} moños en total. '
+                                f'Lista enviada a Salida para registrar ventas.'
+                            )
+                        else:
+                            messages.success(
+                                request, 
+                                f'✅ Producción de "{lista.nombre}" guardada! '
+                                f'Se produjeron {total_producidos} moños hasta ahora. '
+                                f'Lista enviada a Salida para registrar ventas.'
+                            )
                     else:
-                        messages.success(
-                            request, 
-                            f'✅ Producción de "{lista.nombre}" guardada! '
-                            f'Se produjeron {total_producidos} moños hasta ahora. '
-                            f'Lista enviada a Salida para registrar ventas.'
-                        )
-                else:
-                    messages.warning(request, 'No se actualizó ninguna cantidad.')
+                        messages.warning(request, 'No se actualizó ninguna cantidad.')
             
             elif accion == 'marcar_salida':
                 # Esta acción finaliza la lista y registra la venta
@@ -1722,30 +1707,31 @@ def reabastecimiento(request):
                     )
                     return redirect('inventario:reabastecimiento')
                 
-                # Cambiar a estado FINALIZADO
-                lista.estado = 'finalizado'
-                lista.save()
-                
                 # Registrar venta automática en contabilidad
                 from .models import MovimientoEfectivo
                 
-                # Calcular ingreso total de la venta
-                ingreso_total_venta = Decimal('0')
-                for detalle in lista.detalles_monos.all():
-                    precio_venta = detalle.monos.precio_venta
-                    cantidad_producida = detalle.cantidad_producida
-                    ingreso_detalle = precio_venta * cantidad_producida
-                    ingreso_total_venta += ingreso_detalle
-                
-                # Crear movimiento de efectivo por la venta
-                if ingreso_total_venta > 0:
-                    MovimientoEfectivo.registrar_movimiento(
-                        concepto=f'Venta de producción - Lista: {lista.nombre}',
-                        tipo_movimiento='ingreso',
-                        categoria='venta',
-                        monto=ingreso_total_venta,
-                        usuario=request.user
-                    )
+                with transaction.atomic():
+                    # Cambiar a estado FINALIZADO
+                    transicionar(lista, 'finalizado', request.user, nota='Salida registrada')
+                    
+                    # Calcular ingreso total de la venta
+                    ingreso_total_venta = Decimal('0')
+                    for detalle in lista.detalles_monos.all():
+                        precio_venta = detalle.monos.precio_venta
+                        cantidad_producida = detalle.cantidad_producida
+                        ingreso_detalle = precio_venta * cantidad_producida
+                        ingreso_total_venta += ingreso_detalle
+                    
+                    # Crear movimiento de efectivo por la venta
+                    if ingreso_total_venta > 0:
+                        MovimientoEfectivo.registrar_movimiento(
+                            concepto=f'Venta de producción - Lista: {lista.nombre}',
+                            tipo_movimiento='ingreso',
+                            categoria='venta',
+                            monto=ingreso_total_venta,
+                            usuario=request.user,
+                            lista_produccion=lista
+                        )
                 
                 # Mensaje según permiso del usuario
                 if hasattr(request.user, 'userprofile') and request.user.userprofile.puede_ver_precios():
@@ -1762,6 +1748,8 @@ def reabastecimiento(request):
                     
         except ListaProduccion.DoesNotExist:
             messages.error(request, 'Lista de producción no encontrada.')
+        except TransicionInvalida as e:
+            messages.error(request, str(e))
         except Exception as e:
             messages.error(request, f'Error al procesar la acción: {str(e)}')
             
@@ -1867,7 +1855,8 @@ def descontar_materiales_produccion(lista_produccion, usuario=None):
                                 precio_unitario=costo_unitario,
                                 costo_total_movimiento=costo_total,
                                 detalle=f"Producción - Lista #{lista_produccion.id}: {monos.codigo} ({cantidad_total_planificada} moños)",
-                                usuario=usuario
+                                usuario=usuario,
+                                lista_produccion=lista_produccion
                             )
                             print(f"   ✅ Movimiento registrado: ID={movimiento.id}")
                             print(f"   💰 Costo unitario: ${costo_unitario or 0:.2f}")
@@ -2032,22 +2021,6 @@ def ejecutar_simulacion(data, usuario):
     }
 
 
-@login_required
-def get_monos_info(request, monos_id):
-    """Vista AJAX para obtener información de un moño"""
-    try:
-        monos = Monos.objects.get(id=monos_id, activo=True)
-        data = {
-            'precio_venta': float(monos.precio_venta),
-            'tipo_venta': monos.tipo_venta,
-            'costo_produccion': float(monos.costo_produccion),
-            'ganancia_unitaria': float(monos.ganancia_unitaria),
-        }
-        return JsonResponse(data)
-    except Monos.DoesNotExist:
-        return JsonResponse({'error': 'Moño no encontrado'}, status=404)
-
-
 # ========== SISTEMA DE ENTRADA Y SALIDA DE MATERIALES ==========
 
 @login_required
@@ -2212,29 +2185,6 @@ def salida_material(request):
     return render(request, 'inventario/salida_material.html', context)
 
 
-@login_required
-def material_info_api(request):
-    """API para obtener información del material vía AJAX"""
-    material_id = request.GET.get('material_id')
-    if not material_id:
-        return JsonResponse({'error': 'ID de material requerido'}, status=400)
-    
-    try:
-        material = Material.objects.get(id=material_id, activo=True)
-        data = {
-            'stock_actual': float(material.cantidad_disponible),
-            'unidad': material.unidad_base,
-            'costo_unitario': float(material.costo_unitario),
-            'nombre': material.nombre,
-            'valor_inventario': float(material.valor_inventario)
-        }
-        return JsonResponse(data)
-    except Material.DoesNotExist:
-        return JsonResponse({'error': 'Material no encontrado'}, status=404)
-    except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
-
-
 @login_required
 def procesar_simulacion_completa(request, simulacion_id):
     """
@@ -2819,92 +2769,6 @@ def registrar_movimiento_produccion(material, cantidad_usada, simulacion, usuari
     return movimiento
 
 
-# Vistas AJAX para entrada/salida
-@login_required
-def material_info_entrada(request, material_id):
-    """Información del material para entrada"""
-    try:
-        material = Material.objects.get(id=material_id, activo=True)
-        return JsonResponse({
-            'codigo': material.codigo,
-            'nombre': material.nombre,
-            'tipo_material': material.tipo_material,
-            'unidad_base': material.unidad_base,
-            'cantidad_disponible': float(material.cantidad_disponible),
-            'factor_conversion': float(material.factor_conversion),
-            'costo_unitario': float(material.costo_unitario or 0)
-        })
-    except Material.DoesNotExist:
-        return JsonResponse({'error': 'Material no encontrado'}, status=404)
-
-
-@login_required
-def material_info_salida(request, material_id):
-    """Información del material para salida"""
-    try:
-        material = Material.objects.get(id=material_id, activo=True)
-        
-        # Calcular costo promedio de movimientos recientes
-        movimientos_entrada = Movimiento.objects.filter(
-            material=material,
-            tipo_movimiento='entrada'
-        ).exclude(precio_unitario__isnull=True).order_by('-fecha_movimiento')[:10]
-        
-        costo_promedio = None
-        if movimientos_entrada:
-            total_costo = sum(m.precio_unitario for m in movimientos_entrada)
-            costo_promedio = total_costo / len(movimientos_entrada)
-        
-        return JsonResponse({
-            'codigo': material.codigo,
-            'nombre': material.nombre,
-            'tipo_material': material.tipo_material,
-            'unidad_base': material.unidad_base,
-            'cantidad_disponible': float(material.cantidad_disponible),
-            'costo_promedio': float(costo_promedio) if costo_promedio else None,
-            'costo_unitario': float(material.costo_unitario or 0)
-        })
-    except Material.DoesNotExist:
-        return JsonResponse({'error': 'Material no encontrado'}, status=404)
-
-
-@login_required
-def detalle_movimiento_ajax(request, movimiento_id):
-    """Detalle completo de un movimiento"""
-    try:
-        movimiento = Movimiento.objects.select_related(
-            'material', 'usuario', 'simulacion_relacionada'
-        ).get(id=movimiento_id)
-        
-        data = {
-            'id': movimiento.id,
-            'fecha_movimiento': movimiento.fecha.strftime('%d/%m/%Y %H:%M'),
-            'tipo_movimiento': movimiento.tipo_movimiento,
-            'tipo_movimiento_display': movimiento.get_tipo_movimiento_display(),
-            'cantidad': float(movimiento.cantidad),
-            'precio_unitario': float(movimiento.precio_unitario) if movimiento.precio_unitario else None,
-            'detalle': movimiento.detalle,
-            'usuario': f"{movimiento.usuario.first_name} {movimiento.usuario.last_name}" if movimiento.usuario and movimiento.usuario.first_name else movimiento.usuario.username if movimiento.usuario else 'Sistema',
-            'material': {
-                'codigo': movimiento.material.codigo,
-                'nombre': movimiento.material.nombre,
-                'tipo_material': movimiento.material.tipo_material,
-                'unidad_base': movimiento.material.unidad_base,
-            }
-        }
-        
-        if movimiento.simulacion_relacionada:
-            data['simulacion'] = {
-                'id': movimiento.simulacion_relacionada.id,
-                'fecha_simulacion': movimiento.simulacion_relacionada.fecha_simulacion.strftime('%d/%m/%Y %H:%M'),
-            }
-        
-        return JsonResponse(data)
-        
-    except Movimiento.DoesNotExist:
-        return JsonResponse({'error': 'Movimiento no encontrado'}, status=404)
-
-
 # Vistas de integración Simulación-Inventario
 @login_required
 def confirmar_produccion(request, simulacion_id):
@@ -3440,92 +3304,6 @@ def registrar_movimiento_produccion(material, cantidad_usada, simulacion, usuari
     return movimiento
 
 
-# Vistas AJAX para entrada/salida
-@login_required
-def material_info_entrada(request, material_id):
-    """Información del material para entrada"""
-    try:
-        material = Material.objects.get(id=material_id, activo=True)
-        return JsonResponse({
-            'codigo': material.codigo,
-            'nombre': material.nombre,
-            'tipo_material': material.tipo_material,
-            'unidad_base': material.unidad_base,
-            'cantidad_disponible': float(material.cantidad_disponible),
-            'factor_conversion': float(material.factor_conversion),
-            'costo_unitario': float(material.costo_unitario or 0)
-        })
-    except Material.DoesNotExist:
-        return JsonResponse({'error': 'Material no encontrado'}, status=404)
-
-
-@login_required
-def material_info_salida(request, material_id):
-    """Información del material para salida"""
-    try:
-        material = Material.objects.get(id=material_id, activo=True)
-        
-        # Calcular costo promedio de movimientos recientes
-        movimientos_entrada = Movimiento.objects.filter(
-            material=material,
-            tipo_movimiento='entrada'
-        ).exclude(precio_unitario__isnull=True).order_by('-fecha_movimiento')[:10]
-        
-        costo_promedio = None
-        if movimientos_entrada:
-            total_costo = sum(m.precio_unitario for m in movimientos_entrada)
-            costo_promedio = total_costo / len(movimientos_entrada)
-        
-        return JsonResponse({
-            'codigo': material.codigo,
-            'nombre': material.nombre,
-            'tipo_material': material.tipo_material,
-            'unidad_base': material.unidad_base,
-            'cantidad_disponible': float(material.cantidad_disponible),
-            'costo_promedio': float(costo_promedio) if costo_promedio else None,
-            'costo_unitario': float(material.costo_unitario or 0)
-        })
-    except Material.DoesNotExist:
-        return JsonResponse({'error': 'Material no encontrado'}, status=404)
-
-
-@login_required
-def detalle_movimiento_ajax(request, movimiento_id):
-    """Detalle completo de un movimiento"""
-    try:
-        movimiento = Movimiento.objects.select_related(
-            'material', 'usuario', 'simulacion_relacionada'
-        ).get(id=movimiento_id)
-        
-        data = {
-            'id': movimiento.id,
-            'fecha_movimiento': movimiento.fecha.strftime('%d/%m/%Y %H:%M'),
-            'tipo_movimiento': movimiento.tipo_movimiento,
-            'tipo_movimiento_display': movimiento.get_tipo_movimiento_display(),
-            'cantidad': float(movimiento.cantidad),
-            'precio_unitario': float(movimiento.precio_unitario) if movimiento.precio_unitario else None,
-            'detalle': movimiento.detalle,
-            'usuario': f"{movimiento.usuario.first_name} {movimiento.usuario.last_name}" if movimiento.usuario and movimiento.usuario.first_name else movimiento.usuario.username if movimiento.usuario else 'Sistema',
-            'material': {
-                'codigo': movimiento.material.codigo,
-                'nombre': movimiento.material.nombre,
-                'tipo_material': movimiento.material.tipo_material,
-                'unidad_base': movimiento.material.unidad_base,
-            }
-        }
-        
-        if movimiento.simulacion_relacionada:
-            data['simulacion'] = {
-                'id': movimiento.simulacion_relacionada.id,
-                'fecha_simulacion': movimiento.simulacion_relacionada.fecha_simulacion.strftime('%d/%m/%Y %H:%M'),
-            }
-        
-        return JsonResponse(data)
-        
-    except Movimiento.DoesNotExist:
-        return JsonResponse({'error': 'Movimiento no encontrado'}, status=404)
-
-
 # Vistas de integración Simulación-Inventario
 @login_required
 def confirmar_produccion(request, simulacion_id):
@@ -3605,16 +3383,19 @@ def iniciar_produccion(request, lista_id):
             messages.error(request, f'La lista "{lista.nombre}" debe estar en estado "Reabastecido" para iniciar producción.')
             return redirect('inventario:panel_lista_produccion', lista_id=lista_id)
         
-        # Descontar materiales
-        materiales_descontados = descontar_materiales_produccion(lista, request.user)
+        from django.db import transaction
         
-        # Cambiar estado
-        lista.estado = 'en_produccion'
-        lista.save()
+        # Cambiar estado (la guarda verifica materiales) y descontar en la misma transacción
+        with transaction.atomic():
+            transicionar(lista, 'en_produccion', request.user)
+            materiales_descontados = descontar_materiales_produccion(lista, request.user)
         
         messages.success(request, f'Producción iniciada para "{lista.nombre}". {materiales_descontados} materiales descontados del inventario.')
         return redirect('inventario:panel_lista_produccion', lista_id=lista_id)
         
+    except TransicionInvalida as e:
+        messages.error(request, f'No se puede iniciar la producción de "{lista.nombre}". {e}')
+        return redirect('inventario:panel_lista_produccion', lista_id=lista_id)
     except Exception as e:
         messages.error(request, f'Error al iniciar producción: {str(e)}')
         return redirect('inventario:panel_lista_produccion', lista_id=lista_id)
@@ -3635,17 +3416,84 @@ def enviar_a_salida(request, lista_id):
             return redirect('inventario:panel_lista_produccion', lista_id=lista_id)
         
         # Cambiar estado
-        lista.estado = 'en_salida'
-        lista.save()
+        transicionar(lista, 'en_salida', request.user)
         
         messages.success(request, f'Lista "{lista.nombre}" enviada a Salida. Ahora puedes registrar las ventas.')
         return redirect('inventario:panel_lista_produccion', lista_id=lista_id)
         
+    except TransicionInvalida as e:
+        messages.error(request, str(e))
+        return redirect('inventario:panel_lista_produccion', lista_id=lista_id)
     except Exception as e:
         messages.error(request, f'Error al enviar a salida: {str(e)}')
         return redirect('inventario:panel_lista_produccion', lista_id=lista_id)
 
 
+@login_required
+def transicion_masiva_listas(request):
+    """Avanza varias listas de producción a la vez (POST: lista_ids, destino)"""
+    from .permissions import puede_gestionar_ventas
+    from .transiciones import transicionar_lote
+    
+    es_ajax = request.headers.get('x-requested-with') == 'XMLHttpRequest'
+    
+    if request.method != 'POST':
+        if es_ajax:
+            return JsonResponse({'error': 'Método no permitido.'}, status=405)
+        messages.error(request, 'Método no permitido.')
+        return redirect('inventario:listas_produccion')
+    
+    destino = request.POST.get('destino', '')
+    try:
+        lista_ids = [int(lista_id) for lista_id in request.POST.getlist('lista_ids')]
+    except (TypeError, ValueError):
+        lista_ids = []
+    
+    error = None
+    if destino not in dict(ListaProduccion.ESTADO_CHOICES):
+        error = 'Estado destino inválido.'
+    elif not lista_ids:
+        error = 'Selecciona al menos una lista.'
+    elif destino == 'finalizado' and not puede_gestionar_ventas(request.user):
+        error = 'No tienes permisos para registrar ventas.'
+    elif destino == 'finalizado' and request.POST.get('vender_producido') != '1':
+        error = 'Confirma que se vendió todo lo producido; las ventas parciales se registran en contaduría.'
+    
+    if error:
+        if es_ajax:
+            return JsonResponse({'error': error}, status=400)
+        messages.error(request, error)
+        return redirect('inventario:listas_produccion')
+    
+    try:
+        resultados = transicionar_lote(
+            lista_ids, destino, request.user, vender_producido=destino == 'finalizado',
+            usuario_creador=request.user,
+        )
+    except Exception as e:
+        if es_ajax:
+            return JsonResponse({'error': str(e)}, status=500)
+        messages.error(request, f'Error en la transición masiva: {str(e)}')
+        return redirect('inventario:listas_produccion')
+    
+    exitosas = sum(1 for resultado in resultados if resultado['ok'])
+    
+    if es_ajax:
+        return JsonResponse({
+            'exitosas': exitosas,
+            'fallidas': len(resultados) - exitosas,
+            'resultados': resultados,
+        })
+    
+    if exitosas:
+        messages.success(request, f'✅ {exitosas} lista(s) enviadas a "{dict(ListaProduccion.ESTADO_CHOICES)[destino]}".')
+    for resultado in resultados:
+        if not resultado['ok']:
+            messages.warning(request, f'⚠️ {resultado["nombre"] or resultado["id"]}: {resultado["mensaje"]}')
+    
+    return redirect('inventario:listas_produccion')
+
+
 @login_required
 def lista_en_salida(request):
     """Vista para mostrar listas en estado de salida"""
@@ -3665,10 +3513,11 @@ def lista_en_salida(request):
 @login_required
 def listas_archivadas(request):
     """Vista para mostrar listas archivadas (pueden ser eliminadas)"""
+    # La plantilla solo usa campos propios de la lista; no se precargan detalles
     listas_archivadas = ListaProduccion.objects.filter(
         usuario_creador=request.user,
         estado='archivado'
-    ).prefetch_related('detalles_monos__monos').order_by('-fecha_modificacion')
+    ).order_by('-fecha_modificacion')
     
     context = {
         'listas_archivadas': listas_archivadas,
@@ -3703,61 +3552,69 @@ def registrar_ventas_contaduria(request, lista_id):
         try:
             # Importar el modelo VentaMonos
             from .models import VentaMonos
+            from django.db import transaction
             
-            # Calcular ingreso total de las ventas
-            ingreso_total = Decimal('0')
-            ventas_registradas = []
+            with transaction.atomic():
+                # Bloquear la lista para que un doble envío no duplique las ventas
+                lista = obtener_lista_bloqueada(id=lista.id)
+                if lista.estado != 'en_salida':
+                    messages.error(request, f'Las ventas de "{lista.nombre}" ya fueron registradas.')
+                    return redirect('inventario:listas_produccion')
+                
+                # Calcular ingreso total de las ventas
+                ingreso_total = Decimal('0')
+                ventas_registradas = []
             
-            for detalle in lista.detalles_monos.all():
-                cantidad_vendida = int(request.POST.get(f'cantidad_vendida_{detalle.id}', 0))
+                for detalle in lista.detalles_monos.all():
+                    cantidad_vendida = int(request.POST.get(f'cantidad_vendida_{detalle.id}', 0))
                 
-                if cantidad_vendida > 0:
-                    precio_venta = detalle.monos.precio_venta
-                    ingreso_venta = Decimal(cantidad_vendida) * precio_venta
-                    ingreso_total += ingreso_venta
-                    
-                    # Actualizar cantidad producida en el detalle
-                    detalle.cantidad_producida = cantidad_vendida
-                    detalle.save()
+                    if cantidad_vendida > 0:
+                        precio_venta = detalle.monos.precio_venta
+                        ingreso_venta = Decimal(cantidad_vendida) * precio_venta
+                        ingreso_total += ingreso_venta
                     
-                    # Crear registro de venta individual para analytics
-                    venta_mono = VentaMonos.objects.create(
-                        lista_produccion=lista,
-                        monos=detalle.monos,
-                        cantidad_vendida=cantidad_vendida,
-                        tipo_venta=detalle.monos.tipo_venta,
-                        precio_unitario=precio_venta,
-                        ingreso_total=ingreso_venta,
-                        costo_unitario=detalle.monos.costo_produccion,
-                        ganancia_total=ingreso_venta - (detalle.monos.costo_produccion * cantidad_vendida),
-                        usuario=request.user
-                    )
-                    ventas_registradas.append(venta_mono)
+                        # Crear registro de venta individual para analytics
+                        venta_mono = VentaMonos.objects.create(
+                            lista_produccion=lista,
+                            monos=detalle.monos,
+                            cantidad_vendida=cantidad_vendida,
+                            tipo_venta=detalle.monos.tipo_venta,
+                            precio_unitario=precio_venta,
+                            ingreso_total=ingreso_venta,
+                            costo_unitario=detalle.monos.costo_produccion,
+                            ganancia_total=ingreso_venta - (detalle.monos.costo_produccion * cantidad_vendida),
+                            usuario=request.user
+                        )
+                        ventas_registradas.append(venta_mono)
             
-            if ingreso_total > 0:
-                # Registrar el ingreso en contaduría
-                MovimientoEfectivo.registrar_movimiento(
-                    concepto=f'Venta de producción - Lista: {lista.nombre}',
-                    tipo_movimiento='ingreso',
-                    categoria='venta',
-                    monto=ingreso_total,
-                    usuario=request.user
-                )
+                if ingreso_total > 0:
+                    # Registrar el ingreso en contaduría
+                    MovimientoEfectivo.registrar_movimiento(
+                        concepto=f'Venta de producción - Lista: {lista.nombre}',
+                        tipo_movimiento='ingreso',
+                        categoria='venta',
+                        monto=ingreso_total,
+                        usuario=request.user,
+                        lista_produccion=lista
+                    )
                 
-                # Actualizar ganancia real de la lista
-                lista.ganancia_real = ingreso_total - (lista.costo_total_estimado or Decimal('0'))
-                lista.estado = 'finalizado'
-                lista.save()
+                    # Actualizar ganancia real de la lista
+                    lista.ganancia_real = ingreso_total - (lista.costo_total_estimado or Decimal('0'))
+                    lista.actualizar_resumen(guardar=False)
+                    transicionar(
+                        lista, 'finalizado', request.user, nota='Ventas registradas en contaduría',
+                        campos=['ganancia_real', *ListaProduccion.CAMPOS_RESUMEN],
+                    )
                 
-                messages.success(
-                    request,
-                    f'✅ {len(ventas_registradas)} venta(s) registrada(s) exitosamente. '
-                    f'Ingreso total: ${ingreso_total:.2f}. '
-                    f'Ganancia: ${lista.ganancia_real:.2f}'
-                )
-                return redirect('inventario:listas_produccion')
-            else:
-                messages.warning(request, 'No se registraron ventas. Ingresa al menos una cantidad vendida.')
+                    messages.success(
+                        request,
+                        f'✅ {len(ventas_registradas)} venta(s) registrada(s) exitosamente. '
+                        f'Ingreso total: ${ingreso_total:.2f}. '
+                        f'Ganancia: ${lista.ganancia_real:.2f}'
+                    )
+                    return redirect('inventario:listas_produccion')
+                else:
+                    messages.warning(request, 'No se registraron ventas. Ingresa al menos una cantidad vendida.')
                 
         except Exception as e:
             messages.error(request, f'Error al registrar ventas: {str(e)}')
@@ -3779,154 +3636,27 @@ def registrar_ventas_contaduria(request, lista_id):
 def panel_lista_produccion(request, lista_id):
     """Panel unificado para gestionar lista de producción con stepper visual de 7 pasos"""
     
-    lista = get_object_or_404(ListaProduccion, id=lista_id, usuario_creador=request.user)
-    
-    # Definir los 7 pasos del proceso
-    pasos = [
-        {
-            'numero': 1,
-            'nombre': 'Creada',
-            'estado_requerido': 'borrador',
-            'icono': 'fas fa-check-circle',
-            'color': 'success',
-            'descripcion': 'Lista creada exitosamente'
-        },
-        {
-            'numero': 2,
-            'nombre': 'Lista de Compras',
-            'estado_requerido': 'pendiente_compra',
-            'icono': 'fas fa-file-download',
-            'color': 'primary',
-            'descripcion': 'Descargar lista de materiales a comprar'
-        },
-        {
-            'numero': 3,
-            'nombre': 'Registrar Compras',
-            'estado_requerido': 'comprado',
-            'icono': 'fas fa-shopping-cart',
-            'color': 'info',
-            'descripcion': 'Ingresar cantidades compradas'
-        },
-        {
-            'numero': 4,
-            'nombre': 'Materiales Listos',
-            'estado_requerido': 'reabastecido',
-            'icono': 'fas fa-box-check',
-            'color': 'warning',
-            'descripcion': 'Verificar inventario actualizado'
-        },
-        {
-            'numero': 5,
-            'nombre': 'Produciendo',
-            'estado_requerido': 'en_produccion',
-            'icono': 'fas fa-industry',
-            'color': 'purple',
-            'descripcion': 'Crear moños y registrar producción'
-        },
-        {
-            'numero': 6,
-            'nombre': 'Salida y Ventas',
-            'estado_requerido': 'en_salida',
-            'icono': 'fas fa-cash-register',
-            'color': 'orange',
-            'descripcion': 'Registrar ventas realizadas'
-        },
-        {
-            'numero': 7,
-            'nombre': 'Completado',
-            'estado_requerido': 'finalizado',
-            'icono': 'fas fa-trophy',
-            'color': 'success',
-            'descripcion': 'Lista finalizada exitosamente'
-        }
-    ]
-    
-    # Determinar paso actual
-    mapa_estados_a_paso = {
-        'borrador': 1,
-        'pendiente_compra': 2,
-        'comprado': 3,
-        'reabastecido': 4,
-        'en_produccion': 5,
-        'en_salida': 6,
-        'finalizado': 7
-    }
-    
-    paso_actual = mapa_estados_a_paso.get(lista.estado, 1)
-    
-    # Marcar pasos como completados, actual o pendientes
-    for paso in pasos:
-        if paso['numero'] < paso_actual:
-            paso['status'] = 'completado'
-        elif paso['numero'] == paso_actual:
-            paso['status'] = 'actual'
-        else:
-            paso['status'] = 'pendiente'
-    
-    # Obtener datos específicos según el paso actual
-    materiales_necesarios = None
-    materiales_faltantes = None
-    detalles_monos = lista.detalles_monos.all()
-    
-    if paso_actual >= 2:
-        materiales_faltantes = lista.resumen_materiales.filter(cantidad_faltante__gt=0)
+    lista = get_object_or_404(
+        ListaProduccion.objects.select_related('archivo').prefetch_related('detalles_monos__monos'),
+        id=lista_id,
+        usuario_creador=request.user
+    )
     
-    if paso_actual == 3:
-        materiales_necesarios = lista.resumen_materiales.filter(cantidad_faltante__gt=0).select_related('material')
+    # Los descriptores de los pasos se construyen una sola vez (ver pasos_lista.py)
+    paso_actual = lista.paso_actual
+    pasos = PASOS_POR_PASO_ACTUAL[paso_actual]
     
-    # Determinar acción siguiente
-    accion_siguiente = None
+    # Las listas compactadas se leen del snapshot del archivo
+    archivo = getattr(lista, 'archivo', None)
+    detalles_monos = archivo.detalles_monos() if archivo else lista.detalles_monos.all()
+    resumen_materiales = None
     
-    if paso_actual == 1:
-        accion_siguiente = {
-            'texto': 'Descargar Lista de Compras',
-            'url': 'inventario:generar_archivo_compras',
-            'clase': 'btn-primary',
-            'icono': 'fas fa-download'
-        }
-    elif paso_actual == 2:
-        accion_siguiente = {
-            'texto': 'Registrar Compras Realizadas',
-            'url': 'inventario:verificar_compras',
-            'clase': 'btn-success',
-            'icono': 'fas fa-shopping-cart'
-        }
-    elif paso_actual == 3:
-        # Verificar si ya se registraron todas las compras
-        if lista.resumen_materiales.filter(cantidad_faltante__gt=0).count() == 0:
-            accion_siguiente = {
-                'texto': 'Continuar a Materiales Listos',
-                'url': 'inventario:enviar_a_reabastecimiento',
-                'clase': 'btn-success',
-                'icono': 'fas fa-arrow-right',
-                'tipo': 'POST'
-            }
+    if paso_actual == 2 and lista.materiales_faltantes_count:
+        resumen_materiales = asignar_planes(
+            lista.resumen_materiales.filter(cantidad_faltante__gt=0).select_related('material')
+        )
     elif paso_actual == 4:
-        accion_siguiente = {
-            'texto': 'Iniciar Producción',
-            'url': 'inventario:iniciar_produccion',
-            'clase': 'btn-warning',
-            'icono': 'fas fa-play',
-            'tipo': 'POST'
-        }
-    elif paso_actual == 5:
-        accion_siguiente = {
-            'texto': 'Enviar a Salida',
-            'url': 'inventario:enviar_a_salida',
-            'clase': 'btn-info',
-            'icono': 'fas fa-truck',
-            'tipo': 'POST'
-        }
-    elif paso_actual == 6:
-        accion_siguiente = {
-            'texto': 'Registrar Ventas',
-            'url': 'inventario:registrar_ventas_contaduria',
-            'clase': 'btn-success',
-            'icono': 'fas fa-dollar-sign'
-        }
-    
-    # Verificar si aún quedan materiales faltantes (para paso 3)
-    materiales_aun_faltantes = lista.resumen_materiales.filter(cantidad_faltante__gt=0).count()
+        resumen_materiales = lista.resumen_materiales.select_related('material')
     
     context = {
         'titulo': f'Panel de Gestión - {lista.nombre}',
@@ -3934,10 +3664,9 @@ def panel_lista_produccion(request, lista_id):
         'pasos': pasos,
         'paso_actual': paso_actual,
         'detalles_monos': detalles_monos,
-        'materiales_necesarios': materiales_necesarios,
-        'materiales_faltantes': materiales_faltantes,
-        'materiales_aun_faltantes': materiales_aun_faltantes,
-        'accion_siguiente': accion_siguiente,
+        'resumen_materiales': resumen_materiales,
+        'materiales_aun_faltantes': lista.materiales_faltantes_count,
+        'accion_siguiente': lista.accion_siguiente_info,
     }
     
     return render(request, 'inventario/panel_lista_produccion.html', context)
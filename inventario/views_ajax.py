@@ -0,0 +1,154 @@
+"""
+Vistas AJAX de solo lectura escritas como vistas asíncronas.
+
+Con el servidor ASGI (``GUNICORN_MODO=asgi``) corren en el event loop y usan el
+ORM asíncrono, de modo que no esperan detrás de exportaciones o reportes
+pesados que ocupan los hilos de las vistas síncronas. Con WSGI Django las
+ejecuta igual, adaptándolas automáticamente.
+"""
+
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+
+from .models import Material, Monos, Movimiento
+
+
+@login_required
+async def obtener_info_material(request, material_id):
+    """Vista AJAX para obtener información del material"""
+    try:
+        material = await Material.objects.aget(id=material_id, activo=True)
+        data = {
+            'unidad_base': material.unidad_base,
+            'precio_unitario': float(material.costo_unitario),
+            'nombre': material.nombre,
+            'disponible': float(material.cantidad_disponible)
+        }
+        return JsonResponse(data)
+    except Material.DoesNotExist:
+        return JsonResponse({'error': 'Material no encontrado'}, status=404)
+
+
+@login_required
+async def get_monos_info(request, monos_id):
+    """Vista AJAX para obtener información de un moño"""
+    try:
+        # La receta se trae con prefetch para que costo_produccion no consulte desde el event loop
+        monos = await Monos.objects.prefetch_related('recetas__material').aget(id=monos_id, activo=True)
+        data = {
+            'precio_venta': float(monos.precio_venta),
+            'tipo_venta': monos.tipo_venta,
+            'costo_produccion': float(monos.costo_produccion),
+            'ganancia_unitaria': float(monos.ganancia_unitaria),
+        }
+        return JsonResponse(data)
+    except Monos.DoesNotExist:
+        return JsonResponse({'error': 'Moño no encontrado'}, status=404)
+
+
+@login_required
+async def material_info_api(request):
+    """API para obtener información del material vía AJAX"""
+    material_id = request.GET.get('material_id')
+    if not material_id:
+        return JsonResponse({'error': 'ID de material requerido'}, status=400)
+
+    try:
+        material = await Material.objects.aget(id=material_id, activo=True)
+        data = {
+            'stock_actual': float(material.cantidad_disponible),
+            'unidad': material.unidad_base,
+            'costo_unitario': float(material.costo_unitario),
+            'nombre': material.nombre,
+            'valor_inventario': float(material.valor_inventario)
+        }
+        return JsonResponse(data)
+    except Material.DoesNotExist:
+        return JsonResponse({'error': 'Material no encontrado'}, status=404)
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@login_required
+async def material_info_entrada(request, material_id):
+    """Información del material para entrada"""
+    try:
+        material = await Material.objects.aget(id=material_id, activo=True)
+        return JsonResponse({
+            'codigo': material.codigo,
+            'nombre': material.nombre,
+            'tipo_material': material.tipo_material,
+            'unidad_base': material.unidad_base,
+            'cantidad_disponible': float(material.cantidad_disponible),
+            'factor_conversion': float(material.factor_conversion),
+            'costo_unitario': float(material.costo_unitario or 0)
+        })
+    except Material.DoesNotExist:
+        return JsonResponse({'error': 'Material no encontrado'}, status=404)
+
+
+@login_required
+async def material_info_salida(request, material_id):
+    """Información del material para salida"""
+    try:
+        material = await Material.objects.aget(id=material_id, activo=True)
+
+        # Calcular costo promedio de movimientos recientes
+        precios = [
+            precio async for precio in Movimiento.objects.filter(
+                material=material,
+                tipo_movimiento='entrada'
+            ).exclude(precio_unitario__isnull=True).order_by('-fecha')
+            .values_list('precio_unitario', flat=True)[:10]
+        ]
+        costo_promedio = sum(precios) / len(precios) if precios else None
+
+        return JsonResponse({
+            'codigo': material.codigo,
+            'nombre': material.nombre,
+            'tipo_material': material.tipo_material,
+            'unidad_base': material.unidad_base,
+            'cantidad_disponible': float(material.cantidad_disponible),
+            'costo_promedio': float(costo_promedio) if costo_promedio else None,
+            'costo_unitario': float(material.costo_unitario or 0)
+        })
+    except Material.DoesNotExist:
+        return JsonResponse({'error': 'Material no encontrado'}, status=404)
+
+
+@login_required
+async def detalle_movimiento_ajax(request, movimiento_id):
+    """Detalle completo de un movimiento"""
+    try:
+        movimiento = await Movimiento.objects.select_related(
+            'material', 'usuario', 'simulacion_relacionada'
+        ).aget(id=movimiento_id)
+
+        usuario = movimiento.usuario
+        data = {
+            'id': movimiento.id,
+            'fecha_movimiento': movimiento.fecha.strftime('%d/%m/%Y %H:%M'),
+            'tipo_movimiento': movimiento.tipo_movimiento,
+            'tipo_movimiento_display': movimiento.get_tipo_movimiento_display(),
+            'cantidad': float(movimiento.cantidad),
+            'precio_unitario': float(movimiento.precio_unitario) if movimiento.precio_unitario else None,
+            'detalle': movimiento.detalle,
+            'usuario': f"{usuario.first_name} {usuario.last_name}" if usuario and usuario.first_name else usuario.username if usuario else 'Sistema',
+            'material': {
+                'codigo': movimiento.material.codigo,
+                'nombre': movimiento.material.nombre,
+                'tipo_material': movimiento.material.tipo_material,
+                'unidad_base': movimiento.material.unidad_base,
+            }
+        }
+
+        if movimiento.simulacion_relacionada:
+            data['simulacion'] = {
+                'id': movimiento.simulacion_relacionada.id,
+                'fecha_simulacion': movimiento.simulacion_relacionada.fecha_simulacion.strftime('%d/%m/%Y %H:%M'),
+            }
+
+        return JsonResponse(data)
+
+    except Movimiento.DoesNotExist:
+        return JsonResponse({'error': 'Movimiento no encontrado'}, status=404)
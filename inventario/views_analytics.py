@@ -1,29 +1,70 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Count, Q, F, IntegerField
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import condition
+from django.db.models import Case, Count, DecimalField, F, FloatField, IntegerField, Max, Q, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce
 from django.db.models.functions import TruncMonth, TruncYear
 from django.utils import timezone
 from datetime import datetime, timedelta
-from collections import defaultdict
 import json
+import math
 from decimal import Decimal
 
-from .models import MovimientoEfectivo, Simulacion, Monos, VentaMonos
+from .models import MovimientoEfectivo, Simulacion, Monos, VentaDiaria, VentaMonos
+from . import cache_analytics
 from .permissions import requiere_nivel
 
+# Ganancia sobre costo en porcentaje (0 si no hay costos)
+RENDIMIENTO = Case(
+    When(total_costos__gt=0, then=Cast(F('total_ganancia'), FloatField()) * 100 / Cast(F('total_costos'), FloatField())),
+    default=Value(0.0),
+    output_field=FloatField(),
+)
 
-@login_required
-@requiere_nivel('superuser', 'admin')
-def analytics_dashboard(request):
-    """Dashboard de análisis de ventas y rendimiento"""
-    
+
+def agregados_ventas():
+    """Agregados del resumen diario (VentaDiaria) comunes a los reportes"""
+    cero = Value(Decimal('0'), output_field=DecimalField(max_digits=14, decimal_places=2))
+    return {
+        'total_cantidad': Coalesce(Sum('cantidad'), 0),
+        'total_monos': Coalesce(Sum('cantidad_total_monos'), 0),
+        'total_ingresos': Coalesce(Sum('ingresos'), cero),
+        'total_costos': Coalesce(Sum('costos'), cero),
+        'total_ganancia': Coalesce(Sum('ganancia'), cero),
+        'total_ventas': Coalesce(Sum('n_ventas'), 0),
+    }
+
+
+def _fila_mono(fila):
+    """Fila agregada por moño al formato (nombre, datos) que usa la plantilla"""
+    return fila['monos__nombre'], {
+        'id': fila['monos_id'],
+        'cantidad': fila['total_cantidad'],
+        'cantidad_total_monos': fila['total_monos'],
+        'ingresos': fila['total_ingresos'],
+        'costos': fila['total_costos'],
+        'ganancia': fila['total_ganancia'],
+        'ventas_count': fila['total_ventas'],
+        'rendimiento': fila['rendimiento'],
+    }
+
+
+PERIODOS = ('1m', '3m', '6m', '12m', 'all')
+
+
+def _periodo(request):
+    """Período pedido en la URL (12 meses si no es válido)"""
+    periodo = request.GET.get('periodo', '12m')
+    return periodo if periodo in PERIODOS else '12m'
+
+
+def _rango_periodo(periodo):
+    """Fechas (inicio, fin) del período seleccionado en el dashboard"""
     # Filtros de fecha
     fecha_fin = timezone.now()
     fecha_inicio = fecha_fin - timedelta(days=365)  # Último año por defecto
     
-    # Aplicar filtros si vienen en el request
-    periodo = request.GET.get('periodo', '12m')
-    
     if periodo == '1m':
         fecha_inicio = fecha_fin - timedelta(days=30)
     elif periodo == '3m':
@@ -36,78 +77,40 @@ def analytics_dashboard(request):
         # Usar timezone-aware datetime para evitar warnings
         fecha_inicio = timezone.make_aware(datetime(2020, 1, 1))
     
-    # Obtener VENTAS REALES desde el nuevo modelo VentaMonos
-    ventas_reales = VentaMonos.objects.filter(
-        fecha__gte=fecha_inicio,
-        fecha__lte=fecha_fin
-    ).select_related('monos')
-    
-    # 1. MOÑOS MÁS VENDIDOS (por cantidad)
-    monos_vendidos = {}
-    for venta in ventas_reales:
-        mono = venta.monos
-        mono_nombre = mono.nombre
-        
-        if mono_nombre not in monos_vendidos:
-            monos_vendidos[mono_nombre] = {
-                'id': mono.id,
-                'cantidad': 0,
-                'cantidad_total_monos': 0,  # Total considerando pares
-                'ingresos': Decimal('0'),
-                'costos': Decimal('0'),
-                'ganancia': Decimal('0'),
-                'ventas_count': 0
-            }
-        
-        monos_vendidos[mono_nombre]['cantidad'] += venta.cantidad_vendida
-        monos_vendidos[mono_nombre]['cantidad_total_monos'] += venta.cantidad_total_monos
-        monos_vendidos[mono_nombre]['ingresos'] += venta.ingreso_total
-        monos_vendidos[mono_nombre]['costos'] += venta.costo_unitario * venta.cantidad_vendida
-        monos_vendidos[mono_nombre]['ganancia'] += venta.ganancia_total
-        monos_vendidos[mono_nombre]['ventas_count'] += 1
-    
-    # Calcular rendimiento
-    for mono_nombre, data in monos_vendidos.items():
-        data['rendimiento'] = float((data['ganancia'] / data['costos'] * 100)) if data['costos'] > 0 else 0
-    
-    # Ordenar por cantidad vendida (usar cantidad_total_monos para el análisis real)
-    top_monos_cantidad = sorted(
-        monos_vendidos.items(),
-        key=lambda x: x[1]['cantidad_total_monos'],
-        reverse=True
-    )[:10]
-    
-    # Ordenar por rendimiento
-    top_monos_rendimiento = sorted(
-        monos_vendidos.items(),
-        key=lambda x: x[1]['rendimiento'],
-        reverse=True
-    )[:10]
-    
-    # 2. VENTAS POR MES
-    ventas_por_mes = ventas_reales.annotate(
-        mes=TruncMonth('fecha')
-    ).values('mes').annotate(
-        total_ventas=Sum('ingreso_total'),
-        cantidad_ventas=Count('id'),
-        total_cantidad_monos=Sum('cantidad_vendida')
-    ).order_by('mes')
-    
-    # 3. EVOLUCIÓN MENSUAL DE CADA MOÑO
-    evolución_monos = defaultdict(lambda: defaultdict(int))
-    for venta in ventas_reales:
-        mes = venta.fecha.strftime('%Y-%m')
-        mono_nombre = venta.monos.nombre
-        evolución_monos[mono_nombre][mes] += venta.cantidad_total_monos
+    return fecha_inicio, fecha_fin
+
+
+def _ventas_periodo(fecha_inicio, fecha_fin):
+    """Ventas del período desde el resumen diario (a lo más días × moños filas)"""
+    return VentaDiaria.objects.filter(
+        fecha__gte=timezone.localdate(fecha_inicio),
+        fecha__lte=timezone.localdate(fecha_fin)
+    ).order_by()
+
+
+def _top_monos(ventas, orden):
+    """Los 10 moños con mayor ``orden`` ('total_monos' o 'rendimiento'), como (nombre, datos)"""
+    por_mono = ventas.values('monos_id', 'monos__nombre').annotate(
+        **agregados_ventas()
+    ).annotate(rendimiento=RENDIMIENTO)
+    return [_fila_mono(fila) for fila in por_mono.order_by(f'-{orden}', 'monos__nombre')[:10]]
+
+
+def _calcular_dashboard(fecha_inicio, fecha_fin):
+    """Estadísticas generales y rankings del dashboard para un rango"""
+    ventas_reales = _ventas_periodo(fecha_inicio, fecha_fin)
     
-    # 4. ESTADÍSTICAS GENERALES
+    totales = ventas_reales.aggregate(
+        **agregados_ventas(),
+        tipos_monos_vendidos=Count('monos', distinct=True),
+    )
     stats = {
-        'total_ventas': sum(data['ingresos'] for data in monos_vendidos.values()),
-        'total_costos': sum(data['costos'] for data in monos_vendidos.values()),
-        'total_ganancias': sum(data['ganancia'] for data in monos_vendidos.values()),
-        'total_cantidad_vendida': sum(data['cantidad_total_monos'] for data in monos_vendidos.values()),
-        'tipos_monos_vendidos': len(monos_vendidos),
-        'total_transacciones': len(ventas_reales),
+        'total_ventas': totales['total_ingresos'],
+        'total_costos': totales['total_costos'],
+        'total_ganancias': totales['total_ganancia'],
+        'total_cantidad_vendida': totales['total_monos'],
+        'tipos_monos_vendidos': totales['tipos_monos_vendidos'],
+        'total_transacciones': totales['total_ventas'],
     }
     
     if stats['total_costos'] > 0:
@@ -115,90 +118,187 @@ def analytics_dashboard(request):
     else:
         stats['rendimiento_general'] = 0
     
-    # Preparar datos para gráficos (convertir a JSON)
-    chart_data = {
-        'monos_cantidad': {
-            'labels': [item[0] for item in top_monos_cantidad],
-            'data': [float(item[1]['cantidad_total_monos']) for item in top_monos_cantidad],
-            'colors': ['#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF', '#FF9F40', '#FF6384', '#C9CBCF', '#4BC0C0', '#FF6384']
-        },
-        'monos_rendimiento': {
-            'labels': [item[0] for item in top_monos_rendimiento],
-            'data': [float(item[1]['rendimiento']) for item in top_monos_rendimiento],
-            'colors': ['#4BC0C0', '#36A2EB', '#FF9F40', '#9966FF', '#FF6384', '#FFCE56', '#C9CBCF', '#4BC0C0', '#36A2EB', '#FF6384']
-        },
-        'ventas_mensuales': {
-            'labels': [venta['mes'].strftime('%Y-%m') for venta in ventas_por_mes],
-            'ingresos': [float(venta['total_ventas']) for venta in ventas_por_mes],
-            'cantidad_transacciones': [venta['cantidad_ventas'] for venta in ventas_por_mes]
-        }
+    return {
+        'stats': stats,
+        # Usar cantidad_total_monos (pares cuentan doble) para el análisis real
+        'top_monos_cantidad': _top_monos(ventas_reales, 'total_monos'),
+        'top_monos_rendimiento': _top_monos(ventas_reales, 'rendimiento'),
+    }
+
+
+def _grafico_monos_cantidad(fecha_inicio, fecha_fin):
+    """Top 10 moños por cantidad vendida"""
+    top = _top_monos(_ventas_periodo(fecha_inicio, fecha_fin), 'total_monos')
+    return {
+        'labels': [nombre for nombre, _ in top],
+        'ids': [data['id'] for _, data in top],
+        'data': [float(data['cantidad_total_monos']) for _, data in top],
+        'colors': ['#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF', '#FF9F40', '#FF6384', '#C9CBCF', '#4BC0C0', '#FF6384']
     }
+
+
+def _grafico_monos_rendimiento(fecha_inicio, fecha_fin):
+    """Top 10 moños por rendimiento (ganancia sobre costo)"""
+    top = _top_monos(_ventas_periodo(fecha_inicio, fecha_fin), 'rendimiento')
+    return {
+        'labels': [nombre for nombre, _ in top],
+        'ids': [data['id'] for _, data in top],
+        'data': [float(data['rendimiento']) for _, data in top],
+        'colors': ['#4BC0C0', '#36A2EB', '#FF9F40', '#9966FF', '#FF6384', '#FFCE56', '#C9CBCF', '#4BC0C0', '#36A2EB', '#FF6384']
+    }
+
+
+def _grafico_ventas_mensuales(fecha_inicio, fecha_fin):
+    """Ingresos y número de ventas por mes"""
+    ventas_por_mes = _ventas_periodo(fecha_inicio, fecha_fin).annotate(
+        mes=TruncMonth('fecha')
+    ).values('mes').annotate(
+        total_ventas=Sum('ingresos'),
+        cantidad_ventas=Sum('n_ventas'),
+        total_cantidad_monos=Sum('cantidad_total_monos')
+    ).order_by('mes')
     
-    context = {
-        'stats': stats,
-        'top_monos_cantidad': top_monos_cantidad,
-        'top_monos_rendimiento': top_monos_rendimiento,
-        'chart_data_json': json.dumps(chart_data),
-        'periodo_seleccionado': periodo,
-        'fecha_inicio': fecha_inicio,
-        'fecha_fin': fecha_fin,
+    return {
+        'labels': [venta['mes'].strftime('%Y-%m') for venta in ventas_por_mes],
+        'ingresos': [float(venta['total_ventas']) for venta in ventas_por_mes],
+        'cantidad_transacciones': [venta['cantidad_ventas'] for venta in ventas_por_mes],
+        'cantidad_monos': [venta['total_cantidad_monos'] for venta in ventas_por_mes]
+    }
+
+
+def _grafico_evolucion_monos(fecha_inicio, fecha_fin):
+    """Pivote moño × mes (moños vendidos) de los 10 moños más vendidos"""
+    ventas_reales = _ventas_periodo(fecha_inicio, fecha_fin)
+    top = _top_monos(ventas_reales, 'total_monos')
+    meses = [
+        mes.strftime('%Y-%m')
+        for mes in ventas_reales.annotate(mes=TruncMonth('fecha')).values_list('mes', flat=True).distinct().order_by('mes')
+    ]
+    
+    evolucion_monos = {data['id']: dict.fromkeys(meses, 0) for _, data in top}
+    for fila in ventas_reales.filter(monos_id__in=evolucion_monos).annotate(
+        mes=TruncMonth('fecha')
+    ).values('monos_id', 'mes').annotate(
+        total_monos=Sum('cantidad_total_monos')
+    ):
+        evolucion_monos[fila['monos_id']][fila['mes'].strftime('%Y-%m')] = fila['total_monos']
+    
+    return {
+        'labels': meses,
+        'series': [
+            {'label': nombre, 'id': data['id'], 'data': list(evolucion_monos[data['id']].values())}
+            for nombre, data in top
+        ]
     }
+
+
+# Gráficos del dashboard que se sirven como JSON (ver analytics_grafico)
+GRAFICOS = {
+    'monos_cantidad': _grafico_monos_cantidad,
+    'monos_rendimiento': _grafico_monos_rendimiento,
+    'ventas_mensuales': _grafico_ventas_mensuales,
+    'evolucion_monos': _grafico_evolucion_monos,
+}
+
+
+@login_required
+@requiere_nivel('superuser', 'admin')
+def analytics_dashboard(request):
+    """Dashboard de análisis de ventas y rendimiento (los gráficos se cargan aparte)"""
+    
+    # Aplicar filtros si vienen en el request
+    periodo = _periodo(request)
+    fecha_inicio, fecha_fin = _rango_periodo(periodo)
+    
+    # Se recalcula solo si hubo ventas nuevas desde la última vez (o venció el TTL)
+    datos = cache_analytics.obtener(
+        'dashboard', periodo, None,
+        lambda: _calcular_dashboard(fecha_inicio, fecha_fin)
+    )
+    
+    context = dict(
+        datos,
+        periodo_seleccionado=periodo,
+        fecha_inicio=fecha_inicio,
+        fecha_fin=fecha_fin,
+        cache_stats=cache_analytics.estadisticas(),
+    )
     
     return render(request, 'inventario/analytics_dashboard.html', context)
 
 
+def _etag_grafico(request, grafico):
+    """
+    ETag por gráfico, período, día, versión de ventas y última venta. El rango del
+    período avanza con la fecha, así que el día forma parte de la etiqueta (sin
+    Last-Modified: la última venta no cambia cuando el rango se desplaza).
+    """
+    ultima = VentaMonos.objects.aggregate(ultima=Max('fecha'))['ultima']
+    marca = int(ultima.timestamp()) if ultima else 0
+    hoy = timezone.localdate().isoformat()
+    return f'{grafico}-{_periodo(request)}-{hoy}-{cache_analytics.version_ventas()}-{marca}'
+
+
 @login_required
 @requiere_nivel('superuser', 'admin')
-def analytics_detalle_mono(request, mono_id):
-    """Vista detallada de análisis para un moño específico"""
+@condition(etag_func=_etag_grafico)
+def analytics_grafico(request, grafico):
+    """Datos JSON de un gráfico del dashboard; responde 304 si no hubo ventas nuevas"""
+    if grafico not in GRAFICOS:
+        raise Http404('Gráfico no encontrado')
     
-    try:
-        mono = Monos.objects.get(id=mono_id)
-    except Monos.DoesNotExist:
-        return render(request, '404.html')
+    periodo = _periodo(request)
+    fecha_inicio, fecha_fin = _rango_periodo(periodo)
+    datos = cache_analytics.obtener(
+        f'grafico_{grafico}', periodo, None,
+        lambda: GRAFICOS[grafico](fecha_inicio, fecha_fin)
+    )
     
-    # Filtros de fecha
-    fecha_fin = timezone.now()
-    fecha_inicio = fecha_fin - timedelta(days=365)
+    response = JsonResponse(datos)
+    # El navegador guarda la respuesta pero siempre revalida con ETag
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def _calcular_detalle_mono(mono, fecha_inicio, fecha_fin):
+    """Totales y evolución mensual de un moño para un rango"""
     
-    # Ventas del moño específico desde VentaMonos
-    ventas_mono = VentaMonos.objects.filter(
+    # Estadísticas del moño (del resumen diario)
+    resumen_mono = VentaDiaria.objects.filter(
         monos=mono,
-        fecha__gte=fecha_inicio,
-        fecha__lte=fecha_fin
-    ).order_by('-fecha')
-    
-    # Estadísticas del moño
-    total_ingresos = sum(venta.ingreso_total for venta in ventas_mono)
-    total_costos = sum(venta.costo_unitario * venta.cantidad_vendida for venta in ventas_mono)
-    total_ganancia = sum(venta.ganancia_total for venta in ventas_mono)
-    total_cantidad = sum(venta.cantidad_vendida for venta in ventas_mono)
-    total_cantidad_monos = sum(venta.cantidad_total_monos for venta in ventas_mono)
+        fecha__gte=timezone.localdate(fecha_inicio),
+        fecha__lte=timezone.localdate(fecha_fin)
+    ).order_by()
+    totales = resumen_mono.aggregate(**agregados_ventas())
+    total_ingresos = totales['total_ingresos']
+    total_costos = totales['total_costos']
+    total_ganancia = totales['total_ganancia']
+    total_cantidad = totales['total_cantidad']
+    total_cantidad_monos = totales['total_monos']
     
     rendimiento = float(total_ganancia / total_costos * 100) if total_costos > 0 else 0
     
     # Evolución mensual
-    ventas_por_mes = ventas_mono.annotate(
+    ventas_por_mes = list(resumen_mono.annotate(
         mes=TruncMonth('fecha')
     ).values('mes').annotate(
-        ingresos=Sum('ingreso_total'),
-        cantidad=Sum('cantidad_vendida'),
-        total_monos=Sum(F('cantidad_vendida') * 2, output_field=IntegerField()) if mono.tipo_venta == 'par' else Sum('cantidad_vendida')
-    ).order_by('mes')
+        total_ingresos=Sum('ingresos'),
+        total_cantidad=Sum('cantidad'),
+        total_monos=Sum('cantidad_total_monos')
+    ).order_by('mes'))
     
     # Preparar datos para gráficos
     chart_data = {
         'ventas_por_mes': [
             {
                 'mes': venta['mes'].strftime('%Y-%m'),
-                'ingresos': float(venta['ingresos']),
-                'cantidad': venta['cantidad']
+                'ingresos': float(venta['total_ingresos']),
+                'cantidad': venta['total_cantidad']
             } for venta in ventas_por_mes
         ]
     }
     
-    context = {
-        'mono': mono,
+    return {
         'total_ingresos': total_ingresos,
         'total_costos': total_costos,
         'total_ganancia': total_ganancia,
@@ -206,8 +306,158 @@ def analytics_detalle_mono(request, mono_id):
         'total_cantidad_monos': total_cantidad_monos,
         'rendimiento': rendimiento,
         'ventas_por_mes': ventas_por_mes,
-        'ventas_detalle': ventas_mono,
         'chart_data_json': json.dumps(chart_data),
     }
+
+
+@login_required
+@requiere_nivel('superuser', 'admin')
+def analytics_detalle_mono(request, mono_id):
+    """Vista detallada de análisis para un moño específico"""
+    
+    try:
+        mono = Monos.objects.get(id=mono_id)
+    except Monos.DoesNotExist:
+        return render(request, '404.html')
+    
+    # Filtros de fecha
+    fecha_fin = timezone.now()
+    fecha_inicio = fecha_fin - timedelta(days=365)
+    
+    # Ventas del moño específico desde VentaMonos
+    ventas_mono = VentaMonos.objects.filter(
+        monos=mono,
+        fecha__gte=fecha_inicio,
+        fecha__lte=fecha_fin
+    ).order_by('-fecha')
     
-    return render(request, 'inventario/analytics_detalle_mono.html', context)
\ No newline at end of file
+    datos = cache_analytics.obtener(
+        'detalle_mono', '12m', mono.id,
+        lambda: _calcular_detalle_mono(mono, fecha_inicio, fecha_fin)
+    )
+    
+    context = dict(
+        datos,
+        mono=mono,
+        ventas_detalle=ventas_mono,
+    )
+    
+    return render(request, 'inventario/analytics_detalle_mono.html', context)
+
+
+@login_required
+@requiere_nivel('superuser', 'admin')
+def pronostico_demanda(request):
+    """Pronóstico de demanda por moño y lista de producción sugerida para el siguiente período"""
+    from django.contrib import messages
+    from django.shortcuts import redirect
+    from .pronostico import crear_lista_sugerida, materiales_requeridos, pronosticar_demanda
+    
+    try:
+        horizonte = min(max(int(request.GET.get('semanas', 4)), 1), 12)
+    except ValueError:
+        horizonte = 4
+    
+    if request.method == 'POST':
+        cantidades = {}
+        for clave, valor in request.POST.items():
+            if clave.startswith('cantidad_'):
+                try:
+                    monos_id, cantidad = int(clave[len('cantidad_'):]), int(valor or 0)
+                except ValueError:
+                    messages.error(request, f'Cantidad inválida: "{valor}". Usa números enteros.')
+                    return redirect(f"{request.path}?semanas={horizonte}")
+                if cantidad < 0:
+                    messages.error(request, 'Las cantidades no pueden ser negativas.')
+                    return redirect(f"{request.path}?semanas={horizonte}")
+                cantidades[monos_id] = cantidad
+        try:
+            lista = crear_lista_sugerida(
+                cantidades,
+                request.user,
+                nombre=request.POST.get('nombre', '').strip()[:100] or None,
+                descripcion=f'Generada con el pronóstico de demanda a {horizonte} semana(s)',
+            )
+        except ValueError as e:
+            messages.error(request, str(e))
+            return redirect(f"{request.path}?semanas={horizonte}")
+        messages.success(request, f'Lista "{lista.nombre}" creada en borrador con base en el pronóstico.')
+        return redirect('inventario:panel_lista_produccion', lista_id=lista.id)
+    
+    filas = pronosticar_demanda(horizonte)
+    materiales = materiales_requeridos({
+        fila['monos'].id: fila['cantidad_sugerida'] for fila in filas if fila['cantidad_sugerida'] > 0
+    })
+    
+    context = {
+        'filas': filas,
+        'materiales': materiales,
+        'horizonte': horizonte,
+        'materiales_faltantes': sum(1 for datos in materiales if datos['cantidad_faltante'] > 0),
+        'nombre_sugerido': f'Sugerida {timezone.localdate():%d/%m/%Y}',
+    }
+    return render(request, 'inventario/pronostico_demanda.html', context)
+
+
+@login_required
+@requiere_nivel('superuser', 'admin')
+def riesgo_lista_produccion(request, lista_id):
+    """Simulación Monte Carlo de la ganancia de una lista de producción"""
+    from django.contrib import messages
+    from django.shortcuts import get_object_or_404, redirect
+    from .models import ListaProduccion
+    from .riesgo_produccion import ENSAYOS, simular_ganancia
+    
+    lista = get_object_or_404(ListaProduccion, id=lista_id)
+    
+    try:
+        ensayos = min(max(int(request.GET.get('ensayos', ENSAYOS)), 1000), 100000)
+    except ValueError:
+        ensayos = ENSAYOS
+    
+    try:
+        resultado = simular_ganancia(lista, ensayos)
+    except ValueError as e:
+        messages.error(request, str(e))
+        return redirect('inventario:panel_lista_produccion', lista_id=lista.id)
+    
+    context = {
+        'lista': lista,
+        'resultado': resultado,
+        'probabilidad_perdida_pct': resultado['probabilidad_perdida'] * 100,
+        'histograma_json': json.dumps(resultado['histograma']),
+    }
+    return render(request, 'inventario/riesgo_lista_produccion.html', context)
+
+
+@login_required
+@requiere_nivel('superuser', 'admin')
+def sensibilidad_precios(request):
+    """Márgenes de todos los moños ante cambios hipotéticos de precio de materiales"""
+    from .models import Material
+    from .sensibilidad_precios import DIAS_VOLUMEN, UMBRAL_MARGEN, analizar_cambios
+    
+    def numero(nombre, defecto):
+        try:
+            valor = float(request.GET.get(nombre) or defecto)
+        except ValueError:
+            return defecto
+        return valor if math.isfinite(valor) else defecto  # nan/inf también los acepta float()
+    
+    umbral = numero('umbral', UMBRAL_MARGEN)
+    dias = int(min(max(numero('dias', DIAS_VOLUMEN), 1), 730))
+    
+    materiales = list(Material.objects.order_by('nombre'))
+    cambios = {}
+    for material in materiales:
+        material.cambio = numero(f'cambio_{material.id}', 0)
+        if material.cambio:
+            cambios[material.id] = material.cambio
+    
+    context = {
+        'materiales': materiales,
+        'umbral': umbral,
+        'dias': dias,
+        'resultado': analizar_cambios(cambios, umbral, dias) if cambios else None,
+    }
+    return render(request, 'inventario/sensibilidad_precios.html', context)
@@ -2,6 +2,7 @@ from django.http import HttpResponse, JsonResponse
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.shortcuts import render
+from django.contrib import messages
 from django.utils import timezone
 from datetime import timedelta
 from decimal import Decimal
@@ -224,8 +225,8 @@ def diagnostico_ventas_web(request):
         
         if listas_finalizadas.exists():
             diagnostico['listas']['detalles'] = []
-            for lista in listas_finalizadas[:10]:
-                ventas_lista = VentaMonos.objects.filter(lista_produccion=lista).count()
+            for lista in listas_finalizadas.annotate(num_ventas=Count('ventas_monos'))[:10]:
+                ventas_lista = lista.num_ventas
                 diagnostico['listas']['detalles'].append({
                     'nombre': lista.nombre,
                     'fecha': lista.fecha_modificacion,
@@ -240,15 +241,17 @@ def diagnostico_ventas_web(request):
         movimientos_venta = MovimientoEfectivo.objects.filter(
             tipo_movimiento='ingreso',
             categoria='venta'
-        ).order_by('-fecha')
+        ).select_related('lista_produccion').order_by('-fecha')
         
         diagnostico['movimientos']['total'] = movimientos_venta.count()
+        diagnostico['movimientos']['sin_lista'] = movimientos_venta.filter(lista_produccion__isnull=True).count()
         
         if movimientos_venta.exists():
             diagnostico['movimientos']['ultimos'] = [{
                 'concepto': m.concepto,
                 'fecha': m.fecha,
-                'monto': m.monto
+                'monto': m.monto,
+                'lista': m.lista_produccion.nombre if m.lista_produccion else 'Sin lista'
             } for m in movimientos_venta[:5]]
     except Exception as e:
         diagnostico['movimientos']['error'] = str(e)
@@ -353,6 +356,8 @@ def diagnostico_ventas_web(request):
 @user_passes_test(es_superuser)
 def migrar_ventas_antiguas_web(request):
     """Vista web para migrar ventas antiguas de MovimientoEfectivo a VentaMonos"""
+    from .migracion_ventas import PUNTO_CONTROL, migrar_ventas, reiniciar_punto_control
+    from .models import PuntoControlMigracion
     
     resultado = {
         'ejecutado': False,
@@ -366,142 +371,74 @@ def migrar_ventas_antiguas_web(request):
     
     if request.method == 'POST':
         dry_run = request.POST.get('dry_run') == 'true'
-        resultado['dry_run'] = dry_run
-        resultado['ejecutado'] = True
-        
-        # Buscar MovimientoEfectivo de ventas
-        movimientos_venta = MovimientoEfectivo.objects.filter(
-            tipo_movimiento='ingreso',
-            categoria='venta'
-        ).order_by('fecha')
-        
-        for mov in movimientos_venta:
-            try:
-                if 'Lista:' in mov.concepto:
-                    nombre_lista = mov.concepto.split('Lista:')[1].strip()
-                    
-                    detalle_mov = {
-                        'concepto': mov.concepto,
-                        'fecha': mov.fecha,
-                        'monto': mov.monto,
-                        'lista': nombre_lista,
-                        'ventas_creadas': []
-                    }
-                    
-                    try:
-                        # Si hay múltiples listas con el mismo nombre, buscar la más cercana a la fecha del movimiento
-                        listas_candidatas = ListaProduccion.objects.filter(nombre=nombre_lista, estado='finalizado')
-                        
-                        if listas_candidatas.count() == 0:
-                            detalle_mov['estado'] = 'error'
-                            detalle_mov['mensaje'] = f'No se encontró lista finalizada con nombre "{nombre_lista}"'
-                            resultado['errores'] += 1
-                            resultado['errores_detalle'].append(f"{mov.concepto}: {detalle_mov['mensaje']}")
-                            resultado['detalles'].append(detalle_mov)
-                            continue
-                        elif listas_candidatas.count() == 1:
-                            lista = listas_candidatas.first()
-                        else:
-                            # Múltiples listas: buscar la más cercana por fecha
-                            from datetime import timedelta
-                            lista = None
-                            menor_diferencia = None
-                            
-                            for l in listas_candidatas:
-                                if l.fecha_finalizacion:
-                                    diferencia = abs((l.fecha_finalizacion - mov.fecha).total_seconds())
-                                    if menor_diferencia is None or diferencia < menor_diferencia:
-                                        menor_diferencia = diferencia
-                                        lista = l
-                            
-                            if lista is None:
-                                # Si ninguna tiene fecha_finalizacion, tomar la más reciente por fecha_creacion
-                                lista = listas_candidatas.order_by('-fecha_creacion').first()
-                            
-                            detalle_mov['info_adicional'] = f'Se encontraron {listas_candidatas.count()} listas. Usando la más cercana en fecha.'
-                        
-                        # Verificar si ya existen ventas
-                        ventas_existentes = VentaMonos.objects.filter(lista_produccion=lista)
-                        
-                        if ventas_existentes.exists():
-                            detalle_mov['estado'] = 'ya_existe'
-                            detalle_mov['mensaje'] = f'Ya existen {ventas_existentes.count()} ventas'
-                            resultado['ventas_ya_existen'] += ventas_existentes.count()
-                            resultado['detalles'].append(detalle_mov)
-                            continue
-                        
-                        # Obtener detalles de moños
-                        detalles = lista.detalles_monos.all()
-                        ventas_para_crear = []
-                        
-                        for detalle in detalles:
-                            if detalle.cantidad_producida > 0:
-                                cantidad_vendida = detalle.cantidad_producida
-                                mono = detalle.monos
-                                precio_unitario = mono.precio_venta
-                                ingreso_total = Decimal(cantidad_vendida) * precio_unitario
-                                costo_unitario = mono.costo_produccion
-                                ganancia_total = ingreso_total - (costo_unitario * cantidad_vendida)
-                                
-                                venta_dict = {
-                                    'mono': mono.nombre,
-                                    'cantidad': cantidad_vendida,
-                                    'tipo': mono.tipo_venta,
-                                    'ingreso': float(ingreso_total),
-                                    'ganancia': float(ganancia_total)
-                                }
-                                
-                                if not dry_run:
-                                    venta = VentaMonos.objects.create(
-                                        lista_produccion=lista,
-                                        monos=mono,
-                                        cantidad_vendida=cantidad_vendida,
-                                        tipo_venta=mono.tipo_venta,
-                                        precio_unitario=precio_unitario,
-                                        ingreso_total=ingreso_total,
-                                        costo_unitario=costo_unitario,
-                                        ganancia_total=ganancia_total,
-                                        fecha=mov.fecha,
-                                        usuario=mov.usuario
-                                    )
-                                
-                                ventas_para_crear.append(venta_dict)
-                                resultado['ventas_creadas'] += 1
-                        
-                        if ventas_para_crear:
-                            detalle_mov['estado'] = 'creadas' if not dry_run else 'simuladas'
-                            detalle_mov['ventas_creadas'] = ventas_para_crear
-                            detalle_mov['mensaje'] = f'{"Creadas" if not dry_run else "Se crearían"} {len(ventas_para_crear)} ventas'
-                        else:
-                            detalle_mov['estado'] = 'sin_datos'
-                            detalle_mov['mensaje'] = 'No hay detalles con cantidad_producida > 0'
-                        
-                        resultado['detalles'].append(detalle_mov)
-                        
-                    except ListaProduccion.DoesNotExist:
-                        error = {
-                            'concepto': mov.concepto,
-                            'error': f'Lista "{nombre_lista}" no encontrada'
-                        }
-                        resultado['errores_detalle'].append(error)
-                        resultado['errores'] += 1
-                        
-            except Exception as e:
-                error = {
-                    'concepto': mov.concepto,
-                    'error': str(e)
-                }
-                resultado['errores_detalle'].append(error)
-                resultado['errores'] += 1
+        if request.POST.get('reiniciar') == 'true' and not dry_run:
+            reiniciar_punto_control()
+        resultado = migrar_ventas(dry_run=dry_run)
     
     context = {
         'resultado': resultado,
+        'punto_control': PuntoControlMigracion.objects.filter(nombre=PUNTO_CONTROL).first(),
         'titulo': 'Migrar Ventas Antiguas'
     }
     
     return render(request, 'inventario/migrar_ventas_antiguas.html', context)
 
 
+@login_required
+@user_passes_test(es_superuser)
+def perfiles_peticiones(request, perfil_id=None):
+    """Perfiles de peticiones pedidos con ?_perfil o la cabecera X-Perfil (ver perfilado.py)"""
+    from . import perfilado
+    
+    perfil = None
+    if perfil_id:
+        perfil = perfilado.obtener(perfil_id)
+        if perfil is None:
+            messages.warning(request, 'El perfil ya no está guardado (venció o fue descartado por uno más reciente).')
+    
+    context = {
+        'perfiles': perfilado.listar(),
+        'perfil': perfil,
+        'parametro': perfilado.PARAMETRO,
+        'titulo': 'Perfiles de Peticiones'
+    }
+    
+    return render(request, 'inventario/perfiles_peticiones.html', context)
+
+
+@login_required
+@user_passes_test(es_superuser)
+def consultas_lentas_web(request):
+    """Consultas SQL más lentas agrupadas por vista, con su plan de ejecución"""
+    from .consultas_lentas import MAX_FILAS, UMBRAL_MS
+    from .models import ConsultaLenta
+    
+    if request.method == 'POST' and request.POST.get('vaciar') == 'true':
+        borradas, _ = ConsultaLenta.objects.all().delete()
+        messages.success(request, f'Se borraron {borradas} consultas lentas.')
+    
+    vistas = list(
+        ConsultaLenta.objects.values('vista')
+        .annotate(total_ms=Sum('total_ms'), veces=Sum('veces'), huellas=Count('id'))
+        .order_by('-total_ms')
+    )
+    vista = request.GET.get('vista')
+    consultas = ConsultaLenta.objects.order_by('-total_ms')
+    if vista is not None:
+        consultas = consultas.filter(vista=vista)
+    
+    context = {
+        'vistas': vistas,
+        'vista_actual': vista,
+        'consultas': consultas[:50],
+        'umbral_ms': UMBRAL_MS,
+        'max_filas': MAX_FILAS,
+        'titulo': 'Consultas Lentas'
+    }
+    
+    return render(request, 'inventario/consultas_lentas.html', context)
+
+
 @login_required
 def diagnostico_perfiles_web(request):
     """Diagnostica y repara perfiles de usuario"""
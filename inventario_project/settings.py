@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 from decouple import config
+from django.core.exceptions import ImproperlyConfigured
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -66,7 +67,10 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'inventario.middleware.InstrumentacionMiddleware',  # Consultas y tiempos por petición
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'inventario.middleware.ETagVersionesMiddleware',  # 304 si no cambiaron los datos de la página
+    'inventario.middleware.PerfilMiddleware',  # cProfile bajo demanda (?_perfil, superusuarios)
 ]
 
 ROOT_URLCONF = 'inventario_project.urls'
@@ -82,6 +86,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'inventario.cache_catalogo.versiones',
             ],
         },
     },
@@ -96,35 +101,51 @@ WSGI_APPLICATION = 'inventario_project.wsgi.application'
 # Configuración de base de datos que funciona tanto en desarrollo como en Railway
 # Intentar múltiples métodos para obtener DATABASE_URL
 database_url = os.environ.get('DATABASE_URL') or config('DATABASE_URL', default=None)
+
+# Conexiones persistentes (segundos que se reutiliza una conexión; 0 = una por petición)
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=60, cast=int)
+DB_CONN_HEALTH_CHECKS = config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
+# Pool de conexiones de psycopg 3 (opcional, reemplaza a las conexiones persistentes)
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+DB_POOL_MIN_SIZE = config('DB_POOL_MIN_SIZE', default=2, cast=int)
+DB_POOL_MAX_SIZE = config('DB_POOL_MAX_SIZE', default=10, cast=int)
+DB_POOL_TIMEOUT = config('DB_POOL_TIMEOUT', default=10, cast=int)
 railway_env = os.environ.get('RAILWAY_ENVIRONMENT') or config('RAILWAY_ENVIRONMENT', default=None)
 
-print(f"🔍 DEBUG: DATABASE_URL exists: {database_url is not None}")
-print(f"🔍 DEBUG: DATABASE_URL value: {database_url[:50] if database_url else 'None'}...")
-print(f"🔍 DEBUG: RAILWAY_ENVIRONMENT: {railway_env}")
-print(f"🔍 DEBUG: All env vars with DATABASE: {[k for k in os.environ.keys() if 'DATABASE' in k]}")
+# La importación de settings no imprime nada: el origen de la configuración y los
+# avisos quedan en DB_ORIGEN / DB_AVISOS y se consultan con `manage.py verificar_env`
+DB_AVISOS = []
 
 if database_url:  # Usar PostgreSQL cuando esté disponible
     # Configuración para Railway (PostgreSQL)
     import dj_database_url
-    print(f"🔗 DATABASE_URL detectada: {database_url[:50]}...")
-    
+
     try:
         # Intentar configurar PostgreSQL
         DATABASES = {
             'default': dj_database_url.config(
                 default=database_url,
-                conn_max_age=0,  # Desactivar connection pooling temporalmente
-                conn_health_checks=False,  # Desactivar health checks
+                conn_max_age=DB_CONN_MAX_AGE,
+                conn_health_checks=DB_CONN_HEALTH_CHECKS,
             )
         }
-        print(f"✅ USANDO POSTGRESQL CORRECTAMENTE")
-        print(f"🚀 ENGINE: {DATABASES['default'].get('ENGINE', 'No engine')}")
-        print(f"🚀 HOST: {DATABASES['default'].get('HOST', 'No host')}")
-        print(f"🚀 NAME: {DATABASES['default'].get('NAME', 'No name')}")
+        DB_ORIGEN = 'DATABASE_URL'
+        if DB_POOL:
+            # El pool de Django requiere psycopg 3 con psycopg_pool; es incompatible con CONN_MAX_AGE
+            try:
+                import psycopg_pool  # noqa: F401
+                DATABASES['default']['CONN_MAX_AGE'] = 0
+                DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+                    'min_size': DB_POOL_MIN_SIZE,
+                    'max_size': DB_POOL_MAX_SIZE,
+                    'timeout': DB_POOL_TIMEOUT,
+                }
+            except ImportError:
+                DB_AVISOS.append('DB_POOL activo pero psycopg_pool no está instalado; se usan conexiones persistentes')
     except Exception as e:
-        print(f"⚠️ Error configurando PostgreSQL: {e}")
-        print(f"🔄 Fallback a SQLite temporalmente")
         # Fallback a SQLite si PostgreSQL falla
+        DB_ORIGEN = 'SQLite (fallback)'
+        DB_AVISOS.append(f'Error configurando PostgreSQL: {e}')
         DATABASES = {
             'default': {
                 'ENGINE': 'django.db.backends.sqlite3',
@@ -133,8 +154,8 @@ if database_url:  # Usar PostgreSQL cuando esté disponible
         }
 elif railway_env:
     # Estamos en Railway pero no hay DATABASE_URL - usar SQLite como fallback
-    print("⚠️ WARNING: En Railway pero usando SQLite (PostgreSQL no disponible)")
-    print("📝 Usando SQLite como fallback temporal")
+    DB_ORIGEN = 'SQLite (fallback en Railway)'
+    DB_AVISOS.append('En Railway pero sin DATABASE_URL: se usa SQLite y los datos se perderán')
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
@@ -143,7 +164,7 @@ elif railway_env:
     }
 else:
     # Configuración para desarrollo local (SQLite)
-    print("🔧 Usando SQLite para desarrollo local")
+    DB_ORIGEN = 'SQLite (desarrollo local)'
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
@@ -151,6 +172,12 @@ else:
         }
     }
 
+if DB_AVISOS:
+    # Una configuración equivocada sí debe verse en los logs, pero como aviso y no en cada import limpio
+    import warnings
+    for aviso in DB_AVISOS:
+        warnings.warn(aviso, RuntimeWarning, stacklevel=1)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -206,6 +233,67 @@ LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/inventario/'
 LOGOUT_REDIRECT_URL = '/login/'
 
+# Cache de Django: locmem (default, por proceso), archivo (compartido entre los workers
+# de una máquina), redis o memcached (compartidos; requieren redis / pymemcache) o ninguno
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem')
+CACHE_LOCATION = config('CACHE_LOCATION', default='')
+BACKENDS_CACHE = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'inventario'),
+    'archivo': ('django.core.cache.backends.filebased.FileBasedCache', str(BASE_DIR / 'cache_django')),
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://127.0.0.1:6379/1'),
+    'memcached': ('django.core.cache.backends.memcached.PyMemcacheCache', '127.0.0.1:11211'),
+    'ninguno': ('django.core.cache.backends.dummy.DummyCache', ''),
+}
+if CACHE_BACKEND not in BACKENDS_CACHE:
+    raise ImproperlyConfigured(f'CACHE_BACKEND debe ser uno de: {", ".join(BACKENDS_CACHE)}')
+CACHES = {
+    'default': {
+        'BACKEND': BACKENDS_CACHE[CACHE_BACKEND][0],
+        'LOCATION': CACHE_LOCATION or BACKENDS_CACHE[CACHE_BACKEND][1],
+        'TIMEOUT': 300,
+        'OPTIONS': {'MAX_ENTRIES': 1000} if CACHE_BACKEND in ('locmem', 'archivo') else {},
+    }
+}
+
+# Segundos que se sirven páginas y fragmentos del catálogo (los cambios los invalidan antes)
+CACHE_VISTAS_TTL = config('CACHE_VISTAS_TTL', default=60, cast=int)
+
+# Instrumentación por petición: se registran las que superan algún umbral
+RENDIMIENTO_UMBRAL_MS = config('RENDIMIENTO_UMBRAL_MS', default=500, cast=int)
+RENDIMIENTO_UMBRAL_CONSULTAS = config('RENDIMIENTO_UMBRAL_CONSULTAS', default=30, cast=int)
+RENDIMIENTO_UMBRAL_DUPLICADAS = config('RENDIMIENTO_UMBRAL_DUPLICADAS', default=5, cast=int)
+RENDIMIENTO_PIE_SUPERUSUARIOS = config('RENDIMIENTO_PIE_SUPERUSUARIOS', default=True, cast=bool)
+
+# Consultas lentas: se guardan con su plan las que tardan al menos estos ms (0 desactiva)
+CONSULTAS_LENTAS_MS = config('CONSULTAS_LENTAS_MS', default=200, cast=int)
+CONSULTAS_LENTAS_MAX = config('CONSULTAS_LENTAS_MAX', default=500, cast=int)
+
+# Endpoint /metrics: token para Prometheus (Authorization: Bearer ...) y segundos
+# que se guardan los agregados de negocio y filas de tablas
+METRICAS_TOKEN = config('METRICAS_TOKEN', default='')
+METRICAS_TTL = config('METRICAS_TTL', default=300, cast=int)
+METRICAS_REFRESCO = config('METRICAS_REFRESCO', default=30, cast=int)
+
+# Perfilado bajo demanda: perfiles guardados, segundos que se conservan y filas por tabla
+PERFILADO_MAX = config('PERFILADO_MAX', default=20, cast=int)
+PERFILADO_TTL = config('PERFILADO_TTL', default=86400, cast=int)
+PERFILADO_TOP = config('PERFILADO_TOP', default=40, cast=int)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'inventario': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
+# Cache de analytics (segundos de vida y máximo de resultados en memoria)
+ANALYTICS_CACHE_TTL = config('ANALYTICS_CACHE_TTL', default=300, cast=int)
+ANALYTICS_CACHE_MAX_ENTRADAS = config('ANALYTICS_CACHE_MAX_ENTRADAS', default=128, cast=int)
+
 # Security settings for production
 if not DEBUG:
     # Railway ya maneja SSL, no forzar redirect desde Django
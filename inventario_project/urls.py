@@ -19,6 +19,7 @@ from django.urls import path, include
 from django.shortcuts import redirect
 from django.contrib.auth import views as auth_views, logout
 from django.http import JsonResponse
+from inventario.metricas import vista_prometheus
 
 def redirect_to_inventario(request):
     """Redirigir desde la raíz al inventario"""
@@ -42,6 +43,8 @@ urlpatterns = [
     
     # Healthcheck endpoint
     path('health/', healthcheck, name='healthcheck'),
+    # Métricas en formato Prometheus (token METRICAS_TOKEN o usuario staff)
+    path('metrics', vista_prometheus, name='metricas'),
     
     # Authentication URLs
     path('login/', auth_views.LoginView.as_view(template_name='registration/login.html'), name='login'),